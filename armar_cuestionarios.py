@@ -0,0 +1,252 @@
+"""
+Motor para armar cuestionarios balanceados a partir del banco de verdadero/falso
+
+El banco se compila una sola vez en arreglos compactos de índices agrupados por
+lectura, dificultad y respuesta. Con eso cada cuestionario se arma con unos
+cuantos muestreos aleatorios, sin recorrer el banco completo.
+
+Uso:
+    python3 armar_cuestionarios.py --n 8
+    python3 armar_cuestionarios.py --n 6 --lectura "Amoxcalli" --historial vistas.json
+    python3 armar_cuestionarios.py --n 8 --cantidad 5000 --salida cuestionarios.json
+    python3 armar_cuestionarios.py --n 8 --cantidad 5000 --firestore
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from array import array
+
+# === CONFIGURACIÓN ===
+BANCO_PREGUNTAS_JSON = "banco_verdadero_falso.json"
+FIREBASE_CREDENTIALS = "firebase-credentials.json"
+COLECCION_CUESTIONARIOS = "cuestionarios"
+TAMANO_LOTE_FIRESTORE = 500  # máximo de escrituras por batch en Firestore
+
+MAPEO_NIVELES = {
+    "basico": "fácil",
+    "intermedio": "intermedia",
+    "avanzado": "difícil"
+}
+
+# Misma proporción que PROMPT_PREGUNTAS: 4 fáciles, 2 intermedias, 2 difíciles
+MEZCLA_POR_DEFECTO = {"fácil": 0.5, "intermedia": 0.25, "difícil": 0.25}
+
+TODAS = None  # clave de pool que agrupa todas las lecturas
+
+
+def id_pregunta(origen, afirmacion):
+    """ID estable de una pregunta, usado en el historial de los estudiantes"""
+    return hashlib.sha1(f"{origen}\n{afirmacion}".encode("utf-8")).hexdigest()[:12]
+
+
+def compilar_banco(banco):
+    """
+    Convierte el banco {nivel: [preguntas]} en pools compactos.
+    Devuelve un dict con la lista de preguntas, el mapa id -> índice y los pools
+    indexados por (lectura, dificultad, respuesta); lectura=None agrupa todas.
+    """
+    preguntas = []
+    pools = {}
+    for nivel, lista in banco.items():
+        dificultad = MAPEO_NIVELES[nivel]
+        for p in lista:
+            indice = len(preguntas)
+            preguntas.append({
+                "id": id_pregunta(p["origen"], p["afirmacion"]),
+                "afirmacion": p["afirmacion"],
+                "respuesta": p["respuesta"],
+                "dificultad": dificultad,
+                "origen": p["origen"],
+            })
+            for lectura in (TODAS, p["origen"]):
+                clave = (lectura, dificultad, bool(p["respuesta"]))
+                pools.setdefault(clave, array("I")).append(indice)
+
+    return {
+        "preguntas": preguntas,
+        "por_id": {p["id"]: i for i, p in enumerate(preguntas)},
+        "pools": pools,
+        "lecturas": sorted({p["origen"] for p in preguntas}),
+    }
+
+
+def cargar_banco(ruta=BANCO_PREGUNTAS_JSON):
+    """Lee el banco de preguntas y lo compila"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        return compilar_banco(json.load(f))
+
+
+def repartir(n, mezcla):
+    """Reparte n preguntas entre niveles según la mezcla (método del mayor residuo)"""
+    total = sum(mezcla.values())
+    cuotas = {nivel: n * peso / total for nivel, peso in mezcla.items()}
+    conteos = {nivel: int(c) for nivel, c in cuotas.items()}
+    faltantes = n - sum(conteos.values())
+    for nivel in sorted(cuotas, key=lambda k: cuotas[k] - conteos[k], reverse=True)[:faltantes]:
+        conteos[nivel] += 1
+    return conteos
+
+
+def muestrear(pool, k, excluidos, rng):
+    """Toma hasta k índices distintos del pool que no estén en excluidos"""
+    if k <= 0 or not pool:
+        return []
+    # Con pocos excluidos el muestreo por rechazo casi nunca repite; si el pool
+    # está muy consumido se filtra una sola vez y se muestrea sobre lo que queda.
+    if len(excluidos) * 4 < len(pool):
+        elegidos = []
+        vistos = set()
+        intentos = 0
+        while len(elegidos) < k and intentos < k * 8:
+            i = pool[rng.randrange(len(pool))]
+            intentos += 1
+            if i in vistos or i in excluidos:
+                continue
+            vistos.add(i)
+            elegidos.append(i)
+        if len(elegidos) == k:
+            return elegidos
+    disponibles = [i for i in pool if i not in excluidos]
+    return rng.sample(disponibles, min(k, len(disponibles)))
+
+
+def armar_cuestionario(banco, n, mezcla=None, lectura=None, historial=(), balancear_respuestas=True, rng=random):
+    """
+    Arma un cuestionario de n preguntas y devuelve la lista de índices elegidos.
+
+    - mezcla: proporción por dificultad (por defecto 4/2/2)
+    - lectura: limita las preguntas a una lectura (origen)
+    - historial: IDs de preguntas que el estudiante ya respondió
+    - balancear_respuestas: intenta la misma cantidad de verdaderas y falsas
+    Si algún pool no alcanza se completa con el resto del banco de la misma lectura.
+    """
+    pools = banco["pools"]
+    excluidos = {banco["por_id"][i] for i in historial if i in banco["por_id"]}
+    elegidos = []
+
+    for dificultad, k in repartir(n, mezcla or MEZCLA_POR_DEFECTO).items():
+        verdaderas = pools.get((lectura, dificultad, True), ())
+        falsas = pools.get((lectura, dificultad, False), ())
+        if balancear_respuestas:
+            k_falsas = k // 2 + (k % 2 if rng.random() < 0.5 else 0)
+        else:
+            # Sin balance se respeta la proporción natural del banco
+            k_falsas = round(k * len(falsas) / max(len(falsas) + len(verdaderas), 1))
+
+        tomadas = muestrear(falsas, k_falsas, excluidos, rng)
+        excluidos.update(tomadas)
+        tomadas += muestrear(verdaderas, k - len(tomadas), excluidos, rng)
+        excluidos.update(tomadas)
+        if len(tomadas) < k:
+            # No hubo suficientes verdaderas: completar con falsas
+            extra = muestrear(falsas, k - len(tomadas), excluidos, rng)
+            excluidos.update(extra)
+            tomadas += extra
+        elegidos += tomadas
+
+    if len(elegidos) < n:
+        # Un nivel se quedó corto: completar con cualquier dificultad
+        for clave, pool in pools.items():
+            if clave[0] != lectura or len(elegidos) >= n:
+                continue
+            extra = muestrear(pool, n - len(elegidos), excluidos, rng)
+            excluidos.update(extra)
+            elegidos += extra
+
+    rng.shuffle(elegidos)
+    return elegidos
+
+
+def generar_lote(banco, cantidad, n, semilla=None, **opciones):
+    """Pre-genera muchos cuestionarios reproducibles (misma semilla = mismo lote)"""
+    rng = random.Random(semilla)
+    return [armar_cuestionario(banco, n, rng=rng, **opciones) for _ in range(cantidad)]
+
+
+def expandir(banco, indices):
+    """Convierte una lista de índices en las preguntas completas"""
+    return [banco["preguntas"][i] for i in indices]
+
+
+def exportar_a_firestore(banco, cuestionarios, prefijo="cuestionario"):
+    """Sube los cuestionarios a Firestore usando escrituras por lotes"""
+    from firebase_admin import credentials, firestore, initialize_app
+
+    if not os.path.exists(FIREBASE_CREDENTIALS):
+        print(f"❌ ERROR: No se encontró el archivo de credenciales '{FIREBASE_CREDENTIALS}'")
+        return 0
+
+    initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS))
+    db = firestore.client()
+    coleccion = db.collection(COLECCION_CUESTIONARIOS)
+
+    subidos = 0
+    batch = db.batch()
+    for i, indices in enumerate(cuestionarios):
+        documento = {
+            "preguntas_vof": [
+                {k: p[k] for k in ("id", "afirmacion", "respuesta", "dificultad", "origen")}
+                for p in expandir(banco, indices)
+            ]
+        }
+        batch.set(coleccion.document(f"{prefijo}_{i:05d}"), documento)
+        subidos += 1
+        if subidos % TAMANO_LOTE_FIRESTORE == 0:
+            batch.commit()
+            batch = db.batch()
+    if subidos % TAMANO_LOTE_FIRESTORE:
+        batch.commit()
+
+    print(f"✅ {subidos} cuestionarios subidos a '{COLECCION_CUESTIONARIOS}'")
+    return subidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arma cuestionarios balanceados desde el banco de preguntas")
+    parser.add_argument("--n", type=int, default=8, help="Preguntas por cuestionario")
+    parser.add_argument("--lectura", help="Limitar a una lectura (campo 'origen')")
+    parser.add_argument("--historial", help="JSON con la lista de IDs de preguntas ya vistas")
+    parser.add_argument("--cantidad", type=int, default=1, help="Cuántos cuestionarios generar")
+    parser.add_argument("--semilla", type=int, help="Semilla para un lote reproducible")
+    parser.add_argument("--salida", help="Guardar el lote en este archivo JSON")
+    parser.add_argument("--firestore", action="store_true", help="Subir el lote a Firestore")
+    args = parser.parse_args()
+
+    banco = cargar_banco()
+    if args.lectura and args.lectura not in banco["lecturas"]:
+        print(f"❌ La lectura '{args.lectura}' no está en el banco")
+        print(f"   Lecturas disponibles: {banco['lecturas']}")
+        return
+
+    historial = []
+    if args.historial:
+        with open(args.historial, "r", encoding="utf-8") as f:
+            historial = json.load(f)
+
+    inicio = time.perf_counter()
+    lote = generar_lote(banco, args.cantidad, args.n, semilla=args.semilla,
+                        lectura=args.lectura, historial=historial)
+    duracion = time.perf_counter() - inicio
+    print(f"🎲 {len(lote)} cuestionarios generados en {duracion * 1000:.1f} ms "
+          f"({duracion / max(len(lote), 1) * 1e6:.1f} µs por cuestionario)")
+
+    if args.cantidad == 1:
+        for i, p in enumerate(expandir(banco, lote[0]), 1):
+            resp = "✓" if p["respuesta"] else "✗"
+            print(f"   {i}. [{p['dificultad']}] {resp} {p['afirmacion'][:60]}  ({p['origen']})")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump([[banco["preguntas"][i]["id"] for i in c] for c in lote], f)
+        print(f"💾 Lote guardado en {args.salida}")
+
+    if args.firestore:
+        exportar_a_firestore(banco, lote)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Exportación binaria compacta del banco de verdadero/falso
+
+Formato (little-endian), pensado para abrirse con mmap sin parsear todo:
+
+    CABECERA   magic "TTVF", versión, conteos y offsets de cada sección
+    CADENAS    cadenas internadas (dificultades y orígenes): u16 largo + UTF-8
+    ÍNDICE     por lectura: id de cadena, primer registro, cantidad
+    REGISTROS  por pregunta: offset y largo del texto, id de dificultad, respuesta
+    TEXTOS     afirmaciones en UTF-8, una tras otra
+
+Leer las preguntas de una lectura solo toca su entrada del índice, sus
+registros y sus textos; las afirmaciones se devuelven como memoryview sobre el
+mmap (sin copiar) a menos que se pida decodificarlas.
+
+El .bin se reescribe en un archivo temporal que reemplaza al anterior con
+os.replace: los procesos que ya lo tienen mapeado siguen leyendo la versión
+vieja en vez de ver un archivo truncado.
+
+Uso:
+    python3 banco_binario.py                       # exporta si el JSON es más nuevo que el .bin
+    python3 banco_binario.py --exportar            # exporta siempre
+    python3 banco_binario.py --lectura "Amoxcalli"
+    python3 banco_binario.py --comparar
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+
+# === CONFIGURACIÓN ===
+BANCO_PREGUNTAS_JSON = "banco_verdadero_falso.json"
+BANCO_BINARIO = "banco_verdadero_falso.bin"
+
+MAPEO_NIVELES = {
+    "basico": "fácil",
+    "intermedio": "intermedia",
+    "avanzado": "difícil"
+}
+
+MAGIC = b"TTVF"
+VERSION = 1
+CABECERA = struct.Struct("<4sHIIIIIII")   # magic, versión, n_cadenas, n_lecturas, n_preguntas, 4 offsets
+ENTRADA_INDICE = struct.Struct("<HII")    # id cadena del origen, primer registro, cantidad
+REGISTRO = struct.Struct("<IHBB")         # offset texto, largo texto, id cadena dificultad, respuesta
+LARGO_CADENA = struct.Struct("<H")
+
+
+def exportar(ruta_json=BANCO_PREGUNTAS_JSON, ruta_bin=BANCO_BINARIO):
+    """Convierte el banco JSON al formato binario; devuelve el tamaño en bytes"""
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        banco = json.load(f)
+
+    # Agrupar por lectura conservando el orden de niveles del JSON
+    por_lectura = {}
+    for nivel, preguntas in banco.items():
+        dificultad = MAPEO_NIVELES[nivel]
+        for p in preguntas:
+            por_lectura.setdefault(p["origen"], []).append((p["afirmacion"], dificultad, p["respuesta"]))
+
+    cadenas = []
+    id_cadena = {}
+
+    def internar(cadena):
+        if cadena not in id_cadena:
+            id_cadena[cadena] = len(cadenas)
+            cadenas.append(cadena)
+        return id_cadena[cadena]
+
+    for dificultad in MAPEO_NIVELES.values():
+        internar(dificultad)
+
+    indice = bytearray()
+    registros = bytearray()
+    textos = bytearray()
+    n_preguntas = 0
+    for origen in sorted(por_lectura):
+        preguntas = por_lectura[origen]
+        indice += ENTRADA_INDICE.pack(internar(origen), n_preguntas, len(preguntas))
+        for afirmacion, dificultad, respuesta in preguntas:
+            datos = afirmacion.encode("utf-8")
+            registros += REGISTRO.pack(len(textos), len(datos), internar(dificultad), 1 if respuesta else 0)
+            textos += datos
+        n_preguntas += len(preguntas)
+
+    seccion_cadenas = bytearray()
+    for cadena in cadenas:
+        datos = cadena.encode("utf-8")
+        seccion_cadenas += LARGO_CADENA.pack(len(datos)) + datos
+
+    off_cadenas = CABECERA.size
+    off_indice = off_cadenas + len(seccion_cadenas)
+    off_registros = off_indice + len(indice)
+    off_textos = off_registros + len(registros)
+    cabecera = CABECERA.pack(MAGIC, VERSION, len(cadenas), len(por_lectura), n_preguntas,
+                             off_cadenas, off_indice, off_registros, off_textos)
+
+    # Archivo temporal + rename: nunca se trunca un .bin que otro proceso tenga mapeado
+    temporal = ruta_bin + ".tmp"
+    with open(temporal, "wb") as f:
+        for seccion in (cabecera, seccion_cadenas, indice, registros, textos):
+            f.write(seccion)
+    os.replace(temporal, ruta_bin)
+    return off_textos + len(textos)
+
+
+def desactualizado(ruta_json=BANCO_PREGUNTAS_JSON, ruta_bin=BANCO_BINARIO):
+    """True si el .bin no existe o es más viejo que el banco JSON"""
+    return not os.path.exists(ruta_bin) or os.path.getmtime(ruta_bin) < os.path.getmtime(ruta_json)
+
+
+class BancoBinario:
+    """Lector del banco binario sobre mmap; usar como context manager"""
+
+    def __init__(self, ruta=BANCO_BINARIO):
+        self._archivo = open(ruta, "rb")
+        self._mm = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._vista = memoryview(self._mm)
+
+        (magic, version, n_cadenas, n_lecturas, self.n_preguntas,
+         off_cadenas, self._off_indice, self._off_registros, self._off_textos) = CABECERA.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.cerrar()
+            raise ValueError(f"'{ruta}' no es un banco binario versión {VERSION}")
+
+        # Las cadenas internadas son pocas: se decodifican una sola vez
+        self.cadenas = []
+        pos = off_cadenas
+        for _ in range(n_cadenas):
+            (largo,) = LARGO_CADENA.unpack_from(self._mm, pos)
+            self.cadenas.append(bytes(self._vista[pos + 2:pos + 2 + largo]).decode("utf-8"))
+            pos += 2 + largo
+
+        self.indice = {}
+        for i in range(n_lecturas):
+            id_origen, primero, cantidad = ENTRADA_INDICE.unpack_from(self._mm, self._off_indice + i * ENTRADA_INDICE.size)
+            self.indice[self.cadenas[id_origen]] = (primero, cantidad)
+
+    def lecturas(self):
+        """Nombres de las lecturas presentes en el banco"""
+        return list(self.indice)
+
+    def preguntas_de(self, lectura, decodificar=True):
+        """
+        Devuelve las preguntas de una lectura como dicts {afirmacion, respuesta, dificultad}.
+        Con decodificar=False, 'afirmacion' es un memoryview sobre el archivo mapeado
+        (sin copia): solo es válido mientras el banco siga abierto y conviene
+        soltarlo antes de cerrar; si no, el mmap se libera cuando se suelte la
+        última vista.
+        """
+        if lectura not in self.indice:
+            return []
+        primero, cantidad = self.indice[lectura]
+        preguntas = []
+        for off_texto, largo, id_dificultad, respuesta in REGISTRO.iter_unpack(
+                self._vista[self._off_registros + primero * REGISTRO.size:
+                            self._off_registros + (primero + cantidad) * REGISTRO.size]):
+            inicio = self._off_textos + off_texto
+            afirmacion = self._vista[inicio:inicio + largo]
+            preguntas.append({
+                "afirmacion": str(afirmacion, "utf-8") if decodificar else afirmacion,
+                "respuesta": bool(respuesta),
+                "dificultad": self.cadenas[id_dificultad],
+            })
+        return preguntas
+
+    def cerrar(self):
+        """Libera el mmap y el archivo"""
+        self._archivo.close()
+        try:
+            self._vista.release()
+            self._mm.close()
+        except BufferError:
+            # Quedan memoryview de preguntas_de(decodificar=False) en uso: el mmap
+            # se libera cuando ya no quede ninguna referencia a ellas ni al banco
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def comparar(lectura, repeticiones=200):
+    """Compara el arranque en frío (abrir + obtener una lectura) JSON vs binario"""
+    def con_json():
+        with open(BANCO_PREGUNTAS_JSON, "r", encoding="utf-8") as f:
+            banco = json.load(f)
+        return [p for preguntas in banco.values() for p in preguntas if p["origen"] == lectura]
+
+    def con_binario():
+        with BancoBinario() as banco:
+            preguntas = banco.preguntas_de(lectura, decodificar=False)
+            n = len(preguntas)
+            # Los memoryview deben soltarse antes de cerrar el mmap
+            preguntas.clear()
+            return n
+
+    tiempos = {}
+    for nombre, funcion in (("json.load", con_json), ("binario (mmap)", con_binario)):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        tiempos[nombre] = (time.perf_counter() - inicio) / repeticiones * 1e6
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta y consulta el banco de preguntas en formato binario")
+    parser.add_argument("--exportar", action="store_true", help="Exportar aunque el .bin esté al día")
+    parser.add_argument("--lectura", help="Mostrar las preguntas de una lectura desde el binario")
+    parser.add_argument("--comparar", action="store_true", help="Comparar arranque contra json.load")
+    args = parser.parse_args()
+
+    if args.exportar or desactualizado():
+        tamano = exportar()
+        print(f"✅ Banco binario guardado en {BANCO_BINARIO} ({tamano / 1024:.1f} KB)")
+    else:
+        print(f"✅ {BANCO_BINARIO} ya está al día con {BANCO_PREGUNTAS_JSON}")
+
+    if args.lectura:
+        with BancoBinario() as banco:
+            preguntas = banco.preguntas_de(args.lectura)
+            if not preguntas:
+                print(f"⚠️  '{args.lectura}' no está en el banco. Disponibles: {banco.lecturas()}")
+            for i, p in enumerate(preguntas, 1):
+                resp = "✓" if p["respuesta"] else "✗"
+                print(f"   {i}. [{p['dificultad']}] {resp} {p['afirmacion'][:60]}")
+
+    if args.comparar:
+        with BancoBinario() as banco:
+            lectura = args.lectura or banco.lecturas()[0]
+        print(f"\n⏱️  Arranque en frío para '{lectura}':")
+        for nombre, micros in comparar(lectura).items():
+            print(f"   • {nombre}: {micros:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""
+Benchmark reproducible del pipeline contra servicios locales falsos
+
+Corre las etapas reales (descarga, extracción, limpieza, generación,
+normalización y subida) usando los sustitutos de servicios_falsos.py, a varias
+escalas del corpus actual, y guarda los resultados en JSON comparables entre
+corridas.
+
+Uso:
+    python3 benchmark_pipeline.py
+    python3 benchmark_pipeline.py --escalas 1 10 --etapas generacion subida --latencia-llm 0.02 --tasa-429 0.05
+    python3 benchmark_pipeline.py --etapas limpieza --proveedor todas=local --url-local http://localhost:8080/v1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import registro_libros
+from registro_libros import rango_paginas
+from servicios_falsos import (FirestoreFalso, ServidorOpenAIFalso, ServidorPaginas, TextractFalso,
+                              bloques_desde_lecturas)
+
+# === CONFIGURACIÓN ===
+RESULTADOS_DIR = "resultados_benchmark"
+LIBRO_BASE = "P4MLA"
+# banco_ia_analiza.txt y lecturas_finales cubren 4 lecturas; se repiten 16 veces
+# para que la escala 1 corresponda a las ~65 lecturas del libro completo
+FACTOR_LECTURAS_FINALES = 16
+ETAPAS = ["descarga", "extraccion", "extraccion_sincrona", "limpieza", "limpieza_una_llamada", "generacion", "generacion_empaquetada", "normalizacion", "subida"]
+
+
+def _escalar_lecturas(lecturas, escala):
+    """Repite el índice de lecturas desplazando páginas y renombrando cada copia"""
+    ultima_pagina = max(rango_paginas(l["paginas"])[1] for l in lecturas)
+    escaladas = []
+    for copia in range(escala):
+        for l in lecturas:
+            inicio, fin = rango_paginas(l["paginas"])
+            d = copia * ultima_pagina
+            nombre = l["lectura"] if copia == 0 else f"{l['lectura']} ({copia})"
+            escaladas.append({"lectura": nombre, "paginas": f"{inicio + d}-{fin + d}"})
+    return escaladas
+
+
+def _textos_lecturas(libro, escala):
+    """Lista (nombre, texto) de las lecturas OCR del libro repetidas escala veces"""
+    textos = []
+    for archivo in sorted(os.listdir(libro["textos"])):
+        if archivo.endswith(".txt"):
+            with open(os.path.join(libro["textos"], archivo), "r", encoding="utf-8") as f:
+                textos.append((os.path.splitext(archivo)[0], f.read()))
+    return [(n if c == 0 else f"{n} ({c})", t) for c in range(escala) for n, t in textos]
+
+
+def bench_descarga(libro, escala, opciones, tmp):
+    import lecturas
+
+    with ServidorPaginas(libro["directorio"]) as servidor:
+        url_original = registro_libros.URL_BASE
+        registro_libros.URL_BASE = servidor.url_base
+        destino = dict(libro, codigo="BENCH", paginas=libro["paginas"] * escala, directorio=tmp)
+        try:
+            lecturas.descargar_libros([destino], hilos=opciones.hilos_descarga)
+        finally:
+            registro_libros.URL_BASE = url_original
+    total = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+    return {"elementos": destino["paginas"], "bytes": total}
+
+
+def bench_extraccion(libro, escala, opciones, tmp):
+    import textract_texto_por_lectura as extractor
+
+    lecturas = registro_libros.cargar_lecturas(libro)
+    falso = TextractFalso(bloques_desde_lecturas(lecturas, libro["textos"], escala))
+    cliente_original = extractor.textract
+    extractor.textract = falso
+    try:
+        page_texts = extractor.extraer_texto_por_pagina("bench.pdf")
+        extractor.guardar_lecturas(page_texts, _escalar_lecturas(lecturas, escala), tmp)
+    finally:
+        extractor.textract = cliente_original
+    return {"elementos": len(page_texts), "llamadas_textract": falso.llamadas}
+
+
+def bench_extraccion_sincrona(libro, escala, opciones, tmp):
+    import textract_texto_por_lectura as extractor
+
+    lecturas = registro_libros.cargar_lecturas(libro)
+    falso = TextractFalso(bloques_desde_lecturas(lecturas, libro["textos"], escala),
+                          tasa_throttling=opciones.tasa_throttling)
+    # Imágenes de página falsas (bytes distintos por página) en un libro temporal
+    destino = dict(libro, codigo="BENCH", directorio=tmp)
+    paginas = sorted({b["Page"] for b in falso.bloques})
+    for pagina in paginas:
+        datos = f"pagina {pagina}".encode()
+        falso.registrar_imagen(datos, pagina)
+        with open(registro_libros.ruta_pagina(destino, pagina), "wb") as f:
+            f.write(datos)
+
+    espera_original = extractor.ESPERA_REINTENTO
+    extractor.ESPERA_REINTENTO = 0.01
+    try:
+        page_texts, fallidas = extractor.extraer_paginas_sincrono(destino, paginas, cliente=falso,
+                                                                  hilos=extractor.HILOS_SINCRONO, tps=1000)
+    finally:
+        extractor.ESPERA_REINTENTO = espera_original
+    return {"elementos": len(page_texts), "fallidas": len(fallidas), "llamadas_textract": falso.llamadas,
+            "errores_textract": falso.errores}
+
+
+def _bench_llm(funcion, textos, opciones):
+    with ThreadPoolExecutor(max_workers=opciones.hilos_llm) as pool:
+        list(pool.map(lambda t: funcion(*t), textos))
+    return {"elementos": len(textos)}
+
+
+def bench_limpieza(libro, escala, opciones, tmp):
+    import procesar_lecturas
+
+    esperas = []
+
+    def limpiar_y_generar(nombre, texto):
+        inicio = time.perf_counter()
+        limpia = procesar_lecturas.limpiar_lectura(texto)
+        esperas.append(time.perf_counter() - inicio)
+        procesar_lecturas.generar_preguntas(limpia)
+
+    resultado = _bench_llm(limpiar_y_generar, _textos_lecturas(libro, escala), opciones)
+    resultado["texto_listo_s_promedio"] = round(sum(esperas) / max(len(esperas), 1), 4)
+    return resultado
+
+
+def bench_limpieza_una_llamada(libro, escala, opciones, tmp):
+    import procesar_lecturas
+
+    esperas = []
+
+    def limpiar_y_generar(nombre, texto):
+        inicio = time.perf_counter()
+        procesar_lecturas.limpiar_y_generar(
+            texto, al_tener_texto=lambda _: esperas.append(time.perf_counter() - inicio))
+
+    resultado = _bench_llm(limpiar_y_generar, _textos_lecturas(libro, escala), opciones)
+    # Cuánto tarda en estar disponible el texto limpio (en bench_limpieza, la primera llamada completa)
+    resultado["texto_listo_s_promedio"] = round(sum(esperas) / max(len(esperas), 1), 4)
+    return resultado
+
+
+def bench_generacion(libro, escala, opciones, tmp):
+    import generar_preguntas
+
+    return _bench_llm(generar_preguntas.generar_preguntas, _textos_lecturas(libro, escala), opciones)
+
+
+def bench_generacion_empaquetada(libro, escala, opciones, tmp):
+    import generar_preguntas
+
+    textos = _textos_lecturas(libro, escala)
+    banco = generar_preguntas.generar_banco(dict(textos))
+    return {"elementos": len(textos), "con_preguntas": len(banco)}
+
+
+def bench_normalizacion(libro, escala, opciones, tmp):
+    import procesar_json
+
+    with open(procesar_json.INPUT_FILE, "r", encoding="utf-8") as f:
+        crudas = procesar_json.extraer_lecturas(f.read())
+    escaladas = {
+        (n if c == 0 else f"{n} ({c})"): j for c in range(escala * FACTOR_LECTURAS_FINALES) for n, j in crudas.items()
+    }
+    banco = {"basico": [], "intermedio": [], "avanzado": []}
+    procesadas = procesar_json.normalizar_lecturas(escaladas, banco)
+    return {"elementos": procesadas}
+
+
+def bench_subida(libro, escala, opciones, tmp):
+    import subir_a_firestore
+
+    # Copias de lecturas_finales y del banco con nombres únicos por copia
+    lecturas_dir = os.path.join(tmp, "lecturas")
+    os.makedirs(lecturas_dir)
+    with open(subir_a_firestore.BANCO_PREGUNTAS_JSON, "r", encoding="utf-8") as f:
+        banco = json.load(f)
+    banco_escalado = {nivel: [] for nivel in banco}
+    for c in range(escala * FACTOR_LECTURAS_FINALES):
+        sufijo = "" if c == 0 else f" ({c})"
+        for archivo in os.listdir(subir_a_firestore.LECTURAS_DIR):
+            if archivo.endswith(".txt"):
+                with open(os.path.join(subir_a_firestore.LECTURAS_DIR, archivo), "r", encoding="utf-8") as f:
+                    lineas = f.read().split("\n")
+                lineas[0] += sufijo
+                nombre = os.path.splitext(archivo)[0] + sufijo + ".txt"
+                with open(os.path.join(lecturas_dir, nombre), "w", encoding="utf-8") as f:
+                    f.write("\n".join(lineas))
+        for nivel, preguntas in banco.items():
+            banco_escalado[nivel] += [dict(p, origen=p["origen"] + sufijo) for p in preguntas]
+    ruta_banco = os.path.join(tmp, "banco.json")
+    with open(ruta_banco, "w", encoding="utf-8") as f:
+        json.dump(banco_escalado, f, ensure_ascii=False)
+
+    originales = (subir_a_firestore.LECTURAS_DIR, subir_a_firestore.BANCO_PREGUNTAS_JSON)
+    subir_a_firestore.LECTURAS_DIR, subir_a_firestore.BANCO_PREGUNTAS_JSON = lecturas_dir, ruta_banco
+    db = FirestoreFalso()
+    try:
+        subir_a_firestore.subir_lecturas(db)
+    finally:
+        subir_a_firestore.LECTURAS_DIR, subir_a_firestore.BANCO_PREGUNTAS_JSON = originales
+    return {"elementos": len(os.listdir(lecturas_dir)), "escrituras_firestore": db.escrituras}
+
+
+FUNCIONES = {
+    "descarga": bench_descarga,
+    "extraccion": bench_extraccion,
+    "extraccion_sincrona": bench_extraccion_sincrona,
+    "limpieza": bench_limpieza,
+    "limpieza_una_llamada": bench_limpieza_una_llamada,
+    "generacion": bench_generacion,
+    "generacion_empaquetada": bench_generacion_empaquetada,
+    "normalizacion": bench_normalizacion,
+    "subida": bench_subida,
+}
+
+
+def correr_etapa(nombre, libro, escala, opciones, servidor_llm):
+    """Corre una etapa a una escala y devuelve su resultado (sin la salida de los scripts)"""
+    resultado = {"etapa": nombre, "escala": escala}
+    solicitudes_previas = (servidor_llm.solicitudes, servidor_llm.respuestas_429)
+    with tempfile.TemporaryDirectory() as tmp:
+        inicio = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                resultado.update(FUNCIONES[nombre](libro, escala, opciones, tmp))
+        except ImportError as e:
+            resultado["omitida"] = f"falta dependencia: {e.name}"
+            return resultado
+        except Exception as e:
+            resultado["error"] = repr(e)
+        duracion = time.perf_counter() - inicio
+
+    resultado["duracion_s"] = round(duracion, 4)
+    if resultado.get("elementos"):
+        resultado["por_segundo"] = round(resultado["elementos"] / duracion, 2)
+    if nombre in ("limpieza", "limpieza_una_llamada", "generacion", "generacion_empaquetada"):
+        resultado["solicitudes_llm"] = servidor_llm.solicitudes - solicitudes_previas[0]
+        resultado["respuestas_429"] = servidor_llm.respuestas_429 - solicitudes_previas[1]
+    return resultado
+
+
+def entorno():
+    """Datos de la máquina y del código para poder comparar resultados"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline con servicios falsos")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100], help="Múltiplos del corpus actual")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--latencia-llm", type=float, default=0.05, help="Segundos por respuesta del LLM falso")
+    parser.add_argument("--latencia-token-llm", type=float, default=0.0,
+                        help="Segundos por token generado por el LLM falso (0 = latencia fija)")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de solicitudes LLM con 429")
+    parser.add_argument("--tasa-throttling", type=float, default=0.0,
+                        help="Fracción de llamadas a Textract síncrono que responden ThrottlingException")
+    parser.add_argument("--hilos-llm", type=int, default=1, help="Solicitudes LLM simultáneas (1 = como los scripts)")
+    parser.add_argument("--hilos-descarga", type=int, default=16)
+    parser.add_argument("--proveedor", action="append", default=[], metavar="TAREA=PROVEEDOR",
+                        help="Rutas de proveedores_llm, p. ej. todas=local (mismos prompts con otro proveedor)")
+    parser.add_argument("--url-local", help="Servidor del proveedor local (por defecto el LLM falso)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    opciones = parser.parse_args()
+
+    libro = registro_libros.seleccionar_libros([LIBRO_BASE])[0]
+
+    with ServidorOpenAIFalso(latencia=opciones.latencia_llm, tasa_429=opciones.tasa_429,
+                             latencia_token=opciones.latencia_token_llm) as servidor_llm:
+        # Los scripts crean el cliente de OpenAI en la primera llamada: apuntarlo al servidor falso
+        os.environ["OPENAI_BASE_URL"] = servidor_llm.base_url
+        os.environ["OPENAI_API_KEY"] = "clave-falsa"
+        import proveedores_llm
+        proveedores_llm.PROVEEDORES["local"]["base_url"] = opciones.url_local or servidor_llm.base_url
+        # LLM_RUTAS pudo haber creado ya el proveedor con la URL anterior
+        proveedores_llm.proveedor.cache_clear()
+        proveedores_llm.configurar_rutas(opciones.proveedor)
+
+        resultados = []
+        for escala in opciones.escalas:
+            for nombre in opciones.etapas:
+                print(f"⏱️  {nombre} ×{escala}...", end=" ", flush=True)
+                r = correr_etapa(nombre, libro, escala, opciones, servidor_llm)
+                resultados.append(r)
+                if "omitida" in r:
+                    print(f"omitida ({r['omitida']})")
+                elif "error" in r:
+                    print(f"❌ {r['error']}")
+                else:
+                    print(f"{r['duracion_s']:.2f} s ({r.get('por_segundo', 0)}/s)")
+
+    datos = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": entorno(),
+        "parametros": {k: v for k, v in vars(opciones).items() if k != "salida"},
+        "resultados": resultados,
+    }
+    salida = opciones.salida or os.path.join(RESULTADOS_DIR, f"benchmark_{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Índice de búsqueda de texto completo sobre lecturas y bancos de preguntas
+Usa SQLite FTS5 con plegado de acentos y una raíz ligera en español.
+
+El índice se actualiza de forma incremental: solo se vuelven a indexar los
+archivos cuyo contenido cambió desde la última construcción.
+
+Uso:
+    python3 buscar_contenido.py "chinampas"
+    python3 buscar_contenido.py "arañas venenosas" --tipo vof --limite 5
+    python3 buscar_contenido.py --reconstruir
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+from ingesta import leer_texto, nfc
+
+# === CONFIGURACIÓN ===
+INDICE_DB = "indice_busqueda.sqlite"
+LECTURAS_DIR = "lecturas_finales"
+BANCO_VOF_JSON = "banco_verdadero_falso.json"
+BANCO_OPCION_MULTIPLE_JSON = os.path.join("libro_paginas_cuarto", "banco_preguntas.json")
+
+MAPEO_NIVELES = {
+    "basico": "fácil",
+    "intermedio": "intermedia",
+    "avanzado": "difícil"
+}
+
+# Sufijos derivativos que se recortan antes de quitar plural y género
+SUFIJOS = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento",
+    "idades", "mente", "acion", "ucion", "ismos", "istas", "ables", "ibles",
+    "idad", "ismo", "ista", "able", "ible",
+)
+
+PATRON_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def quitar_acentos(texto):
+    """Convierte a minúsculas y elimina acentos y diéresis (la ñ se conserva)"""
+    texto = unicodedata.normalize("NFD", texto.lower())
+    texto = texto.replace("ñ", "ñ")
+    return "".join(c for c in texto if unicodedata.category(c) != "Mn")
+
+
+def raiz(palabra):
+    """Raíz ligera en español: sufijos comunes, plural y vocal de género"""
+    p = quitar_acentos(palabra)
+    for sufijo in SUFIJOS:
+        if p.endswith(sufijo) and len(p) - len(sufijo) >= 3:
+            p = p[:-len(sufijo)]
+            break
+    if p.endswith("es") and len(p) > 4:
+        p = p[:-2]
+    elif p.endswith("s") and len(p) > 3:
+        p = p[:-1]
+    if p[-1:] in ("a", "e", "o") and len(p) > 3:
+        p = p[:-1]
+    return p
+
+
+def raices(texto):
+    """Devuelve el texto convertido a una secuencia de raíces separadas por espacio"""
+    return " ".join(raiz(p) for p in PATRON_PALABRA.findall(texto))
+
+
+def conectar(db_path=INDICE_DB):
+    """Abre el índice y crea las tablas si no existen"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS fuentes (
+            ruta TEXT PRIMARY KEY,
+            mtime REAL,
+            tamano INTEGER,
+            sha1 TEXT
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS documentos USING fts5(
+            titulo UNINDEXED,
+            texto UNINDEXED,
+            tipo UNINDEXED,
+            origen UNINDEXED,
+            fuente UNINDEXED,
+            raices_titulo,
+            raices_texto,
+            tokenize = "unicode61 remove_diacritics 2"
+        );
+    """)
+    return conn
+
+
+# === EXTRACCIÓN DE DOCUMENTOS POR TIPO DE FUENTE ===
+
+def documentos_de_lectura(ruta):
+    """Una lectura de lecturas_finales produce un único documento"""
+    contenido = leer_texto(ruta).strip()
+    lineas = contenido.split("\n")
+    titulo = lineas[0].strip() if lineas else "Sin título"
+    origen = nfc(os.path.splitext(os.path.basename(ruta))[0])
+    yield titulo, contenido, "lectura", origen
+
+
+def documentos_de_banco_vof(ruta):
+    """Cada afirmación del banco de verdadero/falso es un documento"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        banco = json.load(f)
+    for nivel, preguntas in banco.items():
+        dificultad = MAPEO_NIVELES.get(nivel, nivel)
+        for pregunta in preguntas:
+            respuesta = "Verdadero" if pregunta["respuesta"] else "Falso"
+            texto = f"{pregunta['afirmacion']} ({dificultad}, {respuesta})"
+            yield pregunta["afirmacion"], texto, "vof", pregunta["origen"]
+
+
+def documentos_de_banco_opcion_multiple(ruta):
+    """Cada pregunta de opción múltiple (con sus opciones) es un documento"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        banco = json.load(f)
+    for lectura in banco:
+        for pregunta in lectura.get("preguntas", []):
+            texto = pregunta["pregunta"] + "\n" + "\n".join(pregunta.get("opciones", []))
+            yield pregunta["pregunta"], texto, "opcion_multiple", lectura["lectura"]
+
+
+def listar_fuentes():
+    """Lista (ruta, extractor) de todos los archivos que alimentan el índice"""
+    fuentes = []
+    if os.path.isdir(LECTURAS_DIR):
+        for archivo in sorted(os.listdir(LECTURAS_DIR)):
+            if archivo.endswith(".txt"):
+                fuentes.append((os.path.join(LECTURAS_DIR, archivo), documentos_de_lectura))
+    if os.path.exists(BANCO_VOF_JSON):
+        fuentes.append((BANCO_VOF_JSON, documentos_de_banco_vof))
+    if os.path.exists(BANCO_OPCION_MULTIPLE_JSON):
+        fuentes.append((BANCO_OPCION_MULTIPLE_JSON, documentos_de_banco_opcion_multiple))
+    return fuentes
+
+
+def sha1_archivo(ruta):
+    """Calcula el SHA-1 del contenido de un archivo"""
+    h = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def construir_indice(db_path=INDICE_DB, reconstruir=False):
+    """Actualiza el índice; solo reindexa fuentes nuevas o modificadas"""
+    conn = conectar(db_path)
+    if reconstruir:
+        conn.execute("DELETE FROM documentos")
+        conn.execute("DELETE FROM fuentes")
+
+    registradas = {
+        ruta: (mtime, tamano, sha1)
+        for ruta, mtime, tamano, sha1 in conn.execute("SELECT ruta, mtime, tamano, sha1 FROM fuentes")
+    }
+    resumen = {"indexadas": 0, "sin_cambios": 0, "eliminadas": 0, "documentos": 0}
+
+    fuentes = listar_fuentes()
+    with conn:
+        for ruta, extractor in fuentes:
+            stat = os.stat(ruta)
+            previa = registradas.get(ruta)
+            if previa and previa[0] == stat.st_mtime and previa[1] == stat.st_size:
+                resumen["sin_cambios"] += 1
+                continue
+
+            sha1 = sha1_archivo(ruta)
+            if previa and previa[2] == sha1:
+                # Solo cambió la fecha de modificación
+                conn.execute("UPDATE fuentes SET mtime = ?, tamano = ? WHERE ruta = ?",
+                             (stat.st_mtime, stat.st_size, ruta))
+                resumen["sin_cambios"] += 1
+                continue
+
+            conn.execute("DELETE FROM documentos WHERE fuente = ?", (ruta,))
+            filas = [
+                (titulo, texto, tipo, origen, ruta, raices(titulo), raices(texto))
+                for titulo, texto, tipo, origen in extractor(ruta)
+            ]
+            conn.executemany(
+                "INSERT INTO documentos (titulo, texto, tipo, origen, fuente, raices_titulo, raices_texto) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                filas
+            )
+            conn.execute("INSERT OR REPLACE INTO fuentes (ruta, mtime, tamano, sha1) VALUES (?, ?, ?, ?)",
+                         (ruta, stat.st_mtime, stat.st_size, sha1))
+            resumen["indexadas"] += 1
+            resumen["documentos"] += len(filas)
+
+        # Quitar del índice los archivos que ya no existen
+        vigentes = {ruta for ruta, _ in fuentes}
+        for ruta in registradas:
+            if ruta not in vigentes:
+                conn.execute("DELETE FROM documentos WHERE fuente = ?", (ruta,))
+                conn.execute("DELETE FROM fuentes WHERE ruta = ?", (ruta,))
+                resumen["eliminadas"] += 1
+
+    conn.close()
+    return resumen
+
+
+def fragmento(texto, terminos, ancho=60):
+    """Extrae un fragmento del texto alrededor de la primera coincidencia"""
+    plano = quitar_acentos(texto)
+    posiciones = [plano.find(t) for t in terminos if plano.find(t) >= 0]
+    if not posiciones:
+        return texto[:ancho * 2].replace("\n", " ")
+    inicio = max(min(posiciones) - ancho, 0)
+    corte = texto[inicio:inicio + ancho * 2].replace("\n", " ")
+    return ("…" if inicio > 0 else "") + corte + "…"
+
+
+def buscar(consulta, tipo=None, limite=10, db_path=INDICE_DB):
+    """
+    Busca en el índice y devuelve resultados ordenados por relevancia (BM25)
+    Cada resultado es un dict con titulo, tipo, origen, fuente, puntaje y fragmento.
+    """
+    terminos = [raiz(p) for p in PATRON_PALABRA.findall(consulta)]
+    terminos = [t for t in terminos if t]
+    if not terminos:
+        return []
+
+    expresion = "{raices_titulo raices_texto} : (" + " ".join(f'"{t}"*' for t in terminos) + ")"
+    sql = (
+        "SELECT titulo, texto, tipo, origen, fuente, bm25(documentos, 0, 0, 0, 0, 0, 4.0, 1.0) AS puntaje "
+        "FROM documentos WHERE documentos MATCH ?"
+    )
+    parametros = [expresion]
+    if tipo:
+        sql += " AND tipo = ?"
+        parametros.append(tipo)
+    sql += " ORDER BY puntaje LIMIT ?"
+    parametros.append(limite)
+
+    conn = conectar(db_path)
+    try:
+        filas = conn.execute(sql, parametros).fetchall()
+    finally:
+        conn.close()
+
+    return [
+        {
+            "titulo": titulo,
+            "tipo": tipo_doc,
+            "origen": origen,
+            "fuente": fuente,
+            "puntaje": round(-puntaje, 3),
+            "fragmento": fragmento(texto, terminos),
+        }
+        for titulo, texto, tipo_doc, origen, fuente, puntaje in filas
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Búsqueda de texto completo en lecturas y preguntas")
+    parser.add_argument("consulta", nargs="?", help="Palabras a buscar")
+    parser.add_argument("--tipo", choices=["lectura", "vof", "opcion_multiple"], help="Filtrar por tipo de documento")
+    parser.add_argument("--limite", type=int, default=10, help="Número máximo de resultados")
+    parser.add_argument("--reconstruir", action="store_true", help="Reconstruye el índice desde cero")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = construir_indice(reconstruir=args.reconstruir)
+    if resumen["indexadas"] or resumen["eliminadas"]:
+        print(f"🗂️  Índice actualizado: {resumen['indexadas']} fuentes reindexadas, "
+              f"{resumen['documentos']} documentos, {resumen['eliminadas']} eliminadas "
+              f"({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+
+    if not args.consulta:
+        return
+
+    inicio = time.perf_counter()
+    resultados = buscar(args.consulta, tipo=args.tipo, limite=args.limite)
+    duracion = (time.perf_counter() - inicio) * 1000
+
+    print(f"🔍 {len(resultados)} resultados para '{args.consulta}' ({duracion:.1f} ms)\n")
+    for i, r in enumerate(resultados, 1):
+        print(f"{i}. [{r['tipo']}] {r['titulo'][:70]}  ({r['origen']}, {r['puntaje']})")
+        print(f"   {r['fragmento']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,6 @@ Ejemplo de cómo leer datos desde Firestore
 Este script muestra cómo consultar y usar los datos subidos
 """
 
-from firebase_admin import credentials, firestore, initialize_app
 import os
 
 FIREBASE_CREDENTIALS = "firebase-credentials.json"
@@ -16,6 +15,7 @@ def inicializar_firebase():
         return None
     
     try:
+        from firebase_admin import credentials, firestore, initialize_app
         cred = credentials.Certificate(FIREBASE_CREDENTIALS)
         initialize_app(cred)
         db = firestore.client()
@@ -0,0 +1,189 @@
+"""
+Acceso asíncrono a las lecturas en Firestore para lectores con mucha concurrencia
+
+Usa un solo AsyncClient (una sola conexión gRPC reutilizada) y un semáforo que
+limita las solicitudes simultáneas. Las lecturas múltiples usan get_all, que
+trae varios documentos en una sola llamada.
+
+Ejemplo:
+    async with LectorLecturasAsync() as lector:
+        lecturas = await lector.obtener_lecturas(["Amoxcalli, la casa de los libros", "Las Arañas"])
+        faciles = await lector.obtener_preguntas("Las Arañas", dificultad="fácil")
+
+Benchmark contra el emulador (compara con la ruta síncrona de ejemplo_leer_firestore.py):
+    python3 firestore_async.py --emulador localhost:8080 --solicitudes 2000 --concurrencia 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+# === CONFIGURACIÓN ===
+FIREBASE_CREDENTIALS = "firebase-credentials.json"
+COLECCION = "lecturas"
+CONCURRENCIA_MAXIMA = 64     # solicitudes simultáneas por cliente
+DOCUMENTOS_POR_GET_ALL = 100
+PROYECTO_EMULADOR = "demo-tt-b159"
+
+
+def crear_cliente_async(proyecto=None):
+    """AsyncClient contra el emulador (si FIRESTORE_EMULATOR_HOST está definido) o producción"""
+    from google.cloud.firestore import AsyncClient
+
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        return AsyncClient(project=proyecto or PROYECTO_EMULADOR)
+
+    from google.oauth2 import service_account
+    credenciales = service_account.Credentials.from_service_account_file(FIREBASE_CREDENTIALS)
+    with open(FIREBASE_CREDENTIALS, "r", encoding="utf-8") as f:
+        proyecto = proyecto or json.load(f)["project_id"]
+    return AsyncClient(project=proyecto, credentials=credenciales)
+
+
+class LectorLecturasAsync:
+    """Lecturas y preguntas desde Firestore con un cliente compartido y concurrencia acotada"""
+
+    def __init__(self, cliente=None, concurrencia=CONCURRENCIA_MAXIMA, coleccion=COLECCION):
+        self.cliente = cliente or crear_cliente_async()
+        self.coleccion = coleccion
+        self._semaforo = asyncio.Semaphore(concurrencia)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+    async def cerrar(self):
+        """Cierra el canal gRPC del cliente"""
+        resultado = self.cliente.close()
+        if asyncio.iscoroutine(resultado):
+            await resultado
+
+    async def obtener_lectura(self, nombre):
+        """Documento de una lectura como dict (None si no existe)"""
+        async with self._semaforo:
+            doc = await self.cliente.collection(self.coleccion).document(nombre).get()
+        return doc.to_dict() if doc.exists else None
+
+    async def _get_all(self, nombres):
+        refs = [self.cliente.collection(self.coleccion).document(n) for n in nombres]
+        async with self._semaforo:
+            return {doc.id: doc.to_dict() async for doc in self.cliente.get_all(refs) if doc.exists}
+
+    async def obtener_lecturas(self, nombres):
+        """Varias lecturas a la vez: {nombre: dict}; las que no existen se omiten"""
+        grupos = [nombres[i:i + DOCUMENTOS_POR_GET_ALL] for i in range(0, len(nombres), DOCUMENTOS_POR_GET_ALL)]
+        resultados = {}
+        for parcial in await asyncio.gather(*(self._get_all(g) for g in grupos)):
+            resultados.update(parcial)
+        return resultados
+
+    async def obtener_preguntas(self, nombre, dificultad=None):
+        """preguntas_vof de una lectura, opcionalmente filtradas por dificultad"""
+        lectura = await self.obtener_lectura(nombre)
+        if lectura is None:
+            return []
+        preguntas = lectura.get("preguntas_vof", [])
+        if dificultad:
+            preguntas = [p for p in preguntas if p["dificultad"] == dificultad]
+        return preguntas
+
+    async def obtener_preguntas_de(self, nombres, dificultad=None):
+        """Preguntas de varias lecturas a la vez: {nombre: [preguntas]}"""
+        lecturas = await self.obtener_lecturas(nombres)
+        return {
+            nombre: [p for p in datos.get("preguntas_vof", []) if not dificultad or p["dificultad"] == dificultad]
+            for nombre, datos in lecturas.items()
+        }
+
+    async def listar_ids(self):
+        """IDs de todas las lecturas"""
+        async with self._semaforo:
+            return [doc.id async for doc in self.cliente.collection(self.coleccion).select([]).stream()]
+
+
+# === BENCHMARK ===
+
+def percentiles(latencias):
+    """p50, p99 y máximo en milisegundos"""
+    ordenadas = sorted(latencias)
+    p99 = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))]
+    return {
+        "p50_ms": round(statistics.median(ordenadas) * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "max_ms": round(ordenadas[-1] * 1000, 2),
+    }
+
+
+def benchmark_sincrono(ids, solicitudes, proyecto):
+    """Ruta actual: firestore.Client y un get() a la vez"""
+    from google.cloud import firestore
+
+    db = firestore.Client(project=proyecto)
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(solicitudes):
+        t0 = time.perf_counter()
+        db.collection(COLECCION).document(ids[i % len(ids)]).get()
+        latencias.append(time.perf_counter() - t0)
+    total = time.perf_counter() - inicio
+    db.close()
+    return {**percentiles(latencias), "por_segundo": round(solicitudes / total, 1)}
+
+
+async def benchmark_async(ids, solicitudes, concurrencia, proyecto):
+    """Muchos estudiantes pidiendo lecturas a la vez sobre un solo AsyncClient"""
+    async with LectorLecturasAsync(crear_cliente_async(proyecto), concurrencia=concurrencia) as lector:
+        latencias = []
+
+        async def solicitud(i):
+            t0 = time.perf_counter()
+            await lector.obtener_lectura(ids[i % len(ids)])
+            latencias.append(time.perf_counter() - t0)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(solicitud(i) for i in range(solicitudes)))
+        total = time.perf_counter() - inicio
+    return {**percentiles(latencias), "por_segundo": round(solicitudes / total, 1)}
+
+
+async def _listar(proyecto):
+    async with LectorLecturasAsync(crear_cliente_async(proyecto)) as lector:
+        return await lector.listar_ids()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de lectura async vs síncrona contra el emulador")
+    parser.add_argument("--emulador", default=os.environ.get("FIRESTORE_EMULATOR_HOST", "localhost:8080"),
+                        help="host:puerto del emulador de Firestore")
+    parser.add_argument("--proyecto", default=PROYECTO_EMULADOR)
+    parser.add_argument("--solicitudes", type=int, default=1000)
+    parser.add_argument("--concurrencia", type=int, default=CONCURRENCIA_MAXIMA)
+    args = parser.parse_args()
+
+    # El benchmark nunca corre contra producción
+    os.environ["FIRESTORE_EMULATOR_HOST"] = args.emulador
+
+    ids = asyncio.run(_listar(args.proyecto))
+    if not ids:
+        print("❌ La colección está vacía en el emulador.")
+        print("   Cárgala con: python3 respaldo_firestore.py restaurar --emulador", args.emulador)
+        return
+
+    print(f"📊 {args.solicitudes} lecturas de documentos ({len(ids)} lecturas distintas)\n")
+    resultados = {
+        "síncrono (un get a la vez)": benchmark_sincrono(ids, args.solicitudes, args.proyecto),
+        f"async (concurrencia {args.concurrencia})": asyncio.run(
+            benchmark_async(ids, args.solicitudes, args.concurrencia, args.proyecto)),
+    }
+    for nombre, r in resultados.items():
+        print(f"   • {nombre:<28} p50 {r['p50_ms']:>8.2f} ms   p99 {r['p99_ms']:>8.2f} ms   "
+              f"{r['por_segundo']:>8.1f} lecturas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,36 @@
+import argparse
 import os
 import json
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
 
-# Inicializa el cliente
-client = OpenAI()
+from ingesta import leer_lecturas
+from instrumentacion import etapa, finalizar, iniciar
+from proveedores_llm import completar, configurar_rutas
+from puntos_control import PuntosControl
+from registro_libros import ruta_banco_preguntas, seleccionar_libros
 
-# Carpeta con las lecturas
-LECTURAS_DIR = "lecturas_txt"
-OUT_FILE = "banco_preguntas.json"
 
 # Parámetros
 N_PREGUNTAS = 6  # puedes ajustarlo
 
-def generar_preguntas(nombre_lectura, texto):
+# Empaquetado: varias lecturas cortas en una sola llamada
+CARACTERES_POR_TOKEN = 4           # estimación para texto en español
+TOKENS_LECTURA_CORTA = 600         # ~1-2 páginas; las más largas van solas
+PRESUPUESTO_TOKENS_PAQUETE = 3000  # tokens de lecturas por llamada
+MAX_LECTURAS_PAQUETE = 6           # cada lectura necesita ~800 tokens de salida
+TOKENS_SALIDA_POR_LECTURA = 800
+
+
+def _parsear_json(content):
+    """Quita el bloque Markdown (caso típico: ```json {...} ```) y parsea el JSON"""
+    if content.startswith("```"):
+        content = content.strip().strip("`")
+        if content.lower().startswith("json"):
+            content = content[4:].strip()
+    return json.loads(content)
+
+
+def generar_preguntas(nombre_lectura, texto, registro=None):
     """Genera preguntas de opción múltiple con GPT-4o-mini"""
     prompt = f"""
 Eres un generador automático de exámenes escolares.
@@ -44,54 +62,190 @@ Lectura:
 {texto}
 \"\"\"
 """
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-        max_tokens=800
-    )
+    contenido = completar("preguntas_om", prompt, registro, temperature=0.7, max_tokens=800)
 
     # Intentar parsear el JSON
     try:
-        content = response.choices[0].message.content
-
-        # 👇 Limpieza del bloque Markdown (caso típico: ```json {...} ```)
-        if content.startswith("```"):
-            content = content.strip().strip("`")
-            if content.lower().startswith("json"):
-                content = content[4:].strip()
-
-        data = json.loads(content)
-        return data
+        return _parsear_json(contenido)
 
     except Exception as e:
         print(f"⚠️ Error al parsear JSON para {nombre_lectura}: {e}")
-        print("Respuesta cruda del modelo:\n", response.choices[0].message.content)
+        print("Respuesta cruda del modelo:\n", contenido)
         return None
 
 
-def main():
-    banco = []
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
 
-    for filename in os.listdir(LECTURAS_DIR):
-        if not filename.endswith(".txt"):
+def empaquetar(lecturas, presupuesto=PRESUPUESTO_TOKENS_PAQUETE):
+    """
+    Agrupa las lecturas cortas en paquetes de hasta presupuesto tokens (first-fit
+    decreciente). Devuelve una lista de paquetes [(nombre, texto), ...]; las
+    lecturas largas quedan en paquetes de una sola.
+    """
+    paquetes, usados = [], []
+    for nombre, texto in sorted(lecturas.items(), key=lambda x: -estimar_tokens(x[1])):
+        tokens = estimar_tokens(texto)
+        if tokens > TOKENS_LECTURA_CORTA:
+            paquetes.append([(nombre, texto)])
+            usados.append(presupuesto)
             continue
-        lectura_name = os.path.splitext(filename)[0]
-        path = os.path.join(LECTURAS_DIR, filename)
-        print(f"📘 Generando preguntas para: {lectura_name}")
+        for i, paquete in enumerate(paquetes):
+            if usados[i] + tokens <= presupuesto and len(paquete) < MAX_LECTURAS_PAQUETE:
+                paquete.append((nombre, texto))
+                usados[i] += tokens
+                break
+        else:
+            paquetes.append([(nombre, texto)])
+            usados.append(tokens)
+    return paquetes
+
+
+def generar_preguntas_paquete(paquete, registro=None):
+    """
+    Genera las preguntas de varias lecturas en una sola llamada. Cada lectura va
+    marcada con un ID (L1, L2, ...) que el modelo repite en su respuesta.
+    Devuelve {nombre: data} solo con las lecturas que vinieron bien formadas; para
+    las que no se pudo sacar ninguna pregunta, data es None.
+    """
+    ids = {f"L{i}": nombre for i, (nombre, _) in enumerate(paquete, 1)}
+    bloques = "\n\n".join(f'=== L{i} ===\n"""\n{texto}\n"""' for i, (_, texto) in enumerate(paquete, 1))
+    prompt = f"""
+Eres un generador automático de exámenes escolares.
+Abajo hay {len(paquete)} lecturas, cada una marcada con un ID. Para CADA lectura crea {N_PREGUNTAS} preguntas de opción múltiple.
 
-        with open(path, "r", encoding="utf-8") as f:
-            texto = f.read()
+Instrucciones:
+- Crea preguntas claras y relevantes sobre el contenido.
+- Cada pregunta debe tener 4 opciones (A, B, C, D).
+- Marca la respuesta correcta.
+- Toma en cuenta que los textos fueron extraidos mediante OCR, por lo que puede haber errores tipográficos.
+- Las preguntas de cada lectura deben poder responderse solo con la información de esa lectura.
+- En caso que una lectura sea muy corta, genera {N_PREGUNTAS - 4} preguntas; si no puedes sacar ninguna, deja su lista de preguntas vacía.
+- Responde estrictamente en formato JSON con esta estructura, con una entrada por ID:
 
-        data = generar_preguntas(lectura_name, texto)
-        if data:
-            banco.append(data)
+{{
+  "lecturas": [
+    {{
+      "id": "L1",
+      "preguntas": [
+        {{
+          "pregunta": "...",
+          "opciones": ["A) ...", "B) ...", "C) ...", "D) ..."],
+          "respuesta_correcta": "B"
+        }},
+        ...
+      ]
+    }},
+    ...
+  ]
+}}
+
+Lecturas:
+{bloques}
+"""
+    contenido = completar("preguntas_om", prompt, registro, temperature=0.7,
+                          max_tokens=TOKENS_SALIDA_POR_LECTURA * len(paquete))
 
-    # Guardar todo en un JSON
-    with open(OUT_FILE, "w", encoding="utf-8") as f:
+    try:
+        entradas = _parsear_json(contenido)["lecturas"]
+    except Exception as e:
+        print(f"⚠️ Error al parsear JSON del paquete {list(ids.values())}: {e}")
+        return {}
+
+    resultados = {}
+    for entrada in entradas:
+        nombre = ids.get(entrada.get("id")) if isinstance(entrada, dict) else None
+        preguntas = entrada.get("preguntas") if nombre else None
+        if nombre is None or not isinstance(preguntas, list):
+            continue
+        if all(isinstance(p, dict) and len(p.get("opciones", [])) == 4 and p.get("respuesta_correcta")
+               for p in preguntas):
+            resultados[nombre] = {"lectura": nombre, "preguntas": preguntas} if preguntas else None
+    return resultados
+
+
+def generar_banco(lecturas, empaquetado=True, presupuesto=PRESUPUESTO_TOKENS_PAQUETE, prefijo="", puntos=None):
+    """
+    Genera las preguntas de {nombre: texto}. Con empaquetado, las lecturas cortas
+    se piden juntas y solo las que fallan se vuelven a pedir una por una.
+    Con puntos (PuntosControl), cada lectura terminada con éxito se guarda al
+    momento y las que ya tenían punto de control no se vuelven a pedir.
+    Devuelve la lista de resultados en el orden de lecturas.
+    """
+    resultados, pendientes_corrida = puntos.pendientes(lecturas) if puntos else ({}, lecturas)
+    if resultados:
+        print(f"↩️  {prefijo}{len(resultados)} lecturas recuperadas de los puntos de control, "
+              f"faltan {len(pendientes_corrida)}")
+
+    def terminar(nombre, data):
+        resultados[nombre] = data
+        # Las lecturas que fallaron no se guardan: al reanudar se vuelven a pedir
+        if puntos and data is not None:
+            puntos.guardar(nombre, data, lecturas[nombre])
+
+    paquetes = (empaquetar(pendientes_corrida, presupuesto) if empaquetado
+                else [[l] for l in pendientes_corrida.items()])
+    for paquete in paquetes:
+        if len(paquete) > 1:
+            nombres = [n for n, _ in paquete]
+            print(f"📦 {prefijo}Generando preguntas para {len(paquete)} lecturas juntas: {', '.join(nombres)}")
+            with etapa("generacion_paquete", " + ".join(nombres)) as reg:
+                obtenidos = generar_preguntas_paquete(paquete, reg)
+                reg["lecturas"] = len(paquete)
+                reg["ok"] = len(obtenidos) == len(paquete)
+            for nombre, data in obtenidos.items():
+                terminar(nombre, data)
+            pendientes = [(n, t) for n, t in paquete if n not in obtenidos]
+            if pendientes:
+                print(f"   ↩️  {len(pendientes)} lecturas se vuelven a pedir por separado")
+        else:
+            pendientes = paquete
+
+        for lectura_name, texto in pendientes:
+            print(f"📘 {prefijo}Generando preguntas para: {lectura_name}")
+            with etapa("generacion", lectura_name) as reg:
+                data = generar_preguntas(lectura_name, texto, reg)
+                reg["ok"] = data is not None
+            terminar(lectura_name, data)
+
+    return [resultados[n] for n in lecturas if resultados.get(n)]
+
+
+def generar_banco_libro(libro, empaquetado=True, presupuesto=PRESUPUESTO_TOKENS_PAQUETE):
+    """Genera el banco de preguntas de todas las lecturas de un libro"""
+    lecturas_dir = libro["textos"]
+    out_file = ruta_banco_preguntas(libro)
+    banco = generar_banco(leer_lecturas(lecturas_dir), empaquetado, presupuesto, prefijo=f"[{libro['codigo']}] ",
+                          puntos=PuntosControl(libro["codigo"]))
+
+    # Guardar todo en un JSON (archivo temporal + rename: nunca queda a medias)
+    with open(out_file + ".tmp", "w", encoding="utf-8") as f:
         json.dump(banco, f, indent=2, ensure_ascii=False)
+    os.replace(out_file + ".tmp", out_file)
 
-    print(f"\n✅ Banco de preguntas guardado en {OUT_FILE}")
+    print(f"\n✅ Banco de preguntas guardado en {out_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera preguntas de opción múltiple por libro")
+    parser.add_argument("--libros", nargs="*", help="Códigos de libro (por defecto todos los de libros.json)")
+    parser.add_argument("--sin-empaquetar", action="store_true", help="Una llamada por lectura, aunque sea corta")
+    parser.add_argument("--presupuesto-tokens", type=int, default=PRESUPUESTO_TOKENS_PAQUETE,
+                        help="Tokens de lecturas por llamada al empaquetar lecturas cortas")
+    parser.add_argument("--run-id", help="Continuar una corrida interrumpida (ver corridas/)")
+    parser.add_argument("--proveedor", action="append", default=[], metavar="TAREA=PROVEEDOR",
+                        help="Proveedor de LLM por tarea, p. ej. preguntas_om=local (ver proveedores_llm.py)")
+    args = parser.parse_args()
+    configurar_rutas(args.proveedor)
+
+    libros = seleccionar_libros(args.libros)
+    run_id = iniciar("generar_preguntas", args.run_id)
+    print(f"🗂️  Corrida {run_id} (para reanudarla: --run-id {run_id})")
+    with ThreadPoolExecutor(max_workers=max(1, len(libros))) as pool:
+        list(pool.map(lambda libro: generar_banco_libro(libro, not args.sin_empaquetar, args.presupuesto_tokens),
+                      libros))
+    finalizar()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+"""
+Ingesta de archivos de lecturas: detección de codificación y normalización
+
+Los .txt llegan de OCR, de Textract y de ediciones a mano: algunos en latin-1 /
+cp1252, otros con BOM, con texto doblemente codificado ("AraÃ±as") o con los
+acentos en forma NFD. Todo eso se lleva a UTF-8 en forma NFC, y los nombres de
+archivo también a NFC, para que las búsquedas por nombre coincidan siempre.
+
+ingerir_directorio() (el paso explícito `pipeline.py ingest`) reescribe en su
+lugar los archivos que lo necesitan y guarda en <directorio>/.ingesta.json el
+hash y la fecha de cada archivo ya normalizado, así las corridas siguientes no
+vuelven a decodificar nada que no haya cambiado.
+leer_texto() / leer_lecturas() son el lector que usan los demás scripts: entregan
+el texto normalizado en memoria y nunca modifican los archivos.
+
+Uso:
+    python3 ingesta.py lecturas_finales lecturas_txt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+# === CONFIGURACIÓN ===
+INDICE = ".ingesta.json"
+# Señales de UTF-8 leído como cp1252/latin-1 y vuelto a guardar
+MOJIBAKE = re.compile(r"Ã[\x80-\xbf¡-ÿ]|â€|Â[\s¡-¿]")
+
+_memoria = {}
+
+
+def nfc(texto):
+    return unicodedata.normalize("NFC", texto)
+
+
+def clave_nombre(nombre):
+    """Clave para comparar nombres de lecturas: NFC, sin .txt, sin mayúsculas ni espacios extra"""
+    nombre = nfc(nombre).strip()
+    if nombre.lower().endswith(".txt"):
+        nombre = nombre[:-4]
+    return " ".join(nombre.split()).casefold()
+
+
+def reparar_mojibake(texto):
+    """Deshace la doble codificación UTF-8 -> cp1252 -> UTF-8 si la hay"""
+    if not MOJIBAKE.search(texto):
+        return texto
+    try:
+        return texto.encode("cp1252").decode("utf-8")
+    except UnicodeError:
+        return texto
+
+
+def decodificar(datos):
+    """Devuelve (texto, codificación detectada) de unos bytes"""
+    if datos.startswith(b"\xef\xbb\xbf"):
+        return datos[3:].decode("utf-8", errors="replace"), "utf-8-sig"
+    if datos.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return datos.decode("utf-16"), "utf-16"
+    try:
+        return datos.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        return datos.decode("cp1252"), "cp1252"
+    except UnicodeDecodeError:
+        # latin-1 decodifica cualquier byte
+        return datos.decode("latin-1"), "latin-1"
+
+
+def normalizar(datos):
+    """Bytes crudos -> (texto UTF-8 NFC con saltos \\n, codificación original)"""
+    texto, codificacion = decodificar(datos)
+    texto = reparar_mojibake(texto)
+    texto = texto.replace("\r\n", "\n").replace("\r", "\n")
+    return nfc(texto), codificacion
+
+
+def leer_texto(ruta):
+    """Lee un archivo de texto como UTF-8 NFC, cualquiera que sea su codificación"""
+    stat = os.stat(ruta)
+    firma = (stat.st_mtime_ns, stat.st_size)
+    guardado = _memoria.get(ruta)
+    if guardado and guardado[0] == firma:
+        return guardado[1]
+
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    # Camino rápido: la mayoría de los archivos ya son UTF-8 NFC
+    try:
+        texto = datos.decode("utf-8")
+        if texto.startswith("\ufeff") or "\r" in texto or not unicodedata.is_normalized("NFC", texto) \
+                or MOJIBAKE.search(texto):
+            texto = normalizar(datos)[0]
+    except UnicodeDecodeError:
+        texto = normalizar(datos)[0]
+    _memoria[ruta] = (firma, texto)
+    return texto
+
+
+def _cargar_indice(directorio):
+    ruta = os.path.join(directorio, INDICE)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _guardar_indice(directorio, indice):
+    ruta = os.path.join(directorio, INDICE)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=1)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def ingerir_directorio(directorio, extension=".txt"):
+    """
+    Normaliza en su lugar los archivos del directorio (contenido y nombre).
+    Devuelve un dict con cuántos se saltaron por caché, se reescribieron o renombraron.
+    """
+    indice = _cargar_indice(directorio)
+    conteo = {"en_cache": 0, "reescritos": 0, "renombrados": 0, "sin_cambios": 0}
+    vistos = set()
+
+    for archivo in sorted(os.listdir(directorio)):
+        if not archivo.endswith(extension):
+            continue
+        ruta = os.path.join(directorio, archivo)
+        stat = os.stat(ruta)
+        entrada = indice.get(archivo)
+        if entrada and entrada["mtime_ns"] == stat.st_mtime_ns and entrada["bytes"] == stat.st_size:
+            conteo["en_cache"] += 1
+            vistos.add(archivo)
+            continue
+
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        sha1 = hashlib.sha1(datos).hexdigest()
+        if entrada and entrada["sha1"] == sha1:
+            # Solo cambió la fecha: el contenido ya estaba normalizado
+            conteo["en_cache"] += 1
+        else:
+            texto, codificacion = normalizar(datos)
+            nuevos = texto.encode("utf-8")
+            if nuevos != datos:
+                with open(ruta + ".tmp", "wb") as f:
+                    f.write(nuevos)
+                os.replace(ruta + ".tmp", ruta)
+                print(f"   • {archivo}: {codificacion} -> UTF-8 NFC")
+                conteo["reescritos"] += 1
+                sha1 = hashlib.sha1(nuevos).hexdigest()
+            else:
+                conteo["sin_cambios"] += 1
+
+        nombre = nfc(archivo)
+        if nombre != archivo:
+            destino = os.path.join(directorio, nombre)
+            if os.path.exists(destino):
+                print(f"⚠️ {archivo!r}: ya existe {nombre!r} en forma NFC, se deja sin renombrar")
+                nombre = archivo
+            else:
+                os.replace(ruta, destino)
+                print(f"   • {archivo!r} renombrado a NFC")
+                conteo["renombrados"] += 1
+                ruta = destino
+
+        stat = os.stat(ruta)
+        indice[nombre] = {"sha1": sha1, "mtime_ns": stat.st_mtime_ns, "bytes": stat.st_size}
+        vistos.add(nombre)
+
+    _guardar_indice(directorio, {k: v for k, v in indice.items() if k in vistos})
+    return conteo
+
+
+def leer_lecturas(directorio, extension=".txt"):
+    """{nombre de archivo sin extensión (NFC): texto normalizado} en orden, sin tocar los archivos"""
+    return {
+        nfc(os.path.splitext(archivo)[0]): leer_texto(os.path.join(directorio, archivo))
+        for archivo in sorted(os.listdir(directorio), key=nfc) if archivo.endswith(extension)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normaliza a UTF-8 NFC los .txt de lecturas y sus nombres")
+    parser.add_argument("directorios", nargs="*", default=["lecturas_finales"])
+    args = parser.parse_args()
+
+    for directorio in args.directorios:
+        print(f"📂 {directorio}")
+        conteo = ingerir_directorio(directorio)
+        print("   " + ", ".join(f"{k.replace('_', ' ')}: {v}" for k, v in conteo.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Instrumentación compartida del pipeline: tiempos, reintentos, bytes, tokens y costo
+
+Cada script llama a iniciar() al arrancar y a finalizar() al terminar. El trabajo
+se envuelve en etapas:
+
+    with etapa("generacion", lectura=nombre) as reg:
+        contenido = completar("preguntas_om", prompt, reg)   # proveedores_llm
+
+Cada etapa terminada se agrega de inmediato a corridas/<run_id>/registro.jsonl
+(si el proceso se cae, lo medido hasta ese momento queda guardado). Al finalizar
+se escribe resumen.json y se imprime una tabla por etapa.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# === CONFIGURACIÓN ===
+CORRIDAS_DIR = "corridas"
+
+# Precios en USD por millón de tokens (entrada, salida)
+PRECIOS_MODELOS = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+# Campos numéricos que se suman en el resumen
+CAMPOS_SUMABLES = (
+    "reintentos", "bytes", "tokens_prompt", "tokens_completion",
+    "ops_firestore", "costo_usd",
+)
+
+_lock = threading.Lock()
+_estado = {"run_id": None, "script": None, "ruta_registro": None, "inicio": None, "registros": []}
+
+
+def iniciar(script, run_id=None):
+    """Abre una corrida nueva (o continúa una existente si se pasa su run_id)"""
+    run_id = run_id or f"{script}_{datetime.now():%Y%m%d-%H%M%S}"
+    directorio = os.path.join(CORRIDAS_DIR, run_id)
+    os.makedirs(directorio, exist_ok=True)
+    ruta_registro = os.path.join(directorio, "registro.jsonl")
+
+    # Al continuar una corrida, el resumen incluye también lo medido antes
+    registros = []
+    if os.path.exists(ruta_registro):
+        with open(ruta_registro, "r", encoding="utf-8") as f:
+            contenido = f.read()
+        for linea in contenido.splitlines():
+            try:
+                registros.append(json.loads(linea))
+            except json.JSONDecodeError:
+                pass  # última línea cortada por una caída
+        if contenido and not contenido.endswith("\n"):
+            with open(ruta_registro, "a", encoding="utf-8") as f:
+                f.write("\n")
+    with _lock:
+        _estado.update({
+            "run_id": run_id,
+            "script": script,
+            "ruta_registro": ruta_registro,
+            "inicio": time.perf_counter(),
+            "registros": registros,
+        })
+    return run_id
+
+
+def run_id_actual():
+    """ID de la corrida en curso (None si no se llamó a iniciar)"""
+    return _estado["run_id"]
+
+
+def costo_tokens(modelo, tokens_prompt, tokens_completion):
+    """Costo estimado en USD de una llamada; 0 si el modelo no tiene precio"""
+    entrada, salida = PRECIOS_MODELOS.get(modelo, (0.0, 0.0))
+    return (tokens_prompt * entrada + tokens_completion * salida) / 1_000_000
+
+
+def registrar_uso(registro, response, modelo="gpt-4o-mini"):
+    """Suma los tokens de response.usage (OpenAI) y su costo al registro de la etapa"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    registro["tokens_prompt"] += prompt
+    registro["tokens_completion"] += completion
+    registro["costo_usd"] += costo_tokens(modelo, prompt, completion)
+    registro["modelo"] = modelo
+
+
+def _guardar(registro):
+    with _lock:
+        _estado["registros"].append(registro)
+        if _estado["ruta_registro"]:
+            with open(_estado["ruta_registro"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def etapa(nombre, lectura=None):
+    """Mide una etapa; el dict que entrega se puede ir llenando con bytes, tokens, etc."""
+    registro = {
+        "etapa": nombre,
+        "lectura": lectura,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "ok": True,
+    }
+    registro.update({campo: 0 for campo in CAMPOS_SUMABLES})
+    registro["costo_usd"] = 0.0
+    t0 = time.perf_counter()
+    try:
+        yield registro
+    except BaseException as e:
+        registro["ok"] = False
+        registro["error"] = repr(e)
+        raise
+    finally:
+        registro["duracion_s"] = round(time.perf_counter() - t0, 4)
+        _guardar(registro)
+
+
+def resumen():
+    """Agrupa los registros de la corrida por etapa"""
+    por_etapa = {}
+    for r in _estado["registros"]:
+        fila = por_etapa.setdefault(r["etapa"], {"n": 0, "fallidas": 0, "duracion_s": 0.0, **{c: 0 for c in CAMPOS_SUMABLES}})
+        fila["n"] += 1
+        fila["fallidas"] += 0 if r["ok"] else 1
+        fila["duracion_s"] += r["duracion_s"]
+        for campo in CAMPOS_SUMABLES:
+            fila[campo] += r.get(campo, 0)
+
+    por_lectura = {}
+    for r in _estado["registros"]:
+        if r["lectura"] is not None:
+            fila = por_lectura.setdefault(str(r["lectura"]), {"duracion_s": 0.0, "costo_usd": 0.0})
+            fila["duracion_s"] += r["duracion_s"]
+            fila["costo_usd"] += r["costo_usd"]
+
+    # Llamadas a LLM por proveedor (proveedores_llm), para comparar rendimiento y costo
+    por_proveedor = {}
+    for r in _estado["registros"]:
+        if r.get("proveedor"):
+            fila = por_proveedor.setdefault(r["proveedor"], {"n": 0, "duracion_s": 0.0, "tokens_prompt": 0,
+                                                             "tokens_completion": 0, "costo_usd": 0.0})
+            fila["n"] += 1
+            fila["duracion_s"] += r["duracion_s"]
+            for campo in ("tokens_prompt", "tokens_completion", "costo_usd"):
+                fila[campo] += r.get(campo, 0)
+    for fila in por_proveedor.values():
+        fila["tokens_por_s"] = round(fila["tokens_completion"] / fila["duracion_s"], 1) if fila["duracion_s"] else 0.0
+
+    total = time.perf_counter() - _estado["inicio"] if _estado["inicio"] else 0.0
+    return {
+        "run_id": _estado["run_id"],
+        "script": _estado["script"],
+        "duracion_total_s": round(total, 3),
+        "etapas": por_etapa,
+        "lecturas": por_lectura,
+        "proveedores": por_proveedor,
+    }
+
+
+def imprimir_tabla(datos):
+    """Imprime el resumen por etapa como tabla"""
+    print(f"\n{'='*92}")
+    print(f"⏱️  Corrida {datos['run_id']} — {datos['duracion_total_s']:.1f} s en total")
+    print(f"{'─'*92}")
+    print(f"{'Etapa':<14}{'n':>6}{'fallas':>8}{'tiempo s':>11}{'reintentos':>12}{'MB':>9}"
+          f"{'tok in':>10}{'tok out':>10}{'ops FS':>8}{'USD':>9}")
+    for nombre, f in datos["etapas"].items():
+        print(f"{nombre:<14}{f['n']:>6}{f['fallidas']:>8}{f['duracion_s']:>11.2f}{f['reintentos']:>12}"
+              f"{f['bytes'] / 1e6:>9.2f}{f['tokens_prompt']:>10}{f['tokens_completion']:>10}"
+              f"{f['ops_firestore']:>8}{f['costo_usd']:>9.4f}")
+    if datos.get("proveedores"):
+        print(f"{'─'*92}")
+        print(f"{'Proveedor':<14}{'n':>6}{'tiempo s':>19}{'tok out/s':>12}{'tok in':>19}{'tok out':>10}{'USD':>17}")
+        for nombre, f in datos["proveedores"].items():
+            print(f"{nombre:<14}{f['n']:>6}{f['duracion_s']:>19.2f}{f['tokens_por_s']:>12}"
+                  f"{f['tokens_prompt']:>19}{f['tokens_completion']:>10}{f['costo_usd']:>17.4f}")
+    print(f"{'='*92}")
+
+
+def finalizar():
+    """Escribe resumen.json de la corrida e imprime la tabla; devuelve el resumen"""
+    datos = resumen()
+    if _estado["ruta_registro"]:
+        ruta = os.path.join(os.path.dirname(_estado["ruta_registro"]), "resumen.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+    if datos["etapas"]:
+        imprimir_tabla(datos)
+    return datos
+
+
+def cargar_resumen(run_id=None):
+    """resumen.json de una corrida guardada (la más reciente si no se indica); None si no hay"""
+    if run_id is None:
+        if not os.path.isdir(CORRIDAS_DIR):
+            return None
+        corridas = [d for d in os.listdir(CORRIDAS_DIR)
+                    if os.path.exists(os.path.join(CORRIDAS_DIR, d, "resumen.json"))]
+        if not corridas:
+            return None
+        run_id = max(corridas, key=lambda d: os.path.getmtime(os.path.join(CORRIDAS_DIR, d, "resumen.json")))
+    ruta = os.path.join(CORRIDAS_DIR, run_id, "resumen.json")
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -1,48 +1,168 @@
+import argparse
+import json
 import os
-import requests
-import img2pdf
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
-# Carpeta de salida
-OUT_DIR = "libro_paginas_cuarto"
+from instrumentacion import etapa, finalizar, iniciar
+from registro_libros import (paginas_necesarias, ruta_mapa_paginas, ruta_pagina, ruta_pdf, ruta_pdf_ocr,
+                             seleccionar_libros, url_pagina)
 
-PDF_PATH = os.path.join(OUT_DIR, "libro_cuarto.pdf")
-OUTPUT_PDF = os.path.join(OUT_DIR, "libro_cuarto_ocr.pdf")
-os.makedirs(OUT_DIR, exist_ok=True)
+# Descargas simultáneas (entre todos los libros)
+HILOS_DESCARGA = 16
 
-# URL base del libro
-BASE_URL = "https://libros.conaliteg.gob.mx/2024/c/P4MLA/{:03d}.jpg"
 
-# Rango de páginas (1 a 249)
-for i in range(1, 250):  # 250 no incluido
-    url = BASE_URL.format(i)
-    nombre_archivo = os.path.join(OUT_DIR, f"pagina_{i:03d}.jpg")
+def descargar_pagina(libro, i):
+    """Descarga una página si no existe en la carpeta del libro"""
+    import requests
+
+    url = url_pagina(libro, i)
+    nombre_archivo = ruta_pagina(libro, i)
     if os.path.exists(nombre_archivo):
-        print(f"Saltando {nombre_archivo}, ya existe.")
-        continue
-    try:
-        resp = requests.get(url, timeout=15)
-        if resp.status_code == 200:
-            with open(nombre_archivo, "wb") as f:
-                f.write(resp.content)
-            print(f"Descargada página {i:03d}")
-        else:
-            print(f"No encontrada {url} (status {resp.status_code})")
-    except Exception as e:
-        print(f"Error en {url}: {e}")
-        continue
-
-# Crear PDF a partir de las imágenes descargadas
-imagenes = sorted([
-    os.path.join(OUT_DIR, f) for f in os.listdir(OUT_DIR) if f.endswith(".jpg")
-])
-
-with open(PDF_PATH, "wb") as f:
-    f.write(img2pdf.convert(imagenes))
-
-# Corre OCR con idioma español
-subprocess.run([
-    "ocrmypdf", "--language", "spa", "--force-ocr", PDF_PATH, OUTPUT_PDF
-])
-
-print(f"OCR terminado, archivo generado: {OUTPUT_PDF}")
\ No newline at end of file
+        return "existente"
+    with etapa("descarga", f"{libro['codigo']}/{i:03d}") as reg:
+        try:
+            resp = requests.get(url, timeout=15)
+            if resp.status_code == 200:
+                with open(nombre_archivo, "wb") as f:
+                    f.write(resp.content)
+                reg["bytes"] = len(resp.content)
+                print(f"[{libro['codigo']}] Descargada página {i:03d}")
+                return "descargada"
+            print(f"[{libro['codigo']}] No encontrada {url} (status {resp.status_code})")
+        except Exception as e:
+            print(f"[{libro['codigo']}] Error en {url}: {e}")
+        reg["ok"] = False
+        return "fallida"
+
+
+def descargar_libros(libros, hilos=HILOS_DESCARGA):
+    """Descarga en paralelo las páginas de todos los libros"""
+    for libro in libros:
+        os.makedirs(libro["directorio"], exist_ok=True)
+
+    tareas = [(libro, i) for libro in libros for i in range(1, libro["paginas"] + 1)]
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(lambda t: descargar_pagina(*t), tareas))
+
+    for estado in ("existente", "descargada", "fallida"):
+        print(f"   • Páginas {estado}s: {resultados.count(estado)}")
+
+
+def imagenes_libro(libro, paginas=None, preprocesar=False):
+    """Lista (página, imagen) de las páginas descargadas, opcionalmente preprocesadas"""
+    if preprocesar:
+        # Dependencia opcional (numpy/Pillow): solo se importa si se pide
+        from preprocesar_paginas import preprocesar_libro
+        return preprocesar_libro(libro, paginas=paginas)
+    pares = [(i, ruta_pagina(libro, i)) for i in paginas or range(1, libro["paginas"] + 1)]
+    return [(i, img) for i, img in pares if os.path.exists(img)]
+
+
+def armar_pdf(libro, destino, paginas=None, preprocesar=False, pares=None):
+    """
+    Arma un PDF con las páginas indicadas (todas por defecto); devuelve las páginas incluidas.
+    Si ya se tienen los pares (página, imagen) de imagenes_libro se pasan en pares.
+    """
+    import img2pdf
+
+    if pares is None:
+        pares = imagenes_libro(libro, paginas, preprocesar)
+    if pares:
+        with etapa("pdf", libro["codigo"]) as reg:
+            with open(destino, "wb") as f:
+                f.write(img2pdf.convert([img for _, img in pares]))
+            reg["bytes"] = os.path.getsize(destino)
+    return [i for i, _ in pares]
+
+
+def clave_preprocesado(preprocesar):
+    """Qué imágenes entraron al PDF: las originales o las preprocesadas con sus parámetros"""
+    if not preprocesar:
+        return None
+    from preprocesar_paginas import clave_parametros
+    return clave_parametros()
+
+
+def ocr_libro(libro, preprocesar=False, solo_lecturas=False):
+    """
+    Arma el PDF del libro y le corre OCR; se salta si el PDF OCR está al día.
+    Con solo_lecturas el PDF incluye únicamente las páginas de lecturas_*.json;
+    mapa_paginas.json guarda a qué página original corresponde cada página del PDF
+    y con qué preprocesado se armó.
+    """
+    paginas = paginas_necesarias(libro) if solo_lecturas else None
+    pares = imagenes_libro(libro, paginas, preprocesar)
+    if not pares:
+        print(f"[{libro['codigo']}] ⚠️ Sin páginas descargadas, se omite el OCR")
+        return
+
+    pdf_path = ruta_pdf(libro)
+    output_pdf = ruta_pdf_ocr(libro)
+    ruta_mapa = ruta_mapa_paginas(libro)
+    incluidas = [i for i, _ in pares]
+    mapa = {"pdf": os.path.basename(output_pdf), "paginas": incluidas,
+            "preprocesar": preprocesar, "clave_preprocesado": clave_preprocesado(preprocesar)}
+    ultima_imagen = max(os.path.getmtime(img) for _, img in pares)
+    if os.path.exists(output_pdf) and os.path.getmtime(output_pdf) >= ultima_imagen and os.path.exists(ruta_mapa):
+        with open(ruta_mapa, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+            if all(anterior.get(campo) == mapa[campo] for campo in ("paginas", "preprocesar", "clave_preprocesado")):
+                print(f"[{libro['codigo']}] Saltando OCR, {output_pdf} ya está al día.")
+                return
+
+    # Crear PDF a partir de las imágenes descargadas
+    armar_pdf(libro, pdf_path, pares=pares)
+    if solo_lecturas:
+        print(f"[{libro['codigo']}] PDF reducido: {len(incluidas)} de {libro['paginas']} páginas")
+
+    # El mapa se escribe de nuevo solo si el OCR termina bien; sin él la próxima
+    # corrida no da por bueno un PDF OCR viejo o a medias
+    if os.path.exists(ruta_mapa):
+        os.remove(ruta_mapa)
+
+    # Corre OCR con idioma español
+    with etapa("ocr", libro["codigo"]) as reg:
+        resultado = subprocess.run([
+            "ocrmypdf", "--language", "spa", "--force-ocr", pdf_path, output_pdf
+        ])
+        reg["ok"] = resultado.returncode == 0
+        reg["bytes"] = os.path.getsize(output_pdf) if os.path.exists(output_pdf) else 0
+        reg["paginas"] = len(incluidas)
+
+    if resultado.returncode != 0:
+        print(f"[{libro['codigo']}] ❌ ocrmypdf terminó con código {resultado.returncode}, no se generó el mapa de páginas")
+        return
+
+    with open(ruta_mapa, "w", encoding="utf-8") as f:
+        json.dump(mapa, f)
+
+    print(f"[{libro['codigo']}] OCR terminado, archivo generado: {output_pdf}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga las páginas de los libros registrados y les corre OCR")
+    parser.add_argument("--libros", nargs="*", help="Códigos de libro (por defecto todos los de libros.json)")
+    parser.add_argument("--hilos", type=int, default=HILOS_DESCARGA, help="Descargas simultáneas")
+    parser.add_argument("--sin-ocr", action="store_true", help="Solo descargar las páginas")
+    parser.add_argument("--preprocesar", action="store_true",
+                        help="Pasar las páginas por preprocesar_paginas.py (grises, umbral, deskew) antes del OCR")
+    parser.add_argument("--solo-lecturas", action="store_true",
+                        help="OCR solo de las páginas que aparecen en el JSON de lecturas del libro")
+    args = parser.parse_args()
+
+    libros = seleccionar_libros(args.libros)
+    iniciar("lecturas")
+    print(f"📚 Libros: {', '.join(libro['codigo'] for libro in libros)}")
+    descargar_libros(libros, hilos=args.hilos)
+
+    if not args.sin_ocr:
+        # ocrmypdf ya usa varios núcleos por libro; los libros corren a la par
+        with ThreadPoolExecutor(max_workers=max(1, len(libros))) as pool:
+            list(pool.map(lambda libro: ocr_libro(libro, args.preprocesar, args.solo_lecturas), libros))
+
+    finalizar()
+
+
+if __name__ == "__main__":
+    main()
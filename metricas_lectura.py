@@ -0,0 +1,176 @@
+"""
+Métricas de dificultad de las lecturas (longitud, legibilidad y vocabulario)
+
+Para cada lectura calcula:
+- palabras, oraciones y palabras_por_oracion
+- indice_fernandez_huerta: 206.84 - 0.60·P - 1.02·F  (P = sílabas por 100 palabras,
+  F = oraciones por 100 palabras)
+- indice_szigriszt: 206.835 - 62.3·(sílabas/palabras) - (palabras/oraciones)
+- nivel_lectura: escala INFLESZ sobre el índice de Szigriszt
+- rareza_vocabulario: fracción de las palabras distintas de la lectura que aparecen
+  en menos del 5% de los textos del corpus (lecturas + textos OCR de los libros)
+
+Todas las lecturas se tokenizan una sola vez y la frecuencia de documentos del
+corpus se arma en la misma pasada. subir_a_firestore.py guarda las métricas como
+campos de primer nivel de cada documento, así se puede filtrar en el servidor:
+
+    db.collection("lecturas").where("nivel_lectura", "==", "bastante fácil").where("palabras", "<", 400)
+
+Uso:
+    python3 metricas_lectura.py
+    python3 metricas_lectura.py --directorio lecturas_finales --salida metricas.json
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import Counter
+
+from ingesta import leer_lecturas
+from registro_libros import cargar_registro
+
+# === CONFIGURACIÓN ===
+LECTURAS_DIR = "lecturas_finales"
+PALABRA = re.compile(r"[a-záéíóúüñ]+")
+FIN_ORACION = re.compile(r"[.!?…]+")
+PARRAFO = re.compile(r"\n\s*\n")    # línea en blanco
+FUERTES = set("aeoáéóíú")   # í y ú acentuadas forman hiato como las vocales fuertes
+DEBILES = set("iuü")
+FRACCION_RARA = 0.05        # una palabra es rara si aparece en menos de este % de textos
+
+# Escala INFLESZ (límite inferior del índice de Szigriszt, nivel)
+NIVELES_INFLESZ = [
+    (80, "muy fácil"),
+    (65, "bastante fácil"),
+    (55, "normal"),
+    (40, "algo difícil"),
+    (float("-inf"), "muy difícil"),
+]
+
+
+def silabas(palabra):
+    """Número aproximado de sílabas: núcleos vocálicos contando diptongos e hiatos"""
+    n, previa = 0, None
+    for c in palabra:
+        if c in FUERTES:
+            # Dos vocales fuertes seguidas forman hiato; fuerte tras débil, diptongo
+            if previa is None or previa == "f":
+                n += 1
+            previa = "f"
+        elif c in DEBILES:
+            if previa is None:
+                n += 1
+            previa = previa or "d"
+        else:
+            previa = None
+    # La conjunción "y" no tiene otra vocal
+    return max(n, 1)
+
+
+def cuerpo_lectura(contenido):
+    """Texto de la lectura sin el título ni la línea de autor"""
+    lineas = contenido.strip().split("\n")
+    cuerpo = [l for i, l in enumerate(lineas) if i > 0 and not l.strip().startswith("Autor:")]
+    return "\n".join(cuerpo)
+
+
+def tokenizar(texto):
+    """
+    (palabras, número de oraciones) de un texto. Una línea en blanco solo cierra
+    oración si el párrafo no terminó con puntuación (p. ej. un subtítulo o un verso).
+    """
+    palabras = PALABRA.findall(texto.lower())
+    oraciones = sum(1 for parrafo in PARRAFO.split(texto) for o in FIN_ORACION.split(parrafo)
+                    if PALABRA.search(o.lower()))
+    return palabras, max(oraciones, 1)
+
+
+def nivel_inflesz(indice):
+    for limite, nivel in NIVELES_INFLESZ:
+        if indice >= limite:
+            return nivel
+
+
+def analizar_corpus(textos, referencia=()):
+    """
+    Métricas de cada texto de textos ({nombre: contenido}).
+    referencia son textos adicionales que solo cuentan para la rareza del vocabulario.
+    Devuelve {nombre: métricas}.
+    """
+    frecuencia_documentos = Counter()
+    total_documentos = len(textos) + len(referencia)
+    tokenizados = {}
+    for nombre, contenido in textos.items():
+        palabras, oraciones = tokenizar(cuerpo_lectura(contenido))
+        tokenizados[nombre] = (palabras, oraciones)
+        frecuencia_documentos.update(set(palabras))
+    for contenido in referencia:
+        frecuencia_documentos.update(set(PALABRA.findall(contenido.lower())))
+
+    cache_silabas = {}
+    metricas = {}
+    for nombre, (palabras, oraciones) in tokenizados.items():
+        n = len(palabras)
+        if not n:
+            continue
+        conteo = Counter(palabras)
+        total_silabas = 0
+        raras = 0
+        for palabra, veces in conteo.items():
+            if palabra not in cache_silabas:
+                cache_silabas[palabra] = silabas(palabra)
+            total_silabas += cache_silabas[palabra] * veces
+            if frecuencia_documentos[palabra] < FRACCION_RARA * total_documentos:
+                raras += 1
+
+        fernandez_huerta = 206.84 - 0.60 * (100 * total_silabas / n) - 1.02 * (100 * oraciones / n)
+        szigriszt = 206.835 - 62.3 * (total_silabas / n) - n / oraciones
+        metricas[nombre] = {
+            "palabras": n,
+            "oraciones": oraciones,
+            "palabras_por_oracion": round(n / oraciones, 1),
+            "indice_fernandez_huerta": round(fernandez_huerta, 1),
+            "indice_szigriszt": round(szigriszt, 1),
+            "nivel_lectura": nivel_inflesz(szigriszt),
+            "rareza_vocabulario": round(raras / len(conteo), 3),
+        }
+    return metricas
+
+
+def textos_de_referencia(excluir=()):
+    """Textos OCR de los libros registrados, como corpus para la rareza del vocabulario"""
+    referencia = []
+    for libro in cargar_registro().values():
+        if os.path.isdir(libro["textos"]) and os.path.abspath(libro["textos"]) not in excluir:
+            referencia += leer_lecturas(libro["textos"]).values()
+    return referencia
+
+
+def analizar_directorio(directorio=LECTURAS_DIR):
+    """Métricas de todas las lecturas .txt de un directorio: {nombre de archivo sin .txt: métricas}"""
+    return analizar_corpus(leer_lecturas(directorio), textos_de_referencia({os.path.abspath(directorio)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Métricas de legibilidad y vocabulario de las lecturas")
+    parser.add_argument("--directorio", default=LECTURAS_DIR)
+    parser.add_argument("--salida", help="Guardar las métricas en un JSON")
+    args = parser.parse_args()
+
+    metricas = analizar_directorio(args.directorio)
+    print(f"📊 {len(metricas)} lecturas en {args.directorio}\n")
+    print(f"   {'Lectura':<35} {'Palabras':>8} {'Pal/or':>7} {'F-H':>6} {'Szig':>6} {'Rareza':>7}  Nivel")
+    for nombre, m in sorted(metricas.items(), key=lambda x: -x[1]["indice_szigriszt"]):
+        print(f"   {nombre[:35]:<35} {m['palabras']:>8} {m['palabras_por_oracion']:>7} "
+              f"{m['indice_fernandez_huerta']:>6} {m['indice_szigriszt']:>6} {m['rareza_vocabulario']:>7}  "
+              f"{m['nivel_lectura']}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(metricas, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Métricas guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
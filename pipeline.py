@@ -0,0 +1,86 @@
+"""
+Punto de entrada único del pipeline
+
+Cada subcomando importa su script (y los SDK que ese script necesita) solo al
+ejecutarse, así `--help`, `preview` o `verify` arrancan sin cargar openai, boto3
+ni firebase_admin y sin pedir credenciales. Las opciones después del subcomando
+se pasan tal cual al script correspondiente.
+
+Uso:
+    python3 pipeline.py download --libros P4MLA
+    python3 pipeline.py ocr --solo-lecturas --preprocesar
+    python3 pipeline.py extract
+    python3 pipeline.py generate --libros P4MLA
+    python3 pipeline.py upload
+    python3 pipeline.py stats
+
+Tiempo de arranque (la suma de la columna cumulative muestra qué módulos pesan):
+    python3 -X importtime pipeline.py --help 2> importtime.log
+    sort -t'|' -k2 -n importtime.log | tail -15
+"""
+
+import argparse
+import importlib
+import sys
+
+# subcomando: (módulo, función, argumentos fijos, ¿reenvía opciones?, ayuda)
+COMANDOS = {
+    "ingest": ("ingesta", "main", [], True, "Normalizar codificación y nombres de los .txt a UTF-8 NFC"),
+    "download": ("lecturas", "main", ["--sin-ocr"], True, "Descargar las páginas de los libros"),
+    "ocr": ("lecturas", "main", [], True, "Descargar las páginas faltantes y correr OCR"),
+    "extract": ("seccion_lecturas", "main", [], True, "Separar el PDF OCR en un .txt por lectura"),
+    "textract": ("textract_texto_por_lectura", "main", [], True, "Extraer las lecturas con AWS Textract"),
+    "clean": ("procesar_lecturas", "main", [], True, "Limpiar lecturas OCR y generar preguntas VoF"),
+    "generate": ("generar_preguntas", "main", [], True, "Generar preguntas de opción múltiple por libro"),
+    "normalize": ("procesar_json", "main", [], False, "Normalizar las preguntas de banco_ia_analiza.txt"),
+    "verify": ("verificar_datos_firestore", "main", [], True, "Validar lecturas y banco antes de subir"),
+    "preview": ("preview_firestore", "generar_preview", [], False, "Mostrar un documento de ejemplo"),
+    "upload": ("subir_a_firestore", "main", [], False, "Subir las lecturas a Firestore"),
+    "answers": ("respuestas_estudiantes", "main", [], True, "Ingerir respuestas y analizar dificultad y discriminación"),
+}
+
+
+def stats(args):
+    """Tabla por etapa de una corrida guardada en corridas/"""
+    from instrumentacion import cargar_resumen, imprimir_tabla
+
+    datos = cargar_resumen(args.run_id)
+    if datos is None:
+        print(f"❌ No se encontró la corrida {args.run_id or '(ninguna en corridas/)'}")
+        return 1
+    imprimir_tabla(datos)
+    return 0
+
+
+def ejecutar(comando, opciones):
+    """Importa el script del subcomando y corre su función principal con las opciones dadas"""
+    modulo, funcion, fijos, _, _ = COMANDOS[comando]
+    argv_original = sys.argv
+    sys.argv = [f"{modulo}.py", *fijos, *opciones]
+    try:
+        return getattr(importlib.import_module(modulo), funcion)()
+    finally:
+        sys.argv = argv_original
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pipeline.py", description="Pipeline de lecturas y preguntas")
+    sub = parser.add_subparsers(dest="comando", required=True, metavar="subcomando")
+    for nombre, (modulo, _, _, reenvia, ayuda) in COMANDOS.items():
+        # Los subcomandos que reenvían dejan --help al argparse del script
+        sub.add_parser(nombre, help=f"{ayuda} ({modulo}.py)", add_help=not reenvia)
+    p_stats = sub.add_parser("stats", help="Resumen de tiempos y costos de una corrida")
+    p_stats.add_argument("--run-id", help="Corrida a mostrar (por defecto la más reciente)")
+
+    args, resto = parser.parse_known_args(argv)
+    if args.comando == "stats":
+        if resto:
+            parser.error(f"argumentos no reconocidos: {' '.join(resto)}")
+        return stats(args)
+    if resto and not COMANDOS[args.comando][3]:
+        parser.error(f"'{args.comando}' no acepta opciones: {' '.join(resto)}")
+    return ejecutar(args.comando, resto) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Preprocesamiento de las páginas JPG antes del OCR
+
+Por cada página: escala de grises, normalización de DPI, umbral adaptativo,
+corrección de inclinación (deskew) y recorte de márgenes. El resultado se guarda
+como TIFF bitonal con compresión CCITT G4, que img2pdf embebe sin recomprimir.
+
+Las páginas se procesan en paralelo con un pool de procesos y el resultado se
+guarda en caché por hash del archivo de entrada, así que volver a correr solo
+procesa las páginas nuevas o modificadas.
+
+Uso:
+    python3 preprocesar_paginas.py
+    python3 preprocesar_paginas.py --libros P4MLA --medir-ocr 10
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from instrumentacion import etapa, finalizar, iniciar
+from registro_libros import ruta_pagina, seleccionar_libros
+
+# === CONFIGURACIÓN ===
+DPI_OBJETIVO = 300
+ANCHO_PAGINA_PULGADAS = 8.5     # se usa cuando el JPG no trae DPI
+VENTANA_UMBRAL = 31             # lado (px) de la ventana del umbral adaptativo
+DESPLAZAMIENTO_UMBRAL = 10      # qué tan por debajo de la media local cuenta como tinta
+ANGULO_MAXIMO = 5.0             # grados a explorar para el deskew
+PASO_ANGULO = 0.25
+MARGEN_RECORTE = 20             # px de margen que se dejan alrededor del contenido
+VERSION_PROCESO = "1"           # cambiarla invalida la caché
+
+
+def carpeta_cache(libro):
+    """Carpeta de caché del libro para las páginas preprocesadas"""
+    return os.path.join(libro["directorio"], "preprocesadas")
+
+
+def clave_parametros():
+    """Versión y parámetros del proceso; si cambian, cambia el resultado de todas las páginas"""
+    parametros = (VERSION_PROCESO, DPI_OBJETIVO, ANCHO_PAGINA_PULGADAS, VENTANA_UMBRAL, DESPLAZAMIENTO_UMBRAL,
+                  ANGULO_MAXIMO, PASO_ANGULO, MARGEN_RECORTE)
+    return ":".join(map(str, parametros))
+
+
+def hash_entrada(ruta):
+    """Hash del archivo de entrada más la versión y parámetros del proceso"""
+    h = hashlib.sha1()
+    h.update(clave_parametros().encode())
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def normalizar_dpi(img):
+    """Escala la imagen para que quede a DPI_OBJETIVO (nunca agranda)"""
+    dpi = img.info.get("dpi", (0, 0))[0] or img.width / ANCHO_PAGINA_PULGADAS
+    factor = DPI_OBJETIVO / dpi
+    if factor < 1:
+        img = img.resize((round(img.width * factor), round(img.height * factor)), Image.LANCZOS)
+    return img
+
+
+def umbral_adaptativo(gris):
+    """Binariza con la media local (imagen integral); True = tinta"""
+    g = gris.astype(np.float64)
+    r = VENTANA_UMBRAL // 2
+    integral = np.pad(g, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    alto, ancho = g.shape
+    y0 = np.clip(np.arange(alto) - r, 0, alto)
+    y1 = np.clip(np.arange(alto) + r + 1, 0, alto)
+    x0 = np.clip(np.arange(ancho) - r, 0, ancho)
+    x1 = np.clip(np.arange(ancho) + r + 1, 0, ancho)
+    suma = (integral[y1][:, x1] - integral[y0][:, x1] - integral[y1][:, x0] + integral[y0][:, x0])
+    area = np.outer(y1 - y0, x1 - x0)
+    return g < suma / area - DESPLAZAMIENTO_UMBRAL
+
+
+def angulo_inclinacion(tinta):
+    """Ángulo (grados) que maximiza la varianza del perfil horizontal de tinta"""
+    # Se estima sobre una versión reducida: la inclinación no depende de la resolución
+    muestra = Image.fromarray((tinta[::4, ::4] * 255).astype(np.uint8))
+    mejor, mejor_puntaje = 0.0, -1.0
+    for angulo in np.arange(-ANGULO_MAXIMO, ANGULO_MAXIMO + PASO_ANGULO, PASO_ANGULO):
+        perfil = np.asarray(muestra.rotate(angulo, resample=Image.NEAREST, expand=False)).sum(axis=1)
+        puntaje = float(np.var(perfil))
+        if puntaje > mejor_puntaje:
+            mejor, mejor_puntaje = float(angulo), puntaje
+    return mejor
+
+
+def recortar(tinta):
+    """Recorta los márgenes vacíos dejando MARGEN_RECORTE alrededor del contenido"""
+    filas = np.flatnonzero(tinta.any(axis=1))
+    columnas = np.flatnonzero(tinta.any(axis=0))
+    if not len(filas) or not len(columnas):
+        return tinta
+    y0 = max(filas[0] - MARGEN_RECORTE, 0)
+    y1 = min(filas[-1] + MARGEN_RECORTE + 1, tinta.shape[0])
+    x0 = max(columnas[0] - MARGEN_RECORTE, 0)
+    x1 = min(columnas[-1] + MARGEN_RECORTE + 1, tinta.shape[1])
+    return tinta[y0:y1, x0:x1]
+
+
+def preprocesar_imagen(ruta_entrada, ruta_salida):
+    """Aplica todo el proceso a una página y la guarda como TIFF G4"""
+    with Image.open(ruta_entrada) as img:
+        gris = normalizar_dpi(img.convert("L"))
+    tinta = umbral_adaptativo(np.asarray(gris))
+
+    angulo = angulo_inclinacion(tinta)
+    if angulo:
+        rotada = Image.fromarray((tinta * 255).astype(np.uint8)).rotate(angulo, resample=Image.NEAREST, fillcolor=0)
+        tinta = np.asarray(rotada) > 127
+    tinta = recortar(tinta)
+
+    # En el TIFF bitonal blanco = 1 (papel) y negro = 0 (tinta)
+    salida = Image.fromarray(~tinta)
+    tmp = ruta_salida + ".tmp"
+    salida.save(tmp, format="TIFF", compression="group4", dpi=(DPI_OBJETIVO, DPI_OBJETIVO))
+    os.replace(tmp, ruta_salida)
+    return angulo
+
+
+def _procesar_pagina(args):
+    entrada, salida = args
+    inicio = time.perf_counter()
+    angulo = preprocesar_imagen(entrada, salida)
+    return entrada, angulo, time.perf_counter() - inicio
+
+
+def preprocesar_libro(libro, procesos=None, paginas=None):
+    """
+    Preprocesa las páginas descargadas del libro (solo las que no están en caché).
+    paginas limita el proceso a esos números de página (por defecto todas).
+    Devuelve la lista de (página, ruta preprocesada) en orden de página.
+    """
+    cache = carpeta_cache(libro)
+    os.makedirs(cache, exist_ok=True)
+
+    tripletas = []
+    for i in paginas or range(1, libro["paginas"] + 1):
+        entrada = ruta_pagina(libro, i)
+        if os.path.exists(entrada):
+            tripletas.append((i, entrada, os.path.join(cache, f"{hash_entrada(entrada)}.tiff")))
+
+    pendientes = [(e, s) for _, e, s in tripletas if not os.path.exists(s)]
+    print(f"[{libro['codigo']}] 🖼️  {len(tripletas)} páginas, {len(tripletas) - len(pendientes)} en caché, "
+          f"{len(pendientes)} por procesar")
+
+    if pendientes:
+        with etapa("preproceso", libro["codigo"]) as reg, ProcessPoolExecutor(max_workers=procesos) as pool:
+            for entrada, angulo, _ in pool.map(_procesar_pagina, pendientes, chunksize=4):
+                if abs(angulo) >= 0.5:
+                    print(f"   • {os.path.basename(entrada)}: inclinación corregida {angulo:+.2f}°")
+            reg["bytes"] = sum(os.path.getsize(s) for _, s in pendientes)
+
+    return [(i, s) for i, _, s in tripletas]
+
+
+def medir_ocr(imagenes):
+    """Corre ocrmypdf sobre las imágenes dadas; devuelve (segundos, bytes del PDF de entrada)"""
+    import img2pdf
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = os.path.join(tmp, "entrada.pdf")
+        with open(pdf, "wb") as f:
+            f.write(img2pdf.convert(imagenes))
+        inicio = time.perf_counter()
+        subprocess.run(["ocrmypdf", "--language", "spa", "--force-ocr", "--quiet", pdf,
+                        os.path.join(tmp, "salida.pdf")], check=True)
+        return time.perf_counter() - inicio, os.path.getsize(pdf)
+
+
+def reportar(libro, pares, muestra_ocr=0):
+    """Compara bytes (y opcionalmente tiempo de OCR) entre originales y preprocesadas"""
+    originales = [ruta_pagina(libro, i) for i, _ in pares]
+    preprocesadas = [ruta for _, ruta in pares]
+    bytes_originales = sum(os.path.getsize(o) for o in originales)
+    bytes_preprocesadas = sum(os.path.getsize(p) for p in preprocesadas)
+
+    print(f"\n📊 [{libro['codigo']}] Bytes a enviar al OCR:")
+    print(f"   • Originales:    {bytes_originales / 1e6:8.1f} MB")
+    print(f"   • Preprocesadas: {bytes_preprocesadas / 1e6:8.1f} MB "
+          f"({100 * (1 - bytes_preprocesadas / max(bytes_originales, 1)):.0f}% menos)")
+
+    if muestra_ocr and shutil.which("ocrmypdf"):
+        n = min(muestra_ocr, len(originales))
+        with etapa("ocr_original", libro["codigo"]) as reg:
+            t_orig, b_orig = medir_ocr(originales[:n])
+            reg["bytes"] = b_orig
+        with etapa("ocr_preproceso", libro["codigo"]) as reg:
+            t_pre, b_pre = medir_ocr(preprocesadas[:n])
+            reg["bytes"] = b_pre
+        print(f"\n⏱️  OCR de {n} páginas:")
+        print(f"   • Originales:    {t_orig:6.1f} s, PDF de {b_orig / 1e6:.1f} MB")
+        print(f"   • Preprocesadas: {t_pre:6.1f} s, PDF de {b_pre / 1e6:.1f} MB "
+              f"({100 * (1 - t_pre / t_orig):.0f}% menos tiempo)")
+    elif muestra_ocr:
+        print("⚠️ ocrmypdf no está instalado; se omite la medición de OCR")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocesa las páginas de los libros antes del OCR")
+    parser.add_argument("--libros", nargs="*", help="Códigos de libro (por defecto todos los de libros.json)")
+    parser.add_argument("--procesos", type=int, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--medir-ocr", type=int, default=0, metavar="N",
+                        help="Medir el OCR sobre N páginas originales vs preprocesadas")
+    args = parser.parse_args()
+
+    iniciar("preprocesar_paginas")
+    for libro in seleccionar_libros(args.libros):
+        pares = preprocesar_libro(libro, procesos=args.procesos)
+        reportar(libro, pares, muestra_ocr=args.medir_ocr)
+    finalizar()
+
+
+if __name__ == "__main__":
+    main()
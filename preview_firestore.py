@@ -6,6 +6,8 @@ Este script NO sube nada, solo muestra un preview en JSON
 import json
 import os
 
+from ingesta import clave_nombre, leer_texto, nfc
+
 LECTURAS_DIR = "lecturas_finales"
 BANCO_PREGUNTAS_JSON = "banco_verdadero_falso.json"
 
@@ -36,7 +38,7 @@ def cargar_preguntas():
     for nivel, preguntas in banco.items():
         dificultad = MAPEO_NIVELES[nivel]
         for pregunta in preguntas:
-            origen = pregunta["origen"]
+            origen = nfc(pregunta["origen"])
             if origen not in preguntas_por_lectura:
                 preguntas_por_lectura[origen] = []
             
@@ -49,12 +51,14 @@ def cargar_preguntas():
     return preguntas_por_lectura
 
 def buscar_preguntas_por_nombre(nombre_lectura, preguntas_por_lectura):
+    nombre_lectura = nfc(nombre_lectura)
     if nombre_lectura in preguntas_por_lectura:
         return preguntas_por_lectura[nombre_lectura]
     
-    nombre_lower = nombre_lectura.lower()
+    # Búsqueda sin distinguir mayúsculas ni forma Unicode (NFC/NFD)
+    clave = clave_nombre(nombre_lectura)
     for nombre_key, preguntas in preguntas_por_lectura.items():
-        if nombre_key.lower() == nombre_lower:
+        if clave_nombre(nombre_key) == clave:
             return preguntas
     
     return []
@@ -77,8 +81,7 @@ def generar_preview():
     nombre_lectura = archivo.replace(".txt", "")
     ruta_archivo = os.path.join(LECTURAS_DIR, archivo)
     
-    with open(ruta_archivo, "r", encoding="utf-8") as f:
-        contenido = f.read()
+    contenido = leer_texto(ruta_archivo)
     
     titulo, autor, texto = extraer_titulo_y_autor(contenido)
     preguntas = buscar_preguntas_por_nombre(nombre_lectura, preguntas_por_lectura)
@@ -13,83 +13,103 @@ MAPEO_NIVELES = {
     "difícil": "avanzado"
 }
 
-# === 1. Leer el archivo JSON de salida si existe ===
-if os.path.exists(OUTPUT_JSON):
-    with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
-        banco_preguntas = json.load(f)
-else:
+
+def cargar_banco(ruta=OUTPUT_JSON):
+    """Lee el banco normalizado si existe o crea uno vacío"""
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
     # Inicializar estructura si no existe
-    banco_preguntas = {
+    return {
         "basico": [],
         "intermedio": [],
         "avanzado": []
     }
 
-# === 2. Cargar el archivo con todas las lecturas ===
-with open(INPUT_FILE, "r", encoding="utf-8") as f:
-    contenido = f.read()
-
-# Parsear usando un enfoque más robusto
-# Buscar el patrón: "Nombre": "```json...```",
-# El patrón captura hasta el cierre de ```
-patron = r'"([^"]+)":\s*"(```json.*?```)"'
-matches = re.findall(patron, contenido, re.DOTALL)
-
-lecturas_dict = {}
-for nombre, json_str in matches:
-    lecturas_dict[nombre] = json_str
-
-# === 3. Procesar cada lectura ===
-total_procesadas = 0
-for nombre_lectura, json_mal_formateado in lecturas_dict.items():
-    # Limpiar el JSON mal formateado
-    # Decodificar todos los escapes: \n, \", etc.
-    try:
-        # Usar json.loads dos veces: primero para decodificar los escapes de la string
-        json_decodificado = json.loads('"' + json_mal_formateado + '"')
-        json_limpio = json_decodificado.replace("```json\n", "").replace("\n```", "").replace("```json", "").replace("```", "")
-    except Exception as e1:
-        # Si falla, intentar el método directo
-        json_limpio = json_mal_formateado.replace("```json\\n", "").replace("\\n```", "").replace("\\n", "\n").replace('\\"', '"')
-    
-    try:
-        # Cargar JSON de entrada
-        data = json.loads(json_limpio)
-        
-        # Normalizar y agregar preguntas
-        for item in data["preguntas"]:
-            nivel_original = item["nivel"]
-            nivel_normalizado = MAPEO_NIVELES.get(nivel_original, "basico")
-            pregunta = item["pregunta"].strip()
-            respuesta_str = item["respuesta_correcta"].strip()
-            
-            # Convertir respuesta a booleano
-            respuesta_bool = respuesta_str.lower() == "verdadero" or respuesta_str.lower() == "true"
-            
-            # Crear entrada normalizada
-            entrada_normalizada = {
-                "afirmacion": pregunta,
-                "respuesta": respuesta_bool,
-                "origen": nombre_lectura
-            }
-            
-            # Agregar al nivel correspondiente
-            banco_preguntas[nivel_normalizado].append(entrada_normalizada)
-        
-        total_procesadas += 1
-        print(f"✅ Procesada: {nombre_lectura} ({len(data['preguntas'])} preguntas)")
-    
-    except Exception as e:
-        print(f"❌ Error procesando '{nombre_lectura}': {e}")
-
-# === 4. Guardar el JSON actualizado ===
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(banco_preguntas, f, ensure_ascii=False, indent=2)
-
-print(f"\n{'='*60}")
-print(f"✅ Todas las preguntas normalizadas y guardadas en {OUTPUT_JSON}")
-print(f"   - Lecturas procesadas: {total_procesadas}")
-print(f"   - Básico: {len(banco_preguntas['basico'])} preguntas")
-print(f"   - Intermedio: {len(banco_preguntas['intermedio'])} preguntas")
-print(f"   - Avanzado: {len(banco_preguntas['avanzado'])} preguntas")
-print(f"{'='*60}")
\ No newline at end of file
+
+def extraer_lecturas(contenido):
+    """Separa las respuestas crudas de la IA en {nombre_lectura: json_mal_formateado}"""
+    # Parsear usando un enfoque más robusto
+    # Buscar el patrón: "Nombre": "```json...```",
+    # El patrón captura hasta el cierre de ```
+    patron = r'"([^"]+)":\s*"(```json.*?```)"'
+    matches = re.findall(patron, contenido, re.DOTALL)
+
+    lecturas_dict = {}
+    for nombre, json_str in matches:
+        lecturas_dict[nombre] = json_str
+    return lecturas_dict
+
+
+def normalizar_lecturas(lecturas_dict, banco_preguntas):
+    """Agrega al banco las preguntas normalizadas; devuelve cuántas lecturas se procesaron"""
+    total_procesadas = 0
+    for nombre_lectura, json_mal_formateado in lecturas_dict.items():
+        # Limpiar el JSON mal formateado
+        # Decodificar todos los escapes: \n, \", etc.
+        try:
+            # Usar json.loads dos veces: primero para decodificar los escapes de la string
+            json_decodificado = json.loads('"' + json_mal_formateado + '"')
+            json_limpio = json_decodificado.replace("```json\n", "").replace("\n```", "").replace("```json", "").replace("```", "")
+        except Exception as e1:
+            # Si falla, intentar el método directo
+            json_limpio = json_mal_formateado.replace("```json\\n", "").replace("\\n```", "").replace("\\n", "\n").replace('\\"', '"')
+
+        try:
+            # Cargar JSON de entrada
+            data = json.loads(json_limpio)
+
+            # Normalizar y agregar preguntas
+            for item in data["preguntas"]:
+                nivel_original = item["nivel"]
+                nivel_normalizado = MAPEO_NIVELES.get(nivel_original, "basico")
+                pregunta = item["pregunta"].strip()
+                respuesta_str = item["respuesta_correcta"].strip()
+
+                # Convertir respuesta a booleano
+                respuesta_bool = respuesta_str.lower() == "verdadero" or respuesta_str.lower() == "true"
+
+                # Crear entrada normalizada
+                entrada_normalizada = {
+                    "afirmacion": pregunta,
+                    "respuesta": respuesta_bool,
+                    "origen": nombre_lectura
+                }
+
+                # Agregar al nivel correspondiente
+                banco_preguntas[nivel_normalizado].append(entrada_normalizada)
+
+            total_procesadas += 1
+            print(f"✅ Procesada: {nombre_lectura} ({len(data['preguntas'])} preguntas)")
+
+        except Exception as e:
+            print(f"❌ Error procesando '{nombre_lectura}': {e}")
+    return total_procesadas
+
+
+def main():
+    # === 1. Leer el archivo JSON de salida si existe ===
+    banco_preguntas = cargar_banco()
+
+    # === 2. Cargar el archivo con todas las lecturas ===
+    with open(INPUT_FILE, "r", encoding="utf-8") as f:
+        contenido = f.read()
+
+    # === 3. Procesar cada lectura ===
+    total_procesadas = normalizar_lecturas(extraer_lecturas(contenido), banco_preguntas)
+
+    # === 4. Guardar el JSON actualizado ===
+    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(banco_preguntas, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'='*60}")
+    print(f"✅ Todas las preguntas normalizadas y guardadas en {OUTPUT_JSON}")
+    print(f"   - Lecturas procesadas: {total_procesadas}")
+    print(f"   - Básico: {len(banco_preguntas['basico'])} preguntas")
+    print(f"   - Intermedio: {len(banco_preguntas['intermedio'])} preguntas")
+    print(f"   - Avanzado: {len(banco_preguntas['avanzado'])} preguntas")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
+import argparse
 import os
 import json
-from openai import OpenAI
+import time
+
+from ingesta import leer_lecturas
+from instrumentacion import etapa, finalizar, iniciar
+from proveedores_llm import completar, completar_stream, configurar_rutas
+from puntos_control import PuntosControl
 
-# Carga tu API key desde variables de entorno
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Prompt base para limpiar lecturas OCR
 PROMPT_LIMPIEZA = """Eres un corrector de textos breves extraídos mediante OCR.
@@ -32,27 +36,15 @@ Devuelve el resultado en formato JSON con la siguiente estructura:
 Texto:
 """
 
-def limpiar_lectura(texto):
+def limpiar_lectura(texto, registro=None):
     """Corrige texto OCR."""
     prompt = PROMPT_LIMPIEZA + texto
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-        max_tokens=600
-    )
-    return response.choices[0].message.content.strip()
-
-def generar_preguntas(texto):
+    return completar("limpieza", prompt, registro, temperature=0.3, max_tokens=600).strip()
+
+def generar_preguntas(texto, registro=None):
     """Genera preguntas en formato JSON."""
     prompt = PROMPT_PREGUNTAS + texto
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4,
-        max_tokens=2000
-    )
-    contenido = response.choices[0].message.content.strip()
+    contenido = completar("preguntas_vof", prompt, registro, temperature=0.4, max_tokens=2000).strip()
 
     # Intentamos convertir directamente a JSON
     try:
@@ -62,69 +54,217 @@ def generar_preguntas(texto):
         print("⚠️ Advertencia: respuesta no en formato JSON, se guardará como texto plano.")
         return [{"nivel": "error", "pregunta": contenido, "respuesta_correcta": ""}]
 
+# Prompt para limpiar y generar en una sola llamada. La respuesta se divide con
+# marcadores de línea y las preguntas van una por línea (JSONL) para poder
+# procesarla mientras llega en streaming.
+MARCA_TEXTO = "<<<TEXTO>>>"
+MARCA_PREGUNTAS = "<<<PREGUNTAS>>>"
+MARCA_FIN = "<<<FIN>>>"
+# Mezcla que piden los dos prompts de verdadero/falso
+NIVELES_ESPERADOS = {"fácil": 4, "intermedia": 2, "difícil": 2}
+PROMPT_LIMPIEZA_Y_PREGUNTAS = f"""Eres un corrector de textos extraídos mediante OCR y creador de ejercicios de comprensión lectora para niños de primaria.
+Primero corrige el texto: errores de ortografía, puntuación y coherencia, sin cambiar el significado ni resumir.
+Después genera exactamente 8 preguntas de verdadero o falso sobre el texto corregido:
+- 4 fáciles (respuestas literales del texto)
+- 2 intermedias (inferencia directa)
+- 2 difíciles (requieren interpretación o deducción)
+Responde exactamente con este formato, sin nada antes ni después:
+
+{MARCA_TEXTO}
+(texto corregido)
+{MARCA_PREGUNTAS}
+{{"nivel": "fácil", "pregunta": "...", "respuesta_correcta": "Verdadero"}}
+(una pregunta por línea, en JSON, 8 en total)
+{MARCA_FIN}
+
+Texto:
+"""
+
+
+class ParserLimpiezaPreguntas:
+    """
+    Procesa la respuesta de PROMPT_LIMPIEZA_Y_PREGUNTAS a medida que llega.
+    Llama a al_tener_texto(texto) en cuanto se cierra la sección del texto; las
+    preguntas se acumulan (y las líneas que no son JSON se cuentan en
+    lineas_invalidas) hasta que se valida la respuesta completa.
+    """
+
+    def __init__(self, al_tener_texto=None):
+        self.al_tener_texto = al_tener_texto
+        self.texto = None
+        self.preguntas = []
+        self.lineas_invalidas = 0
+        self.terminado = False
+        self._seccion = None
+        self._lineas_texto = []
+        self._pendiente = ""
+
+    def alimentar(self, fragmento):
+        self._pendiente += fragmento
+        *lineas, self._pendiente = self._pendiente.split("\n")
+        for linea in lineas:
+            self._procesar_linea(linea)
+
+    def cerrar(self):
+        if self._pendiente:
+            self._procesar_linea(self._pendiente)
+            self._pendiente = ""
+
+    def _procesar_linea(self, linea):
+        marca = linea.strip()
+        if marca == MARCA_TEXTO:
+            self._seccion = "texto"
+        elif marca == MARCA_PREGUNTAS:
+            self.texto = "\n".join(self._lineas_texto).strip()
+            self._seccion = "preguntas"
+            if self.al_tener_texto:
+                self.al_tener_texto(self.texto)
+        elif marca == MARCA_FIN:
+            self._seccion = None
+            self.terminado = True
+        elif self._seccion == "texto":
+            self._lineas_texto.append(linea)
+        elif self._seccion == "preguntas" and marca:
+            try:
+                self.preguntas.append(json.loads(marca))
+            except json.JSONDecodeError:
+                self.lineas_invalidas += 1
+
+    def valido(self):
+        """True si la respuesta llegó completa con las 8 preguntas y la mezcla 4/2/2"""
+        if not (self.texto and self.terminado) or self.lineas_invalidas:
+            return False
+        if not all(isinstance(p, dict) and p.get("pregunta") and p.get("respuesta_correcta") in ("Verdadero", "Falso")
+                   for p in self.preguntas):
+            return False
+        niveles = {}
+        for p in self.preguntas:
+            niveles[p.get("nivel")] = niveles.get(p.get("nivel"), 0) + 1
+        return niveles == NIVELES_ESPERADOS
+
+
+def limpiar_y_generar(texto, registro=None, al_tener_texto=None, al_tener_pregunta=None):
+    """
+    Limpia el texto y genera sus preguntas en una sola llamada con streaming.
+    Devuelve (texto limpio, preguntas); si la respuesta no respeta el formato
+    (8 preguntas, 4/2/2 por nivel), repite la lectura con las dos llamadas de
+    siempre. al_tener_texto se llama en cuanto llega el texto; al_tener_pregunta
+    solo con las preguntas que se devuelven, una vez validadas.
+    """
+    parser = ParserLimpiezaPreguntas(al_tener_texto)
+    for fragmento in completar_stream("limpieza_y_preguntas", PROMPT_LIMPIEZA_Y_PREGUNTAS + texto, registro,
+                                      temperature=0.3, max_tokens=2600):
+        parser.alimentar(fragmento)
+    parser.cerrar()
+
+    if parser.valido():
+        lectura_limpia, preguntas = parser.texto, parser.preguntas
+    else:
+        print("⚠️ Advertencia: la respuesta combinada no respetó el formato, se usan dos llamadas.")
+        if registro is not None:
+            registro["reintentos"] += 1
+        lectura_limpia = parser.texto or limpiar_lectura(texto, registro)
+        if al_tener_texto and parser.texto is None:
+            al_tener_texto(lectura_limpia)
+        preguntas = generar_preguntas(lectura_limpia, registro)
+
+    if al_tener_pregunta:
+        for pregunta in preguntas:
+            al_tener_pregunta(pregunta)
+    return lectura_limpia, preguntas
+
+
+def generacion_ok(preguntas):
+    """False si no hay preguntas o si es el placeholder de error de generar_preguntas"""
+    return bool(preguntas) and all(p.get("nivel") != "error" for p in preguntas)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Limpia las lecturas OCR y genera preguntas de verdadero/falso")
+    parser.add_argument("--directorio", default="lecturas_txt", help="Carpeta con las lecturas OCR (.txt)")
+    parser.add_argument("--una-llamada", action="store_true",
+                        help="Limpiar y generar en una sola llamada con streaming (el texto se guarda al llegar)")
+    parser.add_argument("--run-id", help="Continuar una corrida interrumpida (ver corridas/)")
+    parser.add_argument("--proveedor", action="append", default=[], metavar="TAREA=PROVEEDOR",
+                        help="Proveedor de LLM por tarea, p. ej. limpieza=local (ver proveedores_llm.py)")
+    args = parser.parse_args()
+    configurar_rutas(args.proveedor)
+
     # Cargar lecturas desde archivos .txt en la carpeta 'lecturas_txt'
     def cargar_lecturas_desde_directorio(dir_path="lecturas_txt"):
-        lecturas = []
         if not os.path.isdir(dir_path):
             print(f"⚠️ Directorio '{dir_path}' no encontrado")
             exit(1)
 
-        archivos = sorted([f for f in os.listdir(dir_path) if f.lower().endswith('.txt')])
-        if not archivos:
+        # ingesta detecta la codificación y normaliza a UTF-8 NFC
+        textos = leer_lecturas(dir_path)
+        if not textos:
             print(f"⚠️ No se encontraron archivos .txt en '{dir_path}'.")
-            return []
-    
-        for nombre in archivos:
-            ruta = os.path.join(dir_path, nombre)
-            try:
-                with open(ruta, 'r', encoding='utf-8') as fh:
-                    contenido = fh.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(ruta, 'r', encoding='latin-1') as fh:
-                        contenido = fh.read()
-                except Exception as e:
-                    print(f"⚠️ Error leyendo '{ruta}': {e}")
-                    continue
-            except Exception as e:
-                print(f"⚠️ Error leyendo '{ruta}': {e}")
+        return {nombre: t.strip() for nombre, t in textos.items() if t.strip()}
+
+    run_id = iniciar("procesar_lecturas", args.run_id)
+    print(f"🗂️  Corrida {run_id} (para reanudarla: --run-id {run_id})")
+    lecturas_ocr = cargar_lecturas_desde_directorio(args.directorio)
+    puntos = PuntosControl()
+    hechos, _ = puntos.pendientes(lecturas_ocr)
+    hechos = {nombre: h for nombre, h in hechos.items() if generacion_ok(h["preguntas"])}
+    if hechos:
+        print(f"↩️  {len(hechos)} lecturas recuperadas de los puntos de control, faltan {len(lecturas_ocr) - len(hechos)}")
+
+    banco_preguntas = []
+
+    # Los textos limpios se escriben en cuanto están listos; los de lecturas ya
+    # procesadas salen de su punto de control, en el mismo orden
+    with open("lecturas_limpias.txt", "w", encoding="utf-8") as salida_limpias:
+        for i, (nombre, texto) in enumerate(lecturas_ocr.items(), 1):
+            def guardar_limpia(lectura_limpia, i=i):
+                salida_limpias.write(f"--- Lectura {i} ---\n{lectura_limpia}\n\n")
+                salida_limpias.flush()
+
+            if nombre in hechos:
+                entrada = {**hechos[nombre], "id": i}
+                guardar_limpia(entrada["lectura"])
+                banco_preguntas.append(entrada)
                 continue
 
-            if contenido and contenido.strip():
-                lecturas.append(contenido.strip())
+            if args.una_llamada:
+                print(f"\n🧹🧠 Procesando lectura {i} (una llamada)...")
+                inicio = time.perf_counter()
 
-        return lecturas
+                def texto_listo(lectura_limpia):
+                    guardar_limpia(lectura_limpia)
+                    print(f"   ✏️  Texto limpio listo en {time.perf_counter() - inicio:.1f} s")
 
-    lecturas_ocr = cargar_lecturas_desde_directorio()
+                with etapa("limpieza_y_generacion", nombre) as reg:
+                    lectura_limpia, preguntas = limpiar_y_generar(texto, reg, al_tener_texto=texto_listo)
+            else:
+                print(f"\n🧹 Procesando lectura {i}...")
+                with etapa("limpieza", nombre) as reg:
+                    lectura_limpia = limpiar_lectura(texto, reg)
+                guardar_limpia(lectura_limpia)
 
-    lecturas_limpias = []
-    banco_preguntas = []
+                print("🧠 Generando preguntas...")
+                with etapa("generacion", nombre) as reg:
+                    preguntas = generar_preguntas(lectura_limpia, reg)
+            entrada = {
+                "id": i,
+                "lectura": lectura_limpia,
+                "preguntas": preguntas
+            }
+            # Si la generación falló (placeholder "error"), la lectura queda sin
+            # punto de control para que se rehaga al reanudar
+            if generacion_ok(preguntas):
+                puntos.guardar(nombre, entrada, texto)
+            banco_preguntas.append(entrada)
 
-    for i, texto in enumerate(lecturas_ocr, 1):
-        print(f"\n🧹 Procesando lectura {i}...")
-        lectura_limpia = limpiar_lectura(texto)
-        lecturas_limpias.append(lectura_limpia)
-
-        print("🧠 Generando preguntas...")
-        preguntas = generar_preguntas(lectura_limpia)
-        banco_preguntas.append({
-            "id": i,
-            "lectura": lectura_limpia,
-            "preguntas": preguntas
-        })
-
-    # Guardar textos limpios
-    with open("lecturas_limpias.txt", "w", encoding="utf-8") as f:
-        for i, texto in enumerate(lecturas_limpias, 1):
-            f.write(f"--- Lectura {i} ---\n{texto}\n\n")
-
-    # Guardar banco de preguntas
-    with open("banco_preguntas.json", "w", encoding="utf-8") as f:
+    # Guardar banco de preguntas (archivo temporal + rename: nunca queda a medias)
+    with open("banco_preguntas.json.tmp", "w", encoding="utf-8") as f:
         json.dump(banco_preguntas, f, ensure_ascii=False, indent=2)
+    os.replace("banco_preguntas.json.tmp", "banco_preguntas.json")
 
     print("\n✅ Lecturas guardadas en 'lecturas_limpias.txt'")
     print("✅ Banco de preguntas guardado en 'banco_preguntas.json'")
+    finalizar()
 
 if __name__ == "__main__":
     main()
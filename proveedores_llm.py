@@ -0,0 +1,201 @@
+"""
+Proveedores de LLM intercambiables para los scripts de limpieza y generación
+
+Todas las llamadas pasan por completar() / completar_stream() con el nombre de
+la tarea; RUTAS decide qué proveedor atiende cada tarea. Cualquier servidor
+compatible con la API de OpenAI sirve como proveedor, por ejemplo llama.cpp en
+CPU para correr la limpieza de lotes grandes sin red ni límites de tasa:
+
+    llama-server -m modelo.gguf --port 8080
+    python3 procesar_lecturas.py --proveedor limpieza=local
+
+Cada proveedor tiene su propio límite de solicitudes simultáneas, y el uso de
+tokens, el costo y los reintentos (429, 5xx, conexión) de cada llamada quedan
+en el registro de la etapa (instrumentacion) junto con el nombre del
+proveedor, así las corridas con proveedores distintos se comparan con los
+mismos prompts.
+
+Variables de entorno:
+    LLM_RUTAS="limpieza=local,preguntas_vof=openai"   (igual que --proveedor)
+    LLM_LOCAL_URL, LLM_LOCAL_MODELO, LLM_LOCAL_CONCURRENCIA
+"""
+
+import os
+import threading
+import time
+from functools import lru_cache
+
+from instrumentacion import costo_tokens, registrar_uso
+
+# === CONFIGURACIÓN ===
+PROVEEDORES = {
+    "openai": {
+        "base_url": None,  # el SDK usa OPENAI_BASE_URL o la API de OpenAI
+        "api_key": None,   # el SDK usa OPENAI_API_KEY
+        "modelo": "gpt-4o-mini",
+        "concurrencia": 8,
+        "timeout": 60,
+        "uso_en_stream": True,
+    },
+    "local": {
+        "base_url": os.getenv("LLM_LOCAL_URL", "http://localhost:8080/v1"),
+        "api_key": "sin-clave",
+        "modelo": os.getenv("LLM_LOCAL_MODELO", "local"),
+        "concurrencia": int(os.getenv("LLM_LOCAL_CONCURRENCIA", "1")),  # un servidor en CPU atiende de a uno
+        "timeout": 600,
+        # llama.cpp y otros servidores no siempre aceptan stream_options
+        "uso_en_stream": False,
+    },
+}
+
+# Para estimar tokens cuando el servidor no manda usage en streaming
+CARACTERES_POR_TOKEN = 4
+
+# Los reintentos los hace completar() y no el SDK (max_retries=0), así quedan en el registro
+REINTENTOS_LLM = 5
+ESPERA_REINTENTO_LLM = 0.5         # segundos; se duplica en cada reintento
+ERRORES_LLM_REINTENTABLES = {"APIConnectionError", "APITimeoutError"}
+
+# tarea: proveedor
+RUTAS = {
+    "limpieza": "openai",              # procesar_lecturas.limpiar_lectura
+    "preguntas_vof": "openai",         # procesar_lecturas.generar_preguntas
+    "limpieza_y_preguntas": "openai",  # procesar_lecturas.limpiar_y_generar
+    "preguntas_om": "openai",          # generar_preguntas.py
+}
+
+
+def _reintentable(e):
+    """429, errores 5xx y fallas de conexión del SDK de OpenAI"""
+    estado = getattr(e, "status_code", None)
+    if estado is not None:
+        return estado == 429 or estado >= 500
+    return type(e).__name__ in ERRORES_LLM_REINTENTABLES
+
+
+class ProveedorLLM:
+    """Un endpoint compatible con OpenAI con su modelo y su límite de concurrencia"""
+
+    def __init__(self, nombre, base_url=None, api_key=None, modelo="gpt-4o-mini", concurrencia=8,
+                 timeout=60, uso_en_stream=True):
+        self.nombre = nombre
+        self.base_url = base_url
+        self.api_key = api_key
+        self.modelo = modelo
+        self.timeout = timeout
+        self.uso_en_stream = uso_en_stream
+        self.semaforo = threading.BoundedSemaphore(concurrencia)
+        self._cliente = None
+        self._lock = threading.Lock()
+
+    def cliente(self):
+        """Cliente de OpenAI apuntando al proveedor, creado (e importado) al primer uso"""
+        with self._lock:
+            if self._cliente is None:
+                from openai import OpenAI
+                self._cliente = OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=self.timeout,
+                                       max_retries=0)
+            return self._cliente
+
+    def _crear(self, registro, **argumentos):
+        """chat.completions.create con reintentos y espera exponencial, contados en el registro"""
+        for intento in range(REINTENTOS_LLM):
+            try:
+                return self.cliente().chat.completions.create(model=self.modelo, **argumentos)
+            except Exception as e:
+                if not _reintentable(e) or intento == REINTENTOS_LLM - 1:
+                    raise
+                if registro is not None:
+                    registro["reintentos"] += 1
+                time.sleep(ESPERA_REINTENTO_LLM * 2 ** intento)
+
+    def _registrar(self, registro, respuesta):
+        if registro is not None:
+            registrar_uso(registro, respuesta, self.modelo)
+            registro["proveedor"] = self.nombre
+
+    def _estimar_uso(self, registro, prompt, respuesta):
+        """Tokens estimados por largo del texto, para servidores que no mandan usage"""
+        if registro is None:
+            return
+        tokens_prompt = len(prompt) // CARACTERES_POR_TOKEN + 1
+        tokens_completion = len(respuesta) // CARACTERES_POR_TOKEN + 1
+        registro["tokens_prompt"] += tokens_prompt
+        registro["tokens_completion"] += tokens_completion
+        registro["costo_usd"] += costo_tokens(self.modelo, tokens_prompt, tokens_completion)
+        registro["modelo"] = self.modelo
+        registro["proveedor"] = self.nombre
+        registro["tokens_estimados"] = True
+
+    def completar(self, prompt, registro=None, **opciones):
+        """Texto de la respuesta a un prompt de usuario"""
+        with self.semaforo:
+            response = self._crear(registro, messages=[{"role": "user", "content": prompt}], **opciones)
+        contenido = response.choices[0].message.content
+        if getattr(response, "usage", None):
+            self._registrar(registro, response)
+        else:
+            self._estimar_uso(registro, prompt, contenido or "")
+        return contenido
+
+    def completar_stream(self, prompt, registro=None, **opciones):
+        """
+        Genera los fragmentos de texto de la respuesta a medida que llegan. Si el
+        servidor no informa el uso, los tokens se estiman por largo del texto
+        (y el registro queda con tokens_estimados=True).
+        """
+        if self.uso_en_stream:
+            opciones.setdefault("stream_options", {"include_usage": True})
+        if registro is not None:
+            registro["proveedor"] = self.nombre
+        partes, con_uso = [], False
+        with self.semaforo:
+            # Solo se reintenta la creación: una vez que llegan fragmentos no se repite
+            stream = self._crear(registro, messages=[{"role": "user", "content": prompt}], stream=True, **opciones)
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    partes.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None):
+                    self._registrar(registro, chunk)
+                    con_uso = True
+        if not con_uso:
+            self._estimar_uso(registro, prompt, "".join(partes))
+
+
+@lru_cache(maxsize=None)
+def proveedor(nombre):
+    if nombre not in PROVEEDORES:
+        raise ValueError(f"Proveedor desconocido: {nombre} (disponibles: {', '.join(PROVEEDORES)})")
+    return ProveedorLLM(nombre, **PROVEEDORES[nombre])
+
+
+def configurar_rutas(asignaciones):
+    """Aplica asignaciones "tarea=proveedor" (lista o texto separado por comas) a RUTAS"""
+    if isinstance(asignaciones, str):
+        asignaciones = asignaciones.split(",")
+    for asignacion in asignaciones:
+        if not asignacion.strip():
+            continue
+        tarea, _, nombre = asignacion.partition("=")
+        tarea, nombre = tarea.strip(), nombre.strip()
+        if tarea not in RUTAS and tarea != "todas":
+            raise ValueError(f"Tarea desconocida: {tarea} (disponibles: todas, {', '.join(RUTAS)})")
+        proveedor(nombre)  # valida el nombre
+        for t in (RUTAS if tarea == "todas" else [tarea]):
+            RUTAS[t] = nombre
+
+
+configurar_rutas(os.getenv("LLM_RUTAS", ""))
+
+
+def proveedor_para(tarea):
+    return proveedor(RUTAS[tarea])
+
+
+def completar(tarea, prompt, registro=None, **opciones):
+    return proveedor_para(tarea).completar(prompt, registro, **opciones)
+
+
+def completar_stream(tarea, prompt, registro=None, **opciones):
+    return proveedor_para(tarea).completar_stream(prompt, registro, **opciones)
@@ -0,0 +1,79 @@
+"""
+Puntos de control por lectura para poder reanudar una corrida
+
+Cada lectura terminada se guarda de inmediato en
+corridas/<run_id>/puntos_control/<grupo>/<lectura>.json con escritura atómica
+(archivo temporal + os.replace), así un Ctrl-C o una caída nunca deja un archivo
+a medias. Al volver a correr con el mismo --run-id se saltan las lecturas que ya
+tienen su punto de control y la salida final se arma a partir de ellos.
+
+Cada punto de control guarda el hash del texto de entrada: si la lectura cambió
+desde entonces se vuelve a procesar.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from instrumentacion import CORRIDAS_DIR, run_id_actual
+
+
+def huella(texto):
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _nombre_archivo(clave):
+    """Nombre legible y seguro para el archivo; el hash evita choques entre claves parecidas"""
+    legible = re.sub(r"[^\w.-]+", "_", str(clave)).strip("_")[:60]
+    return f"{legible}_{huella(str(clave))[:8]}.json"
+
+
+class PuntosControl:
+    """Puntos de control de un grupo (p. ej. un libro) dentro de la corrida en curso"""
+
+    def __init__(self, grupo="lecturas", run_id=None):
+        run_id = run_id or run_id_actual()
+        if run_id is None:
+            raise RuntimeError("PuntosControl necesita una corrida: llama a iniciar() antes")
+        self.directorio = os.path.join(CORRIDAS_DIR, run_id, "puntos_control", grupo)
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, _nombre_archivo(clave))
+
+    def cargar(self, clave, texto=None):
+        """Resultado guardado de la clave, o None si no hay (o si el texto de entrada cambió)"""
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, "r", encoding="utf-8") as f:
+            punto = json.load(f)
+        if texto is not None and punto.get("huella") != huella(texto):
+            return None
+        return punto
+
+    def guardar(self, clave, resultado, texto=None):
+        """Escribe el resultado de la clave de forma atómica"""
+        punto = {"clave": clave, "huella": huella(texto) if texto is not None else None, "resultado": resultado}
+        ruta = self._ruta(clave)
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(punto, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(ruta + ".tmp", ruta)
+
+    def pendientes(self, lecturas):
+        """
+        Separa {clave: texto} en (hechos, pendientes): hechos es {clave: resultado}
+        de los puntos de control válidos, pendientes el resto en el mismo orden
+        (incluidas las claves cuyo resultado guardado es None).
+        """
+        hechos, pendientes = {}, {}
+        for clave, texto in lecturas.items():
+            punto = self.cargar(clave, texto)
+            if punto is None or punto["resultado"] is None:
+                pendientes[clave] = texto
+            else:
+                hechos[clave] = punto["resultado"]
+        return hechos, pendientes
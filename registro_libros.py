@@ -0,0 +1,123 @@
+"""
+Registro de libros de texto (conaliteg) que alimentan el pipeline
+
+Cada libro se describe en libros.json con su código, año, número de páginas y el
+JSON con los rangos de páginas de sus lecturas. Las rutas de trabajo (páginas
+descargadas, PDF, textos por lectura, banco de preguntas) se derivan del libro,
+así cada grado tiene su propia caché y agregar uno nuevo no rehace los demás.
+
+Para agregar un libro basta con una entrada nueva en libros.json:
+
+    {"codigo": "P5MLA", "anio": 2024, "grado": 5, "paginas": 271,
+     "lecturas": "lecturas_quinto.json"}
+"""
+
+import json
+import os
+
+# === CONFIGURACIÓN ===
+REGISTRO_JSON = "libros.json"
+URL_BASE = "https://libros.conaliteg.gob.mx/{anio}/c/{codigo}/{pagina:03d}.jpg"
+
+
+def completar_libro(libro):
+    """Rellena las rutas que no vienen en el registro con valores por libro"""
+    codigo = libro["codigo"]
+    libro = dict(libro)
+    libro.setdefault("directorio", os.path.join("libros", codigo))
+    libro.setdefault("pdf", f"{codigo}.pdf")
+    libro.setdefault("textos", os.path.join(libro["directorio"], "lecturas_txt"))
+    # Texto que saca pdfplumber del PDF OCR; va aparte para no pisar "textos"
+    # (que puede venir de Textract o estar corregido a mano)
+    libro.setdefault("textos_pdfplumber", os.path.join(libro["directorio"], "textos_lecturas"))
+    # Nombre del documento en S3 para Textract
+    libro.setdefault("documento_s3", libro["pdf"])
+    return libro
+
+
+def cargar_registro(ruta=REGISTRO_JSON):
+    """Devuelve un dict codigo -> libro con todas sus rutas resueltas"""
+    with open(ruta, "r", encoding="utf-8") as f:
+        libros = json.load(f)
+    return {libro["codigo"]: completar_libro(libro) for libro in libros}
+
+
+def seleccionar_libros(codigos=None, ruta=REGISTRO_JSON):
+    """Libros a procesar: los códigos indicados o todo el registro"""
+    registro = cargar_registro(ruta)
+    if not codigos:
+        return list(registro.values())
+    faltantes = [c for c in codigos if c not in registro]
+    if faltantes:
+        raise KeyError(f"Libros no registrados en {ruta}: {faltantes}. Disponibles: {list(registro)}")
+    return [registro[c] for c in codigos]
+
+
+def url_pagina(libro, pagina):
+    """URL de la imagen de una página en conaliteg"""
+    return URL_BASE.format(anio=libro["anio"], codigo=libro["codigo"], pagina=pagina)
+
+
+def ruta_pagina(libro, pagina):
+    """Ruta local de la imagen descargada de una página"""
+    return os.path.join(libro["directorio"], f"pagina_{pagina:03d}.jpg")
+
+
+def ruta_pdf(libro):
+    """PDF armado con las páginas del libro"""
+    return os.path.join(libro["directorio"], libro["pdf"])
+
+
+def ruta_pdf_ocr(libro):
+    """PDF con capa de texto generado por ocrmypdf"""
+    base, ext = os.path.splitext(libro["pdf"])
+    return os.path.join(libro["directorio"], f"{base}_ocr{ext}")
+
+
+def ruta_textos_pagina(libro):
+    """Carpeta con el texto extraído de cada página (pagina_NNN.txt)"""
+    return os.path.join(libro["directorio"], "paginas_txt")
+
+
+def ruta_banco_preguntas(libro):
+    """Banco de preguntas de opción múltiple generado para el libro"""
+    return os.path.join(libro["directorio"], "banco_preguntas.json")
+
+
+def ruta_mapa_paginas(libro):
+    """Mapa de páginas del PDF OCR: la página k del PDF es la original paginas[k-1]"""
+    return os.path.join(libro["directorio"], "mapa_paginas.json")
+
+
+def cargar_mapa_paginas(libro):
+    """Devuelve {página original: índice 0-based en el PDF OCR}; identidad si no hay mapa"""
+    ruta = ruta_mapa_paginas(libro)
+    if not os.path.exists(ruta):
+        return {i: i - 1 for i in range(1, libro["paginas"] + 1)}
+    with open(ruta, "r", encoding="utf-8") as f:
+        paginas = json.load(f)["paginas"]
+    return {original: k for k, original in enumerate(paginas)}
+
+
+def cargar_lecturas(libro):
+    """Lee el JSON de lecturas del libro: [{"lectura": ..., "paginas": "ini-fin"}]"""
+    with open(libro["lecturas"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rango_paginas(paginas):
+    """Convierte "ini-fin" (o "n") en la tupla (ini, fin)"""
+    if "-" in paginas:
+        inicio, fin = map(int, paginas.split("-"))
+    else:
+        inicio = fin = int(paginas)
+    return inicio, fin
+
+
+def paginas_necesarias(libro):
+    """Unión ordenada de las páginas que cubren las lecturas del libro"""
+    paginas = set()
+    for lectura in cargar_lecturas(libro):
+        inicio, fin = rango_paginas(lectura["paginas"])
+        paginas.update(range(inicio, fin + 1))
+    return sorted(paginas)
@@ -0,0 +1,276 @@
+"""
+Respaldo y restauración de la colección de lecturas en Firestore
+
+exportar: recorre la colección página por página con cursores (ordenada por ID)
+y escribe cada documento como una línea JSON en un archivo .jsonl.gz. La memoria
+usada no depende del tamaño de la colección.
+
+restaurar: lee el respaldo en streaming y escribe con batches de hasta 500
+documentos, varios batches en paralelo.
+
+Las dos operaciones guardan su avance en <archivo>.estado.json y, si se
+interrumpen, al volver a correrlas continúan desde el último cursor / lote.
+Cada página exportada es un miembro gzip completo y el estado guarda el tamaño
+del archivo hasta la última página confirmada: al reanudar se corta lo que haya
+después (una página a medias o sin confirmar), así no quedan miembros rotos ni
+documentos repetidos.
+
+Uso:
+    python3 respaldo_firestore.py exportar --salida respaldo_lecturas.jsonl.gz --subcolecciones
+    python3 respaldo_firestore.py restaurar --entrada respaldo_lecturas.jsonl.gz --emulador localhost:8080
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+# === CONFIGURACIÓN ===
+FIREBASE_CREDENTIALS = "firebase-credentials.json"
+COLECCION = "lecturas"
+TAMANO_PAGINA = 300          # documentos por consulta al exportar
+TAMANO_LOTE = 500            # máximo de escrituras por batch en Firestore
+HILOS_RESTAURACION = 8
+PROYECTO_EMULADOR = "demo-tt-b159"
+
+
+def conectar(emulador=None, proyecto=None):
+    """Cliente de Firestore: el emulador si se indica, si no producción con credenciales"""
+    if emulador:
+        os.environ["FIRESTORE_EMULATOR_HOST"] = emulador
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        print(f"🧪 Usando el emulador en {os.environ['FIRESTORE_EMULATOR_HOST']}")
+        return firestore.Client(project=proyecto or PROYECTO_EMULADOR)
+
+    from firebase_admin import credentials, firestore, initialize_app
+    if not os.path.exists(FIREBASE_CREDENTIALS):
+        print(f"❌ ERROR: No se encontró el archivo de credenciales '{FIREBASE_CREDENTIALS}'")
+        return None
+    initialize_app(credentials.Certificate(FIREBASE_CREDENTIALS))
+    return firestore.client()
+
+
+# === SERIALIZACIÓN DE TIPOS DE FIRESTORE ===
+
+def codificar(valor):
+    """Convierte tipos de Firestore a JSON marcando el tipo para poder restaurarlos"""
+    if isinstance(valor, dict):
+        return {k: codificar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [codificar(v) for v in valor]
+    if isinstance(valor, datetime):
+        return {"__tipo": "fecha", "valor": valor.isoformat()}
+    if isinstance(valor, bytes):
+        return {"__tipo": "bytes", "valor": base64.b64encode(valor).decode("ascii")}
+    if hasattr(valor, "latitude") and hasattr(valor, "longitude"):
+        return {"__tipo": "geopunto", "valor": [valor.latitude, valor.longitude]}
+    if hasattr(valor, "path") and hasattr(valor, "collection"):
+        return {"__tipo": "referencia", "valor": valor.path}
+    return valor
+
+
+def decodificar(valor, db):
+    """Inverso de codificar()"""
+    if isinstance(valor, list):
+        return [decodificar(v, db) for v in valor]
+    if not isinstance(valor, dict):
+        return valor
+    tipo = valor.get("__tipo")
+    if tipo == "fecha":
+        return datetime.fromisoformat(valor["valor"])
+    if tipo == "bytes":
+        return base64.b64decode(valor["valor"])
+    if tipo == "geopunto":
+        from google.cloud.firestore import GeoPoint
+        return GeoPoint(*valor["valor"])
+    if tipo == "referencia":
+        return db.document(valor["valor"])
+    return {k: decodificar(v, db) for k, v in valor.items()}
+
+
+# === ESTADO PARA REANUDAR ===
+
+def ruta_estado(archivo):
+    return archivo + ".estado.json"
+
+
+def leer_estado(archivo):
+    ruta = ruta_estado(archivo)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_estado(archivo, estado):
+    """Escribe el estado de forma atómica"""
+    tmp = ruta_estado(archivo) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp, ruta_estado(archivo))
+
+
+# === EXPORTACIÓN ===
+
+def _escribir_documento(salida, snapshot, subcolecciones):
+    """Escribe un documento (y recursivamente sus subcolecciones); devuelve cuántos escribió"""
+    salida.append(json.dumps({"ruta": snapshot.reference.path, "datos": codificar(snapshot.to_dict())},
+                            ensure_ascii=False) + "\n")
+    escritos = 1
+    if subcolecciones:
+        for sub in snapshot.reference.collections():
+            for hijo in sub.stream():
+                escritos += _escribir_documento(salida, hijo, subcolecciones)
+    return escritos
+
+
+def exportar(db, archivo, coleccion=COLECCION, subcolecciones=False, tamano_pagina=TAMANO_PAGINA):
+    """Exporta la colección a JSONL comprimido; continúa desde el cursor guardado si existe"""
+    estado = leer_estado(archivo)
+    if estado and estado.get("terminado"):
+        print(f"✅ {archivo} ya está completo ({estado['documentos']} documentos)")
+        return estado["documentos"]
+    if estado and estado["coleccion"] != coleccion:
+        raise ValueError(f"El estado de {archivo} corresponde a la colección '{estado['coleccion']}'")
+
+    if estado and "bytes" not in estado:
+        print(f"⚠️ El estado de {archivo} es de una versión anterior; se exporta desde el principio")
+        estado = None
+    estado = estado or {"coleccion": coleccion, "cursor": None, "documentos": 0, "bytes": 0, "terminado": False}
+    if estado["cursor"]:
+        print(f"↩️  Reanudando después de '{estado['cursor']}' ({estado['documentos']} documentos ya exportados)")
+
+    ref = db.collection(coleccion)
+    ultimo = ref.document(estado["cursor"]).get() if estado["cursor"] else None
+
+    # gzip admite varios miembros concatenados: cada página es un miembro completo
+    with open(archivo, "ab") as salida:
+        salida.truncate(estado["bytes"])
+        salida.seek(estado["bytes"])
+        while True:
+            consulta = ref.order_by("__name__").limit(tamano_pagina)
+            if ultimo is not None:
+                consulta = consulta.start_after(ultimo)
+            pagina = list(consulta.stream())
+            if not pagina:
+                break
+
+            lineas = []
+            escritos = sum(_escribir_documento(lineas, snapshot, subcolecciones) for snapshot in pagina)
+            salida.write(gzip.compress("".join(lineas).encode("utf-8")))
+            salida.flush()
+            os.fsync(salida.fileno())
+            # El estado se confirma después de que la página quedó completa en disco
+            ultimo = pagina[-1]
+            estado.update(cursor=ultimo.id, documentos=estado["documentos"] + escritos, bytes=salida.tell())
+            guardar_estado(archivo, estado)
+            print(f"   • {estado['documentos']} documentos exportados (cursor: {ultimo.id})")
+
+            if len(pagina) < tamano_pagina:
+                break
+
+    estado["terminado"] = True
+    guardar_estado(archivo, estado)
+    print(f"✅ Exportación completa: {estado['documentos']} documentos en {archivo}")
+    return estado["documentos"]
+
+
+# === RESTAURACIÓN ===
+
+def _lotes(archivo, saltar, hechos=()):
+    """Genera (número de lote, [(ruta, datos)]) a partir del lote 'saltar', sin los de hechos"""
+    lote, numero = [], 0
+    with gzip.open(archivo, "rt", encoding="utf-8") as entrada:
+        for linea in entrada:
+            lote.append(linea)
+            if len(lote) == TAMANO_LOTE:
+                if numero >= saltar and numero not in hechos:
+                    yield numero, [json.loads(l) for l in lote]
+                lote, numero = [], numero + 1
+        if lote and numero >= saltar and numero not in hechos:
+            yield numero, [json.loads(l) for l in lote]
+
+
+def restaurar(db, archivo, hilos=HILOS_RESTAURACION):
+    """Restaura un respaldo con batches en paralelo; continúa desde el último lote confirmado"""
+    estado = leer_estado(archivo + ".restauracion") or {"lotes": 0, "terminados": [], "documentos": 0}
+    if estado["lotes"] or estado.get("terminados"):
+        print(f"↩️  Reanudando desde el lote {estado['lotes']} ({estado['documentos']} documentos ya restaurados)")
+
+    # Lotes confirmados fuera de orden (después de 'lotes'): no se repiten ni se cuentan dos veces
+    terminados = set(estado.get("terminados", []))
+    lock = threading.Lock()
+
+    def escribir(numero, documentos):
+        batch = db.batch()
+        for doc in documentos:
+            batch.set(db.document(doc["ruta"]), decodificar(doc["datos"], db))
+        batch.commit()
+        return numero, len(documentos)
+
+    def confirmar(futuro):
+        # El avance solo cuenta lotes contiguos: así reanudar nunca se salta uno
+        numero, n = futuro.result()
+        with lock:
+            if numero in terminados or numero < estado["lotes"]:
+                return
+            terminados.add(numero)
+            estado["documentos"] += n
+            while estado["lotes"] in terminados:
+                terminados.discard(estado["lotes"])
+                estado["lotes"] += 1
+            estado["terminados"] = sorted(terminados)
+            guardar_estado(archivo + ".restauracion", estado)
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        pendientes = set()
+        for numero, documentos in _lotes(archivo, estado["lotes"], set(terminados)):
+            # Limitar los lotes en memoria a dos por hilo
+            if len(pendientes) >= hilos * 2:
+                hechos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    confirmar(futuro)
+            pendientes.add(pool.submit(escribir, numero, documentos))
+        for futuro in wait(pendientes).done:
+            confirmar(futuro)
+
+    print(f"✅ Restauración completa: {estado['documentos']} documentos")
+    return estado["documentos"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Respaldo y restauración de Firestore en JSONL comprimido")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_exp = sub.add_parser("exportar", help="Exportar una colección")
+    p_exp.add_argument("--salida", default=f"respaldo_{COLECCION}.jsonl.gz")
+    p_exp.add_argument("--coleccion", default=COLECCION)
+    p_exp.add_argument("--subcolecciones", action="store_true", help="Incluir subcolecciones de cada documento")
+    p_exp.add_argument("--tamano-pagina", type=int, default=TAMANO_PAGINA)
+
+    p_res = sub.add_parser("restaurar", help="Restaurar un respaldo")
+    p_res.add_argument("--entrada", default=f"respaldo_{COLECCION}.jsonl.gz")
+    p_res.add_argument("--hilos", type=int, default=HILOS_RESTAURACION)
+
+    for p in (p_exp, p_res):
+        p.add_argument("--emulador", help="host:puerto del emulador de Firestore (p. ej. localhost:8080)")
+        p.add_argument("--proyecto", help="ID de proyecto para el emulador")
+    args = parser.parse_args()
+
+    db = conectar(args.emulador, args.proyecto)
+    if db is None:
+        return
+
+    if args.comando == "exportar":
+        exportar(db, args.salida, args.coleccion, args.subcolecciones, args.tamano_pagina)
+    else:
+        restaurar(db, args.entrada, args.hilos)
+
+
+if __name__ == "__main__":
+    main()
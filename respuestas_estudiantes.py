@@ -0,0 +1,375 @@
+"""
+Respuestas de los estudiantes a las preguntas de verdadero/falso
+
+Ingesta: cada respuesta se agrega primero a un buffer local (JSONL) y se escribe
+a Firestore en batches. Por cada batch se guardan los eventos en la colección
+respuestas/ (IDs aleatorios, sin documentos "calientes") y, en el mismo batch,
+se incrementan contadores repartidos en shards (el shard sale del ID del evento):
+
+contadores_preguntas/{id_pregunta}/shards/{0..N-1}   {respuestas, correctas}
+contadores_niveles/{dificultad}/shards/{0..N-1}      {respuestas, correctas}
+
+Cada shard aguanta ~1 escritura por segundo; con N shards por contador el límite
+sube a N escrituras por segundo aunque todos respondan la misma pregunta.
+
+Agregación (offline, con NumPy): a partir de un respaldo de respuestas/
+(respaldo_firestore.py exportar --coleccion respuestas) calcula por pregunta la
+dificultad (proporción de aciertos) y la discriminación (correlación punto
+biserial entre acertar la pregunta y el desempeño en las demás).
+
+Uso:
+    python3 respuestas_estudiantes.py simular --estudiantes 300 --salida respuestas_sim.jsonl
+    python3 respuestas_estudiantes.py ingerir --entrada respuestas_sim.jsonl --emulador localhost:8080
+    python3 respuestas_estudiantes.py agregar --entrada respaldo_respuestas.jsonl.gz --salida analisis.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from armar_cuestionarios import armar_cuestionario, cargar_banco
+from instrumentacion import etapa, finalizar, iniciar
+
+# === CONFIGURACIÓN ===
+COLECCION_RESPUESTAS = "respuestas"
+COLECCION_CONTADORES_PREGUNTAS = "contadores_preguntas"
+COLECCION_CONTADORES_NIVELES = "contadores_niveles"
+NUM_SHARDS = 10
+TAMANO_LOTE = 500             # máximo de escrituras por batch en Firestore
+EVENTOS_POR_VACIADO = 200     # eventos en el buffer antes de escribirlos
+BUFFER_LOCAL = "respuestas_pendientes.jsonl"
+
+# Umbrales para marcar preguntas a revisar
+DIFICULTAD_MUY_FACIL = 0.90
+DIFICULTAD_MUY_DIFICIL = 0.20
+DISCRIMINACION_MINIMA = 0.15
+MIN_RESPUESTAS = 20
+
+
+def crear_evento(estudiante, pregunta, respuesta_dada, cuestionario=None):
+    """Evento de respuesta a partir de una pregunta del banco compilado"""
+    return {
+        "id": uuid.uuid4().hex,
+        "estudiante": estudiante,
+        "pregunta": pregunta["id"],
+        "lectura": pregunta["origen"],
+        "dificultad": pregunta["dificultad"],
+        "respuesta": bool(respuesta_dada),
+        "correcta": bool(respuesta_dada) == bool(pregunta["respuesta"]),
+        "cuestionario": cuestionario,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+# === INGESTA ===
+
+def _incremento(n):
+    from google.cloud.firestore import Increment
+    return Increment(n)
+
+
+class BufferRespuestas:
+    """
+    Acumula eventos en un archivo local y los escribe a Firestore por lotes.
+
+    Cada evento va en el mismo batch que sus incrementos (los batches son
+    atómicos) y su shard sale del ID del evento. Así, que respuestas/{id} exista
+    significa que sus contadores ya se sumaron. Los eventos que pudieron quedar
+    escritos (los que se reenvían desde el archivo al arrancar o los de un batch
+    que falló) se revisan antes de reintentarlos, y se saltan los que ya están.
+    """
+
+    def __init__(self, db, ruta=BUFFER_LOCAL, eventos_por_vaciado=EVENTOS_POR_VACIADO,
+                 num_shards=NUM_SHARDS, incremento=_incremento):
+        self.db = db
+        self.ruta = ruta
+        self.eventos_por_vaciado = eventos_por_vaciado
+        self.num_shards = num_shards
+        self.incremento = incremento
+        self.lock = threading.Lock()
+        self.pendientes = []
+        self._dudosos = set()  # IDs de eventos que quizá ya se escribieron
+        if os.path.exists(ruta):
+            with open(ruta, "r", encoding="utf-8") as f:
+                self.pendientes = [json.loads(l) for l in f if l.strip()]
+            self._dudosos = {e["id"] for e in self.pendientes}
+            if self.pendientes:
+                print(f"↩️  {len(self.pendientes)} respuestas pendientes en {ruta}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.vaciar()
+
+    def registrar(self, evento):
+        """Agrega un evento al buffer; escribe el lote cuando se llena"""
+        with self.lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+            self.pendientes.append(evento)
+            lleno = len(self.pendientes) >= self.eventos_por_vaciado
+        if lleno:
+            self.vaciar()
+
+    def shard(self, evento):
+        """Shard fijo por evento: reintentar un evento nunca toca otro shard"""
+        return str(int(hashlib.sha1(evento["id"].encode()).hexdigest()[:8], 16) % self.num_shards)
+
+    def _ya_escritos(self, eventos):
+        """IDs de los eventos dudosos que ya están en respuestas/"""
+        refs = [self.db.collection(COLECCION_RESPUESTAS).document(e["id"]) for e in eventos if e["id"] in self._dudosos]
+        if not refs:
+            return set()
+        return {doc.id for doc in self.db.get_all(refs) if doc.exists}
+
+    def _lotes(self, eventos):
+        """
+        Reparte los eventos en batches de hasta TAMANO_LOTE escrituras. Cada
+        batch lleva sus eventos y la suma de sus incrementos por shard.
+        """
+        lote, shards = [], {}
+        for e in eventos:
+            claves = [(coleccion, clave, self.shard(e))
+                      for coleccion, clave in ((COLECCION_CONTADORES_PREGUNTAS, e["pregunta"]),
+                                               (COLECCION_CONTADORES_NIVELES, e["dificultad"]))]
+            nuevas = [c for c in claves if c not in shards]
+            if lote and len(lote) + len(shards) + 1 + len(nuevas) > TAMANO_LOTE:
+                yield lote, shards
+                lote, shards = [], {}
+            lote.append(e)
+            for c in claves:
+                suma = shards.setdefault(c, Counter())
+                suma["respuestas"] += 1
+                suma["correctas"] += int(e["correcta"])
+        if lote:
+            yield lote, shards
+
+    def _escribir(self, lote, shards):
+        batch = self.db.batch()
+        for e in lote:
+            batch.set(self.db.collection(COLECCION_RESPUESTAS).document(e["id"]), e)
+        for (coleccion, clave, shard), suma in shards.items():
+            ref = self.db.collection(coleccion).document(clave).collection("shards").document(shard)
+            batch.set(ref, {campo: self.incremento(n) for campo, n in suma.items()}, merge=True)
+        batch.commit()
+        return len(lote) + len(shards)
+
+    def vaciar(self):
+        """Escribe los eventos pendientes y vacía el archivo local; devuelve cuántos escribió"""
+        with self.lock:
+            if not self.pendientes:
+                return 0
+            with etapa("respuestas", len(self.pendientes)) as reg:
+                escritos = self._ya_escritos(self.pendientes)
+                if escritos:
+                    print(f"   ↩️  {len(escritos)} respuestas ya estaban en Firestore, se omiten")
+                eventos = [e for e in self.pendientes if e["id"] not in escritos]
+                confirmados = 0
+                try:
+                    for lote, shards in self._lotes(eventos):
+                        reg["ops_firestore"] += self._escribir(lote, shards)
+                        confirmados += len(lote)
+                except Exception:
+                    # Lo no confirmado sigue pendiente (y en el archivo); como un
+                    # commit fallido pudo haberse aplicado, se revisa al reintentar
+                    self.pendientes = eventos[confirmados:]
+                    self._dudosos.update(e["id"] for e in self.pendientes)
+                    raise
+            # Solo se borra el archivo cuando todo quedó confirmado
+            self.pendientes = []
+            self._dudosos.clear()
+            open(self.ruta, "w").close()
+            return len(eventos)
+
+
+def leer_contador(db, coleccion, clave):
+    """Suma los shards de un contador: {"respuestas": n, "correctas": n}"""
+    total = Counter()
+    for shard in db.collection(coleccion).document(clave).collection("shards").stream():
+        total.update({k: v for k, v in (shard.to_dict() or {}).items() if isinstance(v, (int, float))})
+    return {"respuestas": total["respuestas"], "correctas": total["correctas"]}
+
+
+# === AGREGACIÓN OFFLINE ===
+
+def leer_eventos(ruta):
+    """Eventos de un JSONL (o .jsonl.gz): eventos sueltos o filas de respaldo_firestore.py"""
+    abrir = gzip.open if ruta.endswith(".gz") else open
+    with abrir(ruta, "rt", encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            fila = json.loads(linea)
+            if "ruta" in fila and "datos" in fila:
+                if not fila["ruta"].startswith(COLECCION_RESPUESTAS + "/"):
+                    continue
+                fila = fila["datos"]
+            yield fila
+
+
+def agregar(eventos, banco=None):
+    """
+    Dificultad y discriminación de cada pregunta en una sola pasada matricial.
+    Arma la matriz estudiante × pregunta (NaN = no respondió; si respondió varias
+    veces cuenta la última) y devuelve una lista de dicts por pregunta.
+    """
+    import numpy as np
+
+    estudiantes, preguntas, info = {}, {}, {}
+    filas, columnas, valores = [], [], []
+    for e in eventos:
+        fila = estudiantes.setdefault(e["estudiante"], len(estudiantes))
+        columna = preguntas.setdefault(e["pregunta"], len(preguntas))
+        info.setdefault(e["pregunta"], (e.get("lectura"), e.get("dificultad")))
+        filas.append(fila)
+        columnas.append(columna)
+        valores.append(1.0 if e["correcta"] else 0.0)
+    if not valores:
+        return []
+
+    X = np.full((len(estudiantes), len(preguntas)), np.nan)
+    X[np.array(filas), np.array(columnas)] = np.array(valores)
+    respondida = ~np.isnan(X)
+    aciertos = np.where(respondida, X, 0.0)
+
+    n = respondida.sum(axis=0)
+    dificultad = aciertos.sum(axis=0) / np.maximum(n, 1)
+
+    # Desempeño de cada estudiante en las demás preguntas (sin la propia)
+    total_aciertos = aciertos.sum(axis=1, keepdims=True)
+    total_respondidas = respondida.sum(axis=1, keepdims=True)
+    otras = total_respondidas - respondida
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resto = np.where(otras > 0, (total_aciertos - aciertos) / otras, np.nan)
+
+    # Correlación de Pearson por columna entre acierto y resto (punto biserial)
+    valida = respondida & ~np.isnan(resto)
+    m = valida.sum(axis=0)
+    x = np.where(valida, aciertos, 0.0)
+    y = np.where(valida, resto, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_x = x.sum(axis=0) / m
+        media_y = y.sum(axis=0) / m
+        dx = np.where(valida, x - media_x, 0.0)
+        dy = np.where(valida, y - media_y, 0.0)
+        discriminacion = (dx * dy).sum(axis=0) / np.sqrt((dx ** 2).sum(axis=0) * (dy ** 2).sum(axis=0))
+
+    afirmaciones = {}
+    if banco:
+        afirmaciones = {p["id"]: p["afirmacion"] for p in banco["preguntas"]}
+
+    resultados = []
+    for pregunta, j in preguntas.items():
+        lectura, nivel = info[pregunta]
+        d = float(discriminacion[j]) if np.isfinite(discriminacion[j]) else None
+        p = float(dificultad[j])
+        alertas = []
+        if n[j] >= MIN_RESPUESTAS:
+            if p >= DIFICULTAD_MUY_FACIL:
+                alertas.append("muy fácil")
+            if p <= DIFICULTAD_MUY_DIFICIL:
+                alertas.append("muy difícil")
+            if d is not None and d < DISCRIMINACION_MINIMA:
+                # Una discriminación negativa suele indicar una respuesta correcta mal marcada
+                alertas.append("discrimina al revés" if d < 0 else "discrimina poco")
+        resultados.append({
+            "pregunta": pregunta,
+            "afirmacion": afirmaciones.get(pregunta),
+            "lectura": lectura,
+            "nivel": nivel,
+            "respuestas": int(n[j]),
+            "dificultad": round(p, 3),
+            "discriminacion": round(d, 3) if d is not None else None,
+            "alertas": alertas,
+        })
+    resultados.sort(key=lambda r: (not r["alertas"], r["lectura"] or "", r["pregunta"]))
+    return resultados
+
+
+# === SIMULACIÓN ===
+
+def simular(banco, estudiantes, n=8, semilla=0, invertidas=()):
+    """
+    Eventos sintéticos: cada estudiante tiene una habilidad y contesta cuestionarios
+    de n preguntas; acierta con mayor probabilidad si la pregunta es más fácil.
+    invertidas son IDs de preguntas cuya respuesta se simula mal marcada.
+    """
+    rng = random.Random(semilla)
+    peso = {"fácil": 1.0, "intermedia": 0.0, "difícil": -1.0}
+    eventos = []
+    for s in range(estudiantes):
+        habilidad = rng.gauss(0, 1)
+        for indice in armar_cuestionario(banco, n, rng=rng):
+            p = banco["preguntas"][indice]
+            prob = 1 / (1 + math.exp(-(habilidad + peso[p["dificultad"]] + 0.5)))
+            if p["id"] in invertidas:
+                prob = 1 - prob
+            acierta = rng.random() < prob
+            eventos.append(crear_evento(f"est_{s:05d}", p, p["respuesta"] == acierta))
+    return eventos
+
+
+def conectar(emulador=None):
+    from respaldo_firestore import conectar as conectar_firestore
+    return conectar_firestore(emulador)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta y análisis de respuestas de estudiantes")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_sim = sub.add_parser("simular", help="Generar respuestas sintéticas en un JSONL")
+    p_sim.add_argument("--estudiantes", type=int, default=300)
+    p_sim.add_argument("--semilla", type=int, default=0)
+    p_sim.add_argument("--salida", default="respuestas_sim.jsonl")
+
+    p_ing = sub.add_parser("ingerir", help="Escribir respuestas de un JSONL a Firestore por lotes")
+    p_ing.add_argument("--entrada", required=True)
+    p_ing.add_argument("--emulador", help="host:puerto del emulador de Firestore")
+
+    p_agr = sub.add_parser("agregar", help="Dificultad y discriminación por pregunta")
+    p_agr.add_argument("--entrada", required=True, help="JSONL de eventos o respaldo de la colección respuestas")
+    p_agr.add_argument("--salida", help="Guardar el análisis en un JSON")
+    args = parser.parse_args()
+
+    if args.comando == "simular":
+        eventos = simular(cargar_banco(), args.estudiantes, semilla=args.semilla)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            for e in eventos:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        print(f"✅ {len(eventos)} respuestas de {args.estudiantes} estudiantes en {args.salida}")
+
+    elif args.comando == "ingerir":
+        db = conectar(args.emulador)
+        if db is None:
+            return
+        iniciar("respuestas_estudiantes")
+        with BufferRespuestas(db) as buffer:
+            for evento in leer_eventos(args.entrada):
+                buffer.registrar(evento)
+        finalizar()
+
+    else:
+        resultados = agregar(leer_eventos(args.entrada), cargar_banco())
+        con_alertas = [r for r in resultados if r["alertas"]]
+        print(f"📊 {len(resultados)} preguntas analizadas, {len(con_alertas)} a revisar\n")
+        for r in con_alertas:
+            print(f"   ⚠️  [{r['nivel']}] p={r['dificultad']:.2f} d={r['discriminacion']} "
+                  f"({r['respuestas']} resp.) {', '.join(r['alertas'])}: {(r['afirmacion'] or r['pregunta'])[:60]}")
+        if args.salida:
+            with open(args.salida, "w", encoding="utf-8") as f:
+                json.dump(resultados, f, ensure_ascii=False, indent=2)
+            print(f"\n✅ Análisis guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
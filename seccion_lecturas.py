@@ -1,5 +1,8 @@
-import pdfplumber
-import json, os
+import argparse
+import os
+
+from instrumentacion import etapa, finalizar, iniciar
+from registro_libros import cargar_lecturas, cargar_mapa_paginas, rango_paginas, ruta_pdf_ocr, seleccionar_libros
 
 '''lecturas = {
     "lectura1.txt": (5, 12),
@@ -8,24 +11,46 @@ import json, os
 }
 '''
 
-# Cargar las lecturas desde un archivo externo JSON
-lecturas = {}
-OUTPUT_DIR = "textos_lecturas"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-with open("lecturas_cuarto.json", "r", encoding="utf-8") as f:
-    lecturas = json.load(f)
-
-with pdfplumber.open(r"/home/eltr4ck/pythonUtils/libro_paginas_cuarto/libro_cuarto_ocr.pdf") as pdf:
-    for item in lecturas:
-        nombre = item["lectura"] + ".txt"
-        paginas = item["paginas"].split("-")
-        ini = int(paginas[0])
-        fin = int(paginas[1])
-        with open(os.path.join(OUTPUT_DIR, nombre), "w", encoding="utf-8") as f:
-            for i in range(ini-1, fin):  # pdfplumber es 0-index
-                page = pdf.pages[i]
-                text = page.extract_text()
-                if text:
-                    f.write(text + "\n\n")
-        print(f"{nombre} generado.")
+
+def extraer_lecturas(libro):
+    """Separa el PDF OCR del libro en un .txt por lectura"""
+    import pdfplumber
+
+    # Cargar las lecturas desde el JSON del libro
+    lecturas = cargar_lecturas(libro)
+    # Página original -> índice en el PDF (puede ser un PDF reducido a las lecturas)
+    mapa = cargar_mapa_paginas(libro)
+    output_dir = libro["textos_pdfplumber"]
+    os.makedirs(output_dir, exist_ok=True)
+
+    with pdfplumber.open(ruta_pdf_ocr(libro)) as pdf:
+        for item in lecturas:
+            nombre = item["lectura"] + ".txt"
+            ini, fin = rango_paginas(item["paginas"])
+            with etapa("extraccion", item["lectura"]) as reg, \
+                    open(os.path.join(output_dir, nombre), "w", encoding="utf-8") as f:
+                for p in range(ini, fin + 1):
+                    if p not in mapa:
+                        print(f"⚠️ Página {p} no está en el PDF OCR.")
+                        continue
+                    page = pdf.pages[mapa[p]]
+                    text = page.extract_text()
+                    if text:
+                        f.write(text + "\n\n")
+                        reg["bytes"] += len(text.encode("utf-8"))
+            print(f"[{libro['codigo']}] {nombre} generado.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae el texto de cada lectura desde el PDF OCR")
+    parser.add_argument("--libros", nargs="*", help="Códigos de libro (por defecto todos los de libros.json)")
+    args = parser.parse_args()
+
+    iniciar("seccion_lecturas")
+    for libro in seleccionar_libros(args.libros):
+        extraer_lecturas(libro)
+    finalizar()
+
+
+if __name__ == "__main__":
+    main()
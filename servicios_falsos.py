@@ -0,0 +1,434 @@
+"""
+Sustitutos locales de los servicios externos, para pruebas y benchmarks
+
+- ServidorPaginas: sirve las páginas JPG como si fuera libros.conaliteg.gob.mx
+- TextractFalso: cliente boto3 de Textract que devuelve bloques grabados
+- ServidorOpenAIFalso: /v1/chat/completions compatible con OpenAI (también en
+  streaming SSE), con latencia configurable y respuestas 429 aleatorias
+- FirestoreFalso: cliente de Firestore en memoria (collection/document/batch,
+  set con merge e incrementos)
+
+Ninguno necesita red ni credenciales.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from registro_libros import rango_paginas
+
+
+class _ServidorEnHilo:
+    """Base para servidores HTTP locales que corren en un hilo (puerto libre)"""
+
+    def __init__(self, manejador):
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), manejador)
+        self._servidor.daemon_threads = True
+        self._servidor.contexto = self
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address
+        return f"http://{host}:{puerto}"
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+# === PÁGINAS DEL LIBRO ===
+
+class _ManejadorPaginas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        ctx = self.server.contexto
+        m = re.search(r"/(\d+)\.jpg$", self.path)
+        if not m or not ctx.paginas:
+            self.send_error(404)
+            return
+        # Las páginas se repiten en ciclo para simular libros más grandes
+        origen = ctx.paginas[(int(m.group(1)) - 1) % len(ctx.paginas)]
+        with open(origen, "rb") as f:
+            datos = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorPaginas(_ServidorEnHilo):
+    """Sirve /{anio}/c/{codigo}/{NNN}.jpg a partir de las páginas ya descargadas"""
+
+    def __init__(self, directorio):
+        super().__init__(_ManejadorPaginas)
+        self.paginas = sorted(
+            os.path.join(directorio, f) for f in os.listdir(directorio) if f.endswith(".jpg")
+        )
+
+    @property
+    def url_base(self):
+        """Valor para registro_libros.URL_BASE"""
+        return self.url + "/{anio}/c/{codigo}/{pagina:03d}.jpg"
+
+
+# === TEXTRACT ===
+
+def bloques_desde_lecturas(lecturas, textos_dir, escala=1):
+    """
+    Arma bloques LINE de Textract repartiendo el texto de cada lectura entre sus
+    páginas. Con escala > 1 el libro se repite desplazando los números de página.
+    """
+    bloques = []
+    ultima_pagina = max(rango_paginas(l["paginas"])[1] for l in lecturas)
+    for copia in range(escala):
+        desplazamiento = copia * ultima_pagina
+        for lectura in lecturas:
+            ruta = os.path.join(textos_dir, lectura["lectura"] + ".txt")
+            if not os.path.exists(ruta):
+                continue
+            with open(ruta, "r", encoding="utf-8") as f:
+                lineas = [l for l in f.read().splitlines() if l.strip()]
+            inicio, fin = rango_paginas(lectura["paginas"])
+            n_paginas = fin - inicio + 1
+            por_pagina = max(1, -(-len(lineas) // n_paginas))
+            for i, linea in enumerate(lineas):
+                pagina = inicio + min(i // por_pagina, n_paginas - 1) + desplazamiento
+                bloques.append({"BlockType": "LINE", "Page": pagina, "Text": linea})
+    return bloques
+
+
+class ErrorClienteFalso(Exception):
+    """Como botocore.exceptions.ClientError: el código viene en response["Error"]["Code"]"""
+
+    def __init__(self, codigo):
+        super().__init__(codigo)
+        self.response = {"Error": {"Code": codigo}}
+
+
+class TextractFalso:
+    """
+    Cliente de Textract con la misma interfaz que boto3.client('textract').
+    En modo síncrono puede devolver ThrottlingException con probabilidad
+    tasa_throttling y fallar siempre en las páginas de paginas_fallidas.
+    """
+
+    def __init__(self, bloques, bloques_por_respuesta=1000, consultas_en_progreso=0, latencia=0.0,
+                 tasa_throttling=0.0, paginas_fallidas=(), semilla=0):
+        self.bloques = bloques
+        self.bloques_por_respuesta = bloques_por_respuesta
+        self.consultas_en_progreso = consultas_en_progreso
+        self.latencia = latencia
+        self.tasa_throttling = tasa_throttling
+        self.paginas_fallidas = set(paginas_fallidas)
+        self.rng = random.Random(semilla)
+        self.llamadas = 0
+        self.errores = 0
+        self._consultas = {}
+        self._paginas_por_imagen = {}
+        self._lock = threading.Lock()
+
+    def registrar_imagen(self, datos, pagina):
+        """Asocia los bytes de una imagen con su número de página (modo síncrono)"""
+        self._paginas_por_imagen[hashlib.sha1(datos).hexdigest()] = pagina
+
+    def start_document_text_detection(self, DocumentLocation):
+        self.llamadas += 1
+        job_id = f"job-{len(self._consultas) + 1}"
+        self._consultas[job_id] = 0
+        return {"JobId": job_id}
+
+    def get_document_text_detection(self, JobId, NextToken=None):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        self._consultas[JobId] += 1
+        if self._consultas[JobId] <= self.consultas_en_progreso:
+            return {"JobStatus": "IN_PROGRESS", "Blocks": []}
+        inicio = int(NextToken or 0)
+        fin = inicio + self.bloques_por_respuesta
+        respuesta = {"JobStatus": "SUCCEEDED", "Blocks": self.bloques[inicio:fin]}
+        if fin < len(self.bloques):
+            respuesta["NextToken"] = str(fin)
+        return respuesta
+
+    def detect_document_text(self, Document):
+        """Modo síncrono: devuelve las líneas de la imagen (registrada con registrar_imagen)"""
+        pagina = self._paginas_por_imagen.get(hashlib.sha1(Document["Bytes"]).hexdigest())
+        with self._lock:
+            self.llamadas += 1
+            codigo = ("InvalidParameterException" if pagina in self.paginas_fallidas
+                      else "ThrottlingException" if self.rng.random() < self.tasa_throttling else None)
+            self.errores += codigo is not None
+        time.sleep(self.latencia)
+        if codigo:
+            raise ErrorClienteFalso(codigo)
+        bloques = [dict(b, Page=1) for b in self.bloques if b["Page"] == pagina]
+        return {"Blocks": bloques}
+
+
+# === OPENAI ===
+
+def _preguntas_opcion_multiple(n=6):
+    return [{"pregunta": f"Pregunta {i}", "opciones": ["A) uno", "B) dos", "C) tres", "D) cuatro"],
+             "respuesta_correcta": "B"} for i in range(1, n + 1)]
+
+
+def _respuesta_para(prompt):
+    """Contenido verosímil según el prompt recibido (limpieza, VoF, opción múltiple, paquete o combinado)"""
+    if "<<<PREGUNTAS>>>" in prompt:
+        texto = prompt.split("Texto:\n", 1)[-1].strip()
+        preguntas = json.loads(_respuesta_para("verdadero o falso"))["preguntas"]
+        lineas = "\n".join(json.dumps(p, ensure_ascii=False) for p in preguntas)
+        return f"<<<TEXTO>>>\n{texto}\n<<<PREGUNTAS>>>\n{lineas}\n<<<FIN>>>"
+    if "verdadero o falso" in prompt:
+        niveles = ["fácil"] * 4 + ["intermedia"] * 2 + ["difícil"] * 2
+        return json.dumps({"preguntas": [
+            {"nivel": n, "pregunta": f"Afirmación {i} sobre el texto.",
+             "respuesta_correcta": "Verdadero" if i % 2 else "Falso"}
+            for i, n in enumerate(niveles, 1)
+        ]}, ensure_ascii=False)
+    if "opción múltiple" in prompt and '"lecturas": [' in prompt:
+        ids = re.findall(r"^=== (L\d+) ===$", prompt, flags=re.MULTILINE)
+        return json.dumps({"lecturas": [{"id": i, "preguntas": _preguntas_opcion_multiple()} for i in ids]},
+                          ensure_ascii=False)
+    if "opción múltiple" in prompt:
+        m = re.search(r'"lectura": "([^"]*)"', prompt)
+        return json.dumps({"lectura": m.group(1) if m else "", "preguntas": _preguntas_opcion_multiple()},
+                          ensure_ascii=False)
+    # Limpieza: se devuelve el texto tal cual
+    return prompt.split("Texto:\n", 1)[-1].strip()
+
+
+FRAGMENTO_STREAM = 16  # caracteres por evento SSE
+
+
+class _ManejadorOpenAI(BaseHTTPRequestHandler):
+    def do_POST(self):
+        ctx = self.server.contexto
+        cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with ctx.lock:
+            ctx.solicitudes += 1
+            limitar = ctx.rng.random() < ctx.tasa_429
+            if limitar:
+                ctx.respuestas_429 += 1
+
+        if limitar:
+            datos = json.dumps({"error": {"message": "Rate limit", "type": "rate_limit_error"}}).encode()
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("retry-after-ms", "10")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+            return
+
+        prompt = "\n".join(m.get("content", "") for m in cuerpo.get("messages", []))
+        contenido = _respuesta_para(prompt)
+        uso = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(contenido) // 4,
+               "total_tokens": (len(prompt) + len(contenido)) // 4}
+        if cuerpo.get("stream"):
+            self._responder_stream(ctx, cuerpo, contenido, uso)
+            return
+
+        # Sin streaming la respuesta llega completa: latencia inicial + tiempo de generación
+        time.sleep(ctx.latencia + uso["completion_tokens"] * ctx.latencia_token)
+        datos = json.dumps({
+            "id": f"chatcmpl-falso-{ctx.solicitudes}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": cuerpo.get("model", "falso"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": contenido}}],
+            "usage": uso,
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _responder_stream(self, ctx, cuerpo, contenido, uso):
+        """Envía el contenido como eventos SSE (chat.completion.chunk) de a FRAGMENTO_STREAM caracteres"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        base = {"id": f"chatcmpl-falso-{ctx.solicitudes}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": cuerpo.get("model", "falso")}
+
+        def enviar(choices, **extra):
+            evento = json.dumps({**base, "choices": choices, **extra}, ensure_ascii=False)
+            self.wfile.write(f"data: {evento}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        time.sleep(ctx.latencia)
+        for i in range(0, len(contenido), FRAGMENTO_STREAM):
+            fragmento = contenido[i:i + FRAGMENTO_STREAM]
+            time.sleep(len(fragmento) // 4 * ctx.latencia_token)
+            enviar([{"index": 0, "delta": {"content": fragmento}, "finish_reason": None}])
+        enviar([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (cuerpo.get("stream_options") or {}).get("include_usage"):
+            enviar([], usage=uso)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class ServidorOpenAIFalso(_ServidorEnHilo):
+    """Servidor compatible con la API de OpenAI; usar su url + '/v1' como base_url"""
+
+    def __init__(self, latencia=0.05, tasa_429=0.0, semilla=0, latencia_token=0.0):
+        super().__init__(_ManejadorOpenAI)
+        self.latencia = latencia
+        self.latencia_token = latencia_token  # segundos por token generado
+        self.tasa_429 = tasa_429
+        self.rng = random.Random(semilla)
+        self.lock = threading.Lock()
+        self.solicitudes = 0
+        self.respuestas_429 = 0
+
+    @property
+    def base_url(self):
+        return self.url + "/v1"
+
+
+# === FIRESTORE ===
+
+class IncrementoFalso:
+    """Equivalente de google.cloud.firestore.Increment para FirestoreFalso"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _DocumentoFalso:
+    def __init__(self, db, ruta):
+        self._db = db
+        self.id = ruta.rsplit("/", 1)[-1]
+        self.path = ruta
+
+    @property
+    def reference(self):
+        return self
+
+    @property
+    def exists(self):
+        return self.path in self._db.documentos
+
+    def set(self, datos, merge=False):
+        with self._db.lock:
+            self._db.escrituras += 1
+            actual = dict(self._db.documentos.get(self.path) or {}) if merge else {}
+            for campo, valor in datos.items():
+                if isinstance(valor, IncrementoFalso) or type(valor).__name__ == "Increment":
+                    valor = actual.get(campo, 0) + valor.value
+                actual[campo] = valor
+            self._db.documentos[self.path] = json.loads(json.dumps(actual))
+
+    def get(self):
+        with self._db.lock:
+            self._db.lecturas += 1
+        return self
+
+    def to_dict(self):
+        return self._db.documentos.get(self.path)
+
+    def collection(self, nombre):
+        return _ColeccionFalsa(self._db, f"{self.path}/{nombre}")
+
+    def collections(self):
+        prefijo = self.path + "/"
+        nombres = {ruta[len(prefijo):].split("/", 1)[0] for ruta in self._db.documentos if ruta.startswith(prefijo)}
+        return [self.collection(n) for n in sorted(nombres)]
+
+
+class _ColeccionFalsa:
+    """Colección y consulta a la vez: solo se admite orden por ID (__name__)"""
+
+    def __init__(self, db, ruta, limite=None, despues_de=None):
+        self._db = db
+        self.path = ruta
+        self._limite = limite
+        self._despues_de = despues_de
+
+    def document(self, doc_id):
+        return _DocumentoFalso(self._db, f"{self.path}/{doc_id}")
+
+    def order_by(self, campo):
+        if campo != "__name__":
+            raise NotImplementedError("FirestoreFalso solo ordena por __name__")
+        return self
+
+    def limit(self, n):
+        return _ColeccionFalsa(self._db, self.path, n, self._despues_de)
+
+    def start_after(self, snapshot):
+        return _ColeccionFalsa(self._db, self.path, self._limite, snapshot.id)
+
+    def stream(self):
+        prefijo = self.path + "/"
+        entregados = 0
+        for ruta in sorted(self._db.documentos):
+            if not ruta.startswith(prefijo) or "/" in ruta[len(prefijo):]:
+                continue
+            if self._despues_de is not None and ruta[len(prefijo):] <= self._despues_de:
+                continue
+            if self._limite is not None and entregados >= self._limite:
+                return
+            entregados += 1
+            yield _DocumentoFalso(self._db, ruta).get()
+
+
+class _BatchFalso:
+    def __init__(self, db):
+        self._db = db
+        self._operaciones = []
+
+    def set(self, referencia, datos, merge=False):
+        self._operaciones.append((referencia, datos, merge))
+
+    def commit(self):
+        with self._db.lock:
+            self._db.commits += 1
+        for referencia, datos, merge in self._operaciones:
+            referencia.set(datos, merge=merge)
+        self._operaciones = []
+
+
+class FirestoreFalso:
+    """Cliente de Firestore en memoria con la parte de la API que usan los scripts"""
+
+    def __init__(self):
+        self.documentos = {}
+        self.lock = threading.Lock()
+        self.escrituras = 0
+        self.lecturas = 0
+        self.commits = 0
+
+    def collection(self, nombre):
+        return _ColeccionFalsa(self, nombre)
+
+    def document(self, ruta):
+        return _DocumentoFalso(self, ruta)
+
+    def batch(self):
+        return _BatchFalso(self)
+
+    def get_all(self, referencias):
+        for referencia in referencias:
+            yield referencia.get()
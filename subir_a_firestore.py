@@ -6,11 +6,17 @@ lecturas/
      |- texto: string
      |- autor: string
      |- preguntas_vof: array[{afirmacion, respuesta, dificultad}]
+     |- palabras, oraciones, palabras_por_oracion: number
+     |- indice_fernandez_huerta, indice_szigriszt, rareza_vocabulario: number
+     |- nivel_lectura: string
 """
 
 import json
 import os
-from firebase_admin import credentials, firestore, initialize_app
+
+from ingesta import clave_nombre, leer_texto, nfc
+from instrumentacion import etapa, finalizar, iniciar
+from metricas_lectura import analizar_directorio
 
 # === CONFIGURACIÓN ===
 LECTURAS_DIR = "lecturas_finales"
@@ -42,6 +48,7 @@ def inicializar_firebase():
         return None
     
     try:
+        from firebase_admin import credentials, firestore, initialize_app
         cred = credentials.Certificate(FIREBASE_CREDENTIALS)
         initialize_app(cred)
         db = firestore.client()
@@ -79,7 +86,7 @@ def cargar_preguntas():
     for nivel, preguntas in banco.items():
         dificultad = MAPEO_NIVELES[nivel]
         for pregunta in preguntas:
-            origen = pregunta["origen"]
+            origen = nfc(pregunta["origen"])
             if origen not in preguntas_por_lectura:
                 preguntas_por_lectura[origen] = []
             
@@ -94,19 +101,20 @@ def cargar_preguntas():
 def normalizar_nombre_archivo(nombre):
     """Normaliza el nombre del archivo para coincidir con el origen en el JSON"""
     # Quitar la extensión .txt
-    nombre = nombre.replace(".txt", "")
+    nombre = nfc(nombre).replace(".txt", "")
     return nombre
 
 def buscar_preguntas_por_nombre(nombre_lectura, preguntas_por_lectura):
     """Busca las preguntas de una lectura, siendo flexible con mayúsculas/minúsculas"""
+    nombre_lectura = nfc(nombre_lectura)
     # Primero intentar búsqueda exacta
     if nombre_lectura in preguntas_por_lectura:
         return preguntas_por_lectura[nombre_lectura]
     
-    # Búsqueda case-insensitive
-    nombre_lower = nombre_lectura.lower()
+    # Búsqueda sin distinguir mayúsculas ni forma Unicode (NFC/NFD)
+    clave = clave_nombre(nombre_lectura)
     for nombre_key, preguntas in preguntas_por_lectura.items():
-        if nombre_key.lower() == nombre_lower:
+        if clave_nombre(nombre_key) == clave:
             return preguntas
     
     return []
@@ -121,6 +129,9 @@ def subir_lecturas(db):
     # Obtener lista de archivos de texto
     archivos = [f for f in os.listdir(LECTURAS_DIR) if f.endswith('.txt')]
     print(f"\n📄 Se encontraron {len(archivos)} archivos de lecturas")
+
+    # Métricas de legibilidad de todas las lecturas en una sola pasada
+    metricas = analizar_directorio(LECTURAS_DIR)
     
     lecturas_subidas = 0
     lecturas_fallidas = 0
@@ -131,8 +142,7 @@ def subir_lecturas(db):
         
         try:
             # Leer el archivo
-            with open(ruta_archivo, "r", encoding="utf-8") as f:
-                contenido = f.read()
+            contenido = leer_texto(ruta_archivo)
             
             # Extraer título y autor
             titulo, autor, texto = extraer_titulo_y_autor(contenido)
@@ -150,11 +160,15 @@ def subir_lecturas(db):
             documento = {
                 "texto": texto,
                 "autor": autor,
-                "preguntas_vof": preguntas
+                "preguntas_vof": preguntas,
+                **metricas.get(nombre_lectura, {})
             }
             
             # Subir a Firestore usando el título como ID del documento
-            db.collection(COLECCION).document(titulo).set(documento)
+            with etapa("subida", titulo) as reg:
+                db.collection(COLECCION).document(titulo).set(documento)
+                reg["ops_firestore"] = 1
+                reg["bytes"] = len(json.dumps(documento, ensure_ascii=False).encode("utf-8"))
             
             print(f"✅ '{titulo}' subida correctamente ({len(preguntas)} preguntas)")
             lecturas_subidas += 1
@@ -188,7 +202,9 @@ def main():
         return
     
     # Subir lecturas
+    iniciar("subir_a_firestore")
     subir_lecturas(db)
+    finalizar()
     
     print("\n✨ Proceso completado")
 
@@ -1,90 +1,291 @@
-import boto3
-import time
-import json
+import argparse
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentacion import etapa, finalizar, iniciar
+from registro_libros import (cargar_lecturas, paginas_necesarias, rango_paginas, ruta_pagina, ruta_textos_pagina,
+                             seleccionar_libros)
 
 # === CONFIGURACIÓN ===
 S3_BUCKET = "mi-libro-cuarto"      # tu bucket
-DOCUMENT  = "libro_cuarto.pdf"               # nombre del PDF en S3
-LECTURAS_JSON = "lecturas_cuarto.json"       # tu JSON con rangos
-OUT_DIR = "lecturas_txt"
-os.makedirs(OUT_DIR, exist_ok=True)
+
+# Modo síncrono (detect_document_text por página)
+HILOS_SINCRONO = 8
+TPS_SINCRONO = 10                  # cuota de transacciones por segundo de la cuenta
+REINTENTOS_SINCRONO = 5
+ESPERA_REINTENTO = 0.5             # segundos; se duplica en cada reintento
+ERRORES_REINTENTABLES = {"ThrottlingException", "ProvisionedThroughputExceededException",
+                         "LimitExceededException", "InternalServerError"}
 
 # === CLIENTE TEXTRACT ===
-textract = boto3.client("textract", region_name="us-east-1")
-
-# === 1. Iniciar la tarea de detección de texto ===
-print("Iniciando análisis de documento...")
-response = textract.start_document_text_detection(
-    DocumentLocation={"S3Object": {"Bucket": S3_BUCKET, "Name": DOCUMENT}}
-)
-job_id = response["JobId"]
-print(f"Job iniciado: {job_id}")
-
-# === 2. Esperar hasta que termine ===
-while True:
-    status = textract.get_document_text_detection(JobId=job_id)
-    job_status = status["JobStatus"]
-    print("Estado:", job_status)
-    if job_status in ["SUCCEEDED", "FAILED"]:
-        break
-    time.sleep(5)
-
-if job_status == "FAILED":
-    raise RuntimeError("❌ El análisis de Textract falló.")
-
-# === 3. Obtener todos los resultados ===
-pages = []
-next_token = None
-print("Descargando resultados...")
-while True:
-    if next_token:
-        response = textract.get_document_text_detection(JobId=job_id, NextToken=next_token)
-    else:
-        response = textract.get_document_text_detection(JobId=job_id)
-    pages.extend(response["Blocks"])
-    next_token = response.get("NextToken")
-    if not next_token:
-        break
-
-# === 4. Separar texto por página ===
-print("Procesando texto por página...")
-page_texts = {}
-for block in pages:
-    if block["BlockType"] == "LINE":
-        page = block["Page"]
-        text = block["Text"]
-        page_texts.setdefault(page, []).append(text)
-
-# Convertir listas en texto concatenado
-for page in page_texts:
-    page_texts[page] = "\n".join(page_texts[page])
-
-# === 5. Cargar JSON de lecturas ===
-with open(LECTURAS_JSON, "r", encoding="utf-8") as f:
-    lecturas = json.load(f)
-
-# === 6. Extraer texto por lectura ===
-for lectura in lecturas:
-    nombre = lectura["lectura"]
-    paginas = lectura["paginas"]
-    if "-" in paginas:
-        start, end = map(int, paginas.split("-"))
-    else:
-        start = end = int(paginas)
-
-    texto_lectura = ""
-    for p in range(start, end + 1):
-        if p in page_texts:
-            texto_lectura += page_texts[p] + "\n\n"
+# Se crea al primer uso (importar boto3 tarda); se puede reemplazar por un stub
+textract = None
+
+
+def cliente_textract():
+    global textract
+    if textract is None:
+        import boto3
+        textract = boto3.client("textract", region_name="us-east-1")
+    return textract
+
+
+def extraer_texto_por_pagina(documento):
+    """Corre la detección asíncrona sobre un PDF en S3 y devuelve {página: texto}"""
+    # === 1. Iniciar la tarea de detección de texto ===
+    print("Iniciando análisis de documento...")
+    textract = cliente_textract()
+    response = textract.start_document_text_detection(
+        DocumentLocation={"S3Object": {"Bucket": S3_BUCKET, "Name": documento}}
+    )
+    job_id = response["JobId"]
+    print(f"Job iniciado: {job_id}")
+
+    # === 2. Esperar hasta que termine ===
+    while True:
+        status = textract.get_document_text_detection(JobId=job_id)
+        job_status = status["JobStatus"]
+        print("Estado:", job_status)
+        if job_status in ["SUCCEEDED", "FAILED"]:
+            break
+        time.sleep(5)
+
+    if job_status == "FAILED":
+        raise RuntimeError("❌ El análisis de Textract falló.")
+
+    # === 3. Obtener todos los resultados ===
+    pages = []
+    next_token = None
+    print("Descargando resultados...")
+    while True:
+        if next_token:
+            response = textract.get_document_text_detection(JobId=job_id, NextToken=next_token)
         else:
-            print(f"⚠️ Página {p} sin texto detectado.")
+            response = textract.get_document_text_detection(JobId=job_id)
+        pages.extend(response["Blocks"])
+        next_token = response.get("NextToken")
+        if not next_token:
+            break
+
+    # === 4. Separar texto por página ===
+    print("Procesando texto por página...")
+    page_texts = {}
+    for block in pages:
+        if block["BlockType"] == "LINE":
+            page = block["Page"]
+            text = block["Text"]
+            page_texts.setdefault(page, []).append(text)
+
+    # Convertir listas en texto concatenado
+    for page in page_texts:
+        page_texts[page] = "\n".join(page_texts[page])
+    return page_texts
+
+
+def extraer_solo_lecturas(libro):
+    """
+    Sube a S3 un PDF con solo las páginas de las lecturas, lo procesa y devuelve
+    {página original: texto} (Textract numera las páginas del PDF reducido).
+    """
+    from lecturas import armar_pdf
+
+    base, ext = os.path.splitext(libro["documento_s3"])
+    documento = f"{base}_lecturas{ext}"
+    ruta_local = os.path.join(libro["directorio"], documento)
+    incluidas = armar_pdf(libro, ruta_local, paginas_necesarias(libro))
+    print(f"PDF reducido: {len(incluidas)} de {libro['paginas']} páginas")
+
+    import boto3
+    boto3.client("s3").upload_file(ruta_local, S3_BUCKET, documento)
+    page_texts = extraer_texto_por_pagina(documento)
+    return {incluidas[k - 1]: texto for k, texto in page_texts.items()}
+
+
+class LimitadorTPS:
+    """Reparte las llamadas para no pasar de tps solicitudes por segundo (entre hilos)"""
+
+    def __init__(self, tps):
+        self.intervalo = 1.0 / tps
+        self.siguiente = time.monotonic()
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        with self.lock:
+            ahora = time.monotonic()
+            turno = max(self.siguiente, ahora)
+            self.siguiente = turno + self.intervalo
+        time.sleep(max(turno - ahora, 0))
+
+
+def _codigo_error(e):
+    """Código de error de una excepción de botocore (None si no es ClientError)"""
+    return ((getattr(e, "response", None) or {}).get("Error") or {}).get("Code")
+
+
+def extraer_paginas_sincrono(libro, paginas, cliente=None, hilos=HILOS_SINCRONO, tps=TPS_SINCRONO):
+    """
+    Manda cada imagen de página a detect_document_text en paralelo (sin S3 ni
+    polling). Devuelve ({página: texto}, {página: error}): una página que falla
+    no descarta las que ya se procesaron. cliente permite usar un stub de boto3.
+    """
+    cliente = cliente or cliente_textract()
+    limitador = LimitadorTPS(tps)
+
+    def procesar(pagina):
+        with open(ruta_pagina(libro, pagina), "rb") as f:
+            datos = f.read()
+        with etapa("textract_pagina", f"{libro['codigo']}/{pagina:03d}") as reg:
+            reg["bytes"] = len(datos)
+            for intento in range(REINTENTOS_SINCRONO):
+                limitador.esperar()
+                try:
+                    respuesta = cliente.detect_document_text(Document={"Bytes": datos})
+                    break
+                except Exception as e:
+                    if _codigo_error(e) not in ERRORES_REINTENTABLES or intento == REINTENTOS_SINCRONO - 1:
+                        raise
+                    reg["reintentos"] += 1
+                    time.sleep(ESPERA_REINTENTO * 2 ** intento)
+        lineas = [b["Text"] for b in respuesta["Blocks"] if b["BlockType"] == "LINE"]
+        return "\n".join(lineas)
+
+    def procesar_seguro(pagina):
+        try:
+            return pagina, procesar(pagina), None
+        except Exception as e:
+            return pagina, None, _codigo_error(e) or repr(e)
+
+    existentes = [p for p in paginas if os.path.exists(ruta_pagina(libro, p))]
+    for p in sorted(set(paginas) - set(existentes)):
+        print(f"⚠️ Página {p} no está descargada, se omite.")
+    page_texts, fallidas = {}, {}
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        for pagina, texto, error in pool.map(procesar_seguro, existentes):
+            if error is None:
+                page_texts[pagina] = texto
+            else:
+                fallidas[pagina] = error
+    for pagina, error in sorted(fallidas.items()):
+        print(f"❌ Página {pagina}: {error}")
+    return page_texts, fallidas
+
+
+def guardar_textos_pagina(libro, page_texts):
+    """Guarda el texto de cada página en paginas_txt/pagina_NNN.txt"""
+    carpeta = ruta_textos_pagina(libro)
+    os.makedirs(carpeta, exist_ok=True)
+    for pagina, texto in page_texts.items():
+        with open(os.path.join(carpeta, f"pagina_{pagina:03d}.txt"), "w", encoding="utf-8") as f:
+            f.write(texto)
+
+
+def cargar_textos_pagina(libro):
+    """Lee todos los textos por página guardados previamente: {página: texto}"""
+    carpeta = ruta_textos_pagina(libro)
+    page_texts = {}
+    if os.path.isdir(carpeta):
+        for archivo in os.listdir(carpeta):
+            if archivo.startswith("pagina_") and archivo.endswith(".txt"):
+                with open(os.path.join(carpeta, archivo), "r", encoding="utf-8") as f:
+                    page_texts[int(archivo[7:10])] = f.read()
+    return page_texts
+
+
+def parsear_paginas(texto):
+    """Convierte "10-19,25" en [10, ..., 19, 25]"""
+    paginas = []
+    for parte in texto.split(","):
+        inicio, fin = rango_paginas(parte.strip())
+        paginas.extend(range(inicio, fin + 1))
+    return sorted(set(paginas))
+
+
+def lecturas_afectadas(lecturas, paginas):
+    """Lecturas que incluyen al menos una de las páginas dadas"""
+    afectadas = []
+    for lectura in lecturas:
+        inicio, fin = rango_paginas(lectura["paginas"])
+        if any(inicio <= p <= fin for p in paginas):
+            afectadas.append(lectura)
+    return afectadas
+
+
+def guardar_lecturas(page_texts, lecturas, out_dir):
+    """Une el texto de las páginas de cada lectura y lo guarda en un .txt"""
+    os.makedirs(out_dir, exist_ok=True)
+    for lectura in lecturas:
+        nombre = lectura["lectura"]
+        start, end = rango_paginas(lectura["paginas"])
+
+        texto_lectura = ""
+        for p in range(start, end + 1):
+            if p in page_texts:
+                texto_lectura += page_texts[p] + "\n\n"
+            else:
+                print(f"⚠️ Página {p} sin texto detectado.")
+
+        # Guardar cada lectura en archivo .txt
+        out_path = os.path.join(out_dir, f"{nombre}.txt")
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(texto_lectura.strip())
+
+        print(f"✅ Guardado: {out_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrae el texto de cada lectura con AWS Textract")
+    parser.add_argument("--libros", nargs="*", help="Códigos de libro (por defecto todos los de libros.json)")
+    parser.add_argument("--solo-lecturas", action="store_true",
+                        help="Subir y procesar solo las páginas que aparecen en el JSON de lecturas")
+    parser.add_argument("--motor", choices=["asincrono", "sincrono"], default="asincrono",
+                        help="asincrono: PDF completo en S3; sincrono: una llamada por imagen de página")
+    parser.add_argument("--paginas", help='Páginas a re-extraer en modo síncrono, p. ej. "10-19,25"')
+    parser.add_argument("--hilos", type=int, default=HILOS_SINCRONO, help="Llamadas simultáneas (modo síncrono)")
+    parser.add_argument("--tps", type=float, default=TPS_SINCRONO, help="Máximo de llamadas por segundo (modo síncrono)")
+    args = parser.parse_args()
+
+    iniciar("textract")
+    for libro in seleccionar_libros(args.libros):
+        print(f"\n📚 Libro {libro['codigo']}")
+        lecturas = cargar_lecturas(libro)
+        with etapa("textract", libro["codigo"]) as reg:
+            if args.motor == "sincrono":
+                if args.paginas:
+                    paginas = parsear_paginas(args.paginas)
+                elif args.solo_lecturas:
+                    paginas = paginas_necesarias(libro)
+                else:
+                    paginas = list(range(1, libro["paginas"] + 1))
+                page_texts, fallidas = extraer_paginas_sincrono(libro, paginas, hilos=args.hilos, tps=args.tps)
+                reg["fallidas"] = len(fallidas)
+                if fallidas:
+                    print(f"⚠️ {len(fallidas)} páginas fallaron; se guardan las demás. "
+                          f"Para reintentarlas: --motor sincrono --paginas {','.join(map(str, sorted(fallidas)))}")
+            elif args.solo_lecturas:
+                page_texts = extraer_solo_lecturas(libro)
+            else:
+                page_texts = extraer_texto_por_pagina(libro["documento_s3"])
+            reg["paginas"] = len(page_texts)
+            reg["bytes"] = sum(len(t.encode("utf-8")) for t in page_texts.values())
 
-    # Guardar cada lectura en archivo .txt
-    out_path = os.path.join(OUT_DIR, f"{nombre}.txt")
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(texto_lectura.strip())
+        guardar_textos_pagina(libro, page_texts)
+        if args.motor == "sincrono":
+            if args.paginas:
+                # Re-extracción parcial: solo se reescriben las lecturas que tocan esas páginas
+                lecturas = lecturas_afectadas(lecturas, page_texts)
+            # Las páginas que no se extrajeron ahora se completan con los textos ya guardados
+            page_texts = {**cargar_textos_pagina(libro), **page_texts}
+            sin_texto = [p for p in fallidas if p not in page_texts]
+            incompletas = lecturas_afectadas(lecturas, sin_texto)
+            for lectura in incompletas:
+                print(f"⚠️ {lectura['lectura']}: tiene páginas fallidas sin texto guardado; se conserva el archivo anterior.")
+            lecturas = [lectura for lectura in lecturas if lectura not in incompletas]
+        guardar_lecturas(page_texts, lecturas, libro["textos"])
+        print("\n🎉 Extracción completa. Archivos listos en", libro["textos"])
+    finalizar()
 
-    print(f"✅ Guardado: {out_path}")
 
-print("\n🎉 Extracción completa. Archivos listos en", OUT_DIR)
+if __name__ == "__main__":
+    main()
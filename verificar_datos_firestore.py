@@ -1,10 +1,27 @@
 """
 Script para verificar los datos antes de subirlos a Firestore
-Muestra un preview de cómo se verán los documentos en Firestore
+
+Por defecto valida todas las lecturas en paralelo (codificación, título/autor,
+texto vacío, coincidencia con el banco, preguntas por nivel contra el objetivo
+de PROMPT_PREGUNTAS y balance de respuestas) y termina con código 1 si hay
+errores, para poder usarlo en automatización.
+
+Uso:
+    python3 verificar_datos_firestore.py
+    python3 verificar_datos_firestore.py --formato junit --salida reporte.xml
+    python3 verificar_datos_firestore.py --preview     # vista detallada anterior
 """
 
+import argparse
 import json
 import os
+import re
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from ingesta import MOJIBAKE, clave_nombre, decodificar, leer_texto, nfc
 
 LECTURAS_DIR = "lecturas_finales"
 BANCO_PREGUNTAS_JSON = "banco_verdadero_falso.json"
@@ -39,7 +56,7 @@ def cargar_preguntas():
     for nivel, preguntas in banco.items():
         dificultad = MAPEO_NIVELES[nivel]
         for pregunta in preguntas:
-            origen = pregunta["origen"]
+            origen = nfc(pregunta["origen"])
             if origen not in preguntas_por_lectura:
                 preguntas_por_lectura[origen] = []
             
@@ -53,18 +70,19 @@ def cargar_preguntas():
 
 def normalizar_nombre_archivo(nombre):
     """Normaliza el nombre del archivo"""
-    return nombre.replace(".txt", "")
+    return nfc(nombre).replace(".txt", "")
 
 def buscar_preguntas_por_nombre(nombre_lectura, preguntas_por_lectura):
     """Busca las preguntas de una lectura, siendo flexible con mayúsculas/minúsculas"""
+    nombre_lectura = nfc(nombre_lectura)
     # Primero intentar búsqueda exacta
     if nombre_lectura in preguntas_por_lectura:
         return preguntas_por_lectura[nombre_lectura]
     
-    # Búsqueda case-insensitive
-    nombre_lower = nombre_lectura.lower()
+    # Búsqueda sin distinguir mayúsculas ni forma Unicode (NFC/NFD)
+    clave = clave_nombre(nombre_lectura)
     for nombre_key, preguntas in preguntas_por_lectura.items():
-        if nombre_key.lower() == nombre_lower:
+        if clave_nombre(nombre_key) == clave:
             return preguntas
     
     return []
@@ -106,8 +124,7 @@ def verificar_datos():
         nombre_lectura = normalizar_nombre_archivo(archivo)
         ruta_archivo = os.path.join(LECTURAS_DIR, archivo)
         
-        with open(ruta_archivo, "r", encoding="utf-8") as f:
-            contenido = f.read()
+        contenido = leer_texto(ruta_archivo)
         
         titulo, autor, texto = extraer_titulo_y_autor(contenido)
         preguntas = buscar_preguntas_por_nombre(nombre_lectura, preguntas_por_lectura)
@@ -139,5 +156,168 @@ def verificar_datos():
     print("✅ Verificación completada")
     print("\n💡 Si todo se ve bien, ejecuta: python3 subir_a_firestore.py")
 
+
+# === VALIDACIÓN ===
+
+MIN_CARACTERES_TEXTO = 200
+BALANCE_MINIMO = 0.25   # fracción mínima de verdaderas y de falsas por lectura
+
+
+def objetivo_niveles():
+    """Preguntas por dificultad que pide PROMPT_PREGUNTAS (p. ej. {"fácil": 4, ...})"""
+    from procesar_lecturas import PROMPT_PREGUNTAS
+    return {nivel: int(n) for n, nivel in re.findall(r"- (\d+) (fácil|intermedia|difícil)", PROMPT_PREGUNTAS)}
+
+
+def validar_lectura(archivo, preguntas_por_lectura, indice_nombres, objetivo):
+    """Corre todas las verificaciones sobre una lectura; devuelve (nombre, [(verificación, estado, detalle)])"""
+    nombre = normalizar_nombre_archivo(archivo)
+    resultados = []
+
+    def anotar(verificacion, estado, detalle=""):
+        resultados.append((verificacion, estado, detalle))
+
+    with open(os.path.join(LECTURAS_DIR, archivo), "rb") as f:
+        crudo = f.read()
+    try:
+        contenido = crudo.decode("utf-8")
+        if contenido.startswith("\ufeff"):
+            anotar("codificacion", "aviso", "el archivo empieza con BOM")
+        elif MOJIBAKE.search(contenido):
+            anotar("codificacion", "error", f"texto con doble codificación: {MOJIBAKE.search(contenido).group()!r}")
+        else:
+            anotar("codificacion", "ok")
+    except UnicodeDecodeError as e:
+        contenido, codificacion = decodificar(crudo)
+        anotar("codificacion", "error", f"no es UTF-8 (byte {e.start}, parece {codificacion})")
+    if nfc(archivo) != archivo or nfc(contenido) != contenido:
+        anotar("unicode", "error", "nombre o texto en forma NFD; correr ingesta.py")
+    contenido = nfc(contenido)
+
+    titulo, autor, texto = extraer_titulo_y_autor(contenido)
+    if not titulo or titulo == "Sin título":
+        anotar("titulo", "error", "sin título en la primera línea")
+    else:
+        anotar("titulo", "ok")
+    anotar("autor", "ok" if autor != "Desconocido" else "aviso", "" if autor != "Desconocido" else "sin línea 'Autor:'")
+
+    cuerpo = texto[len(titulo):].strip()
+    if len(cuerpo) < MIN_CARACTERES_TEXTO:
+        anotar("texto", "error", f"texto vacío o muy corto ({len(cuerpo)} caracteres)")
+    else:
+        anotar("texto", "ok")
+
+    clave = nombre if nombre in preguntas_por_lectura else indice_nombres.get(clave_nombre(nombre))
+    preguntas = preguntas_por_lectura.get(clave, [])
+    if not preguntas:
+        anotar("preguntas", "error", "sin preguntas en el banco")
+        return nombre, resultados
+    anotar("preguntas", "ok" if clave == nombre else "aviso",
+           "" if clave == nombre else f"coincide solo sin mayúsculas con '{clave}'")
+
+    por_nivel = Counter(p["dificultad"] for p in preguntas)
+    diferencias = [f"{nivel} {por_nivel.get(nivel, 0)}/{n}" for nivel, n in objetivo.items() if por_nivel.get(nivel, 0) != n]
+    anotar("niveles", "error" if diferencias else "ok", ", ".join(diferencias))
+
+    verdaderas = sum(1 for p in preguntas if p["respuesta"])
+    fraccion = verdaderas / len(preguntas)
+    detalle = f"{verdaderas} verdaderas, {len(preguntas) - verdaderas} falsas"
+    if fraccion in (0, 1):
+        anotar("balance", "error", detalle)
+    elif min(fraccion, 1 - fraccion) < BALANCE_MINIMO:
+        anotar("balance", "aviso", detalle)
+    else:
+        anotar("balance", "ok")
+    return nombre, resultados
+
+
+def validar_todo(hilos=8):
+    """Valida todas las lecturas en paralelo; devuelve el reporte como dict"""
+    inicio = time.perf_counter()
+    preguntas_por_lectura = cargar_preguntas()
+    indice_nombres = {clave_nombre(n): n for n in preguntas_por_lectura}
+    objetivo = objetivo_niveles()
+    archivos = sorted(f for f in os.listdir(LECTURAS_DIR) if f.endswith(".txt"))
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = dict(pool.map(
+            lambda a: validar_lectura(a, preguntas_por_lectura, indice_nombres, objetivo), archivos))
+
+    # Preguntas del banco cuyo origen no corresponde a ningún archivo
+    nombres = {clave_nombre(n) for n in resultados}
+    huerfanas = [o for o in preguntas_por_lectura if clave_nombre(o) not in nombres]
+    resultados["(banco)"] = [("origenes", "error", "sin archivo: " + ", ".join(huerfanas)) if huerfanas
+                             else ("origenes", "ok", "")]
+
+    conteo = Counter(estado for r in resultados.values() for _, estado, _ in r)
+    return {
+        "lecturas": len(archivos),
+        "verificaciones": sum(conteo.values()),
+        "errores": conteo["error"],
+        "avisos": conteo["aviso"],
+        "duracion_s": round(time.perf_counter() - inicio, 4),
+        # Solo se listan los problemas para que el reporte quede compacto
+        "problemas": {
+            nombre: [{"verificacion": v, "estado": e, "detalle": d} for v, e, d in r if e != "ok"]
+            for nombre, r in resultados.items() if any(e != "ok" for _, e, _ in r)
+        },
+        "_resultados": resultados,
+    }
+
+
+def reporte_junit(reporte):
+    """Reporte en formato JUnit XML: un testcase por lectura y verificación"""
+    import xml.etree.ElementTree as ET
+
+    suite = ET.Element("testsuite", name="verificar_datos_firestore", tests=str(reporte["verificaciones"]),
+                       failures=str(reporte["errores"]), time=str(reporte["duracion_s"]))
+    for nombre, resultados in reporte["_resultados"].items():
+        for verificacion, estado, detalle in resultados:
+            caso = ET.SubElement(suite, "testcase", classname=nombre, name=verificacion)
+            if estado == "error":
+                ET.SubElement(caso, "failure", message=detalle)
+            elif estado == "aviso":
+                ET.SubElement(caso, "system-out").text = f"aviso: {detalle}"
+    return ET.tostring(suite, encoding="unicode")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida las lecturas y el banco de preguntas antes de subirlos")
+    parser.add_argument("--formato", choices=["texto", "json", "junit"], default="texto")
+    parser.add_argument("--salida", help="Archivo del reporte (por defecto, la consola)")
+    parser.add_argument("--estricto", action="store_true", help="Los avisos también hacen fallar")
+    parser.add_argument("--preview", action="store_true", help="Mostrar la vista detallada de cada lectura")
+    args = parser.parse_args()
+
+    if args.preview:
+        verificar_datos()
+        return 0
+
+    reporte = validar_todo()
+    if args.formato == "junit":
+        salida = reporte_junit(reporte)
+    elif args.formato == "json":
+        salida = json.dumps({k: v for k, v in reporte.items() if not k.startswith("_")}, ensure_ascii=False, indent=2)
+    else:
+        lineas = [f"🔍 {reporte['lecturas']} lecturas, {reporte['verificaciones']} verificaciones "
+                  f"en {reporte['duracion_s'] * 1000:.0f} ms"]
+        for nombre, problemas in reporte["problemas"].items():
+            for p in problemas:
+                icono = "❌" if p["estado"] == "error" else "⚠️ "
+                lineas.append(f"   {icono} {nombre} · {p['verificacion']}: {p['detalle']}")
+        lineas.append(f"{'✅' if not reporte['errores'] else '❌'} {reporte['errores']} errores, {reporte['avisos']} avisos")
+        salida = "\n".join(lineas)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+        print(f"📝 Reporte guardado en {args.salida}")
+    else:
+        print(salida)
+
+    fallas = reporte["errores"] + (reporte["avisos"] if args.estricto else 0)
+    return 1 if fallas else 0
+
+
 if __name__ == "__main__":
-    verificar_datos()
+    sys.exit(main())